@@ -1,5 +1,14 @@
-from django.contrib import admin
-from .models import User, Diary, Calendar, Task, Case, Document
+import io
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from .imports import IMPORT_FORMATS, import_cases
+from .models import User, Diary, Calendar, CalendarFeedToken, Task, Case, Document, Job
 
 # Register the User model with custom admin options
 @admin.register(User)
@@ -15,26 +24,81 @@ class DiaryAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'content')
     list_filter = ('created_at',)
 
+class SoftDeleteAdmin(admin.ModelAdmin):
+    def delete_queryset(self, request, queryset):
+        # Leave tombstones for sync clients, as deleting a single row does
+        self.model.objects.filter(pk__in=queryset.values('pk')).delete()
+
 # Register the Calendar model
 @admin.register(Calendar)
-class CalendarAdmin(admin.ModelAdmin):
+class CalendarAdmin(SoftDeleteAdmin):
     list_display = ('user', 'title', 'start_time', 'end_time', 'event_type')
     search_fields = ('user__username', 'title', 'description')
     list_filter = ('event_type', 'start_time')
 
+# Register the CalendarFeedToken model
+@admin.register(CalendarFeedToken)
+class CalendarFeedTokenAdmin(admin.ModelAdmin):
+    list_display = ('user', 'created_at', 'revoked_at')
+    search_fields = ('user__username',)
+    list_filter = ('revoked_at',)
+    exclude = ('key',)
+
 # Register the Task model
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(SoftDeleteAdmin):
     list_display = ('title', 'assignor', 'assignee', 'status', 'priority', 'due_date')
     search_fields = ('title', 'assignor__username', 'assignee__username')
     list_filter = ('status', 'priority', 'due_date')
 
+class CaseImportUploadForm(forms.Form):
+    file = forms.FileField(help_text="CSV with a header row, or one JSON object per line.")
+    format = forms.ChoiceField(choices=[(name, name.upper()) for name in IMPORT_FORMATS])
+    batch_size = forms.IntegerField(min_value=1, initial=settings.CASE_IMPORT_BATCH_SIZE)
+
 # Register the Case model
 @admin.register(Case)
 class CaseAdmin(admin.ModelAdmin):
     list_display = ('case_number', 'client_name', 'lawyer', 'case_type', 'status', 'created_at')
     search_fields = ('case_number', 'client_name', 'lawyer__username', 'description')
     list_filter = ('case_type', 'status', 'created_at')
+    change_list_template = 'admin/firm/case/change_list.html'
+
+    def get_urls(self):
+        return [
+            path(
+                'import/',
+                self.admin_site.admin_view(self.import_view),
+                name='firm_case_import',
+            ),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        """
+        Import cases from an uploaded CSV or JSONL file.
+        """
+        if not self.has_add_permission(request):
+            return redirect('admin:firm_case_changelist')
+        form = CaseImportUploadForm(request.POST or None, request.FILES or None)
+        result = None
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            result = import_cases(stream, form.cleaned_data['format'], form.cleaned_data['batch_size'])
+            level = messages.WARNING if result.errors else messages.SUCCESS
+            self.message_user(
+                request,
+                f'{result.created} created, {result.skipped} already imported, '
+                f'{len(result.errors)} rejected.',
+                level,
+            )
+        return TemplateResponse(request, 'admin/firm/case/import.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import cases',
+            'form': form,
+            'result': result,
+        })
 
 # Register the Document model
 @admin.register(Document)
@@ -43,6 +107,13 @@ class DocumentAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'file', 'description')
     list_filter = ('document_type', 'uploaded_at')
 
+# Register the Job model
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'priority', 'attempts', 'run_at', 'finished_at')
+    search_fields = ('name', 'last_error')
+    list_filter = ('status', 'name')
+
 
 # Register your models here.
 
@@ -0,0 +1,142 @@
+import math
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .instrumentation import QueryStats
+from .models import Case, Task, User
+from .seeding import SEED_PREFIX
+
+# Pages driven for each role: (URL name, argument kind). The argument is
+# filled in per user: today's date, a case or task the user can open.
+ROLE_PAGES = {
+    'lawyer': (
+        ('lawyer_dashboard', None), ('calendar', None), ('event_list_json', 'month'),
+        ('task_list', None), ('view_cases', None), ('date_detail', 'date'),
+        ('view_case', 'case'), ('update_task', 'task'), ('search', 'query'),
+    ),
+    'secretary': (
+        ('secretary_dashboard', None), ('secretary_calendar', None), ('event_list_json', 'month'),
+        ('secretary_task_list', None), ('secretary_view_cases', None),
+        ('secretary_date_detail', 'date'), ('secretary_view_case', 'case'),
+    ),
+    'legal_assistant': (
+        ('legal_assistant_dashboard', None), ('legal_assistant_calendar', None),
+        ('event_list_json', 'month'), ('legal_assistant_task_list', None),
+        ('legal_assistant_view_cases', None), ('legal_assistant_date_detail', 'date'),
+        ('legal_assistant_view_case', 'case'),
+    ),
+    'attache': (
+        ('attache_dashboard', None), ('attache_calendar', None), ('event_list_json', 'month'),
+        ('attache_task_list', None), ('attache_view_cases', None),
+        ('attache_date_detail', 'date'), ('attache_view_case', 'case'),
+    ),
+}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty sorted list."""
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def benchmark_user(role):
+    """The first seeded user of ``role``, else the first user of ``role``."""
+    users = User.objects.filter(role=role, is_active=True).order_by('pk')
+    return users.filter(username__startswith=SEED_PREFIX).first() or users.first()
+
+
+def page_path(user, url_name, argument):
+    """
+    The path and query of a page for ``user``, or ``None`` when the user has
+    nothing to open there.
+    """
+    today = timezone.localdate()
+    if argument is None:
+        return reverse(url_name)
+    if argument == 'date':
+        return reverse(url_name, args=[today.isoformat()])
+    if argument == 'month':
+        start = today.replace(day=1)
+        return f'{reverse(url_name)}?start={start.isoformat()}&end={(start + timedelta(days=42)).isoformat()}'
+    if argument == 'query':
+        return f'{reverse(url_name)}?q=dispute'
+    if argument == 'case':
+        cases = Case.objects.filter(lawyer=user) if user.role == 'lawyer' else Case.objects.all()
+        case = cases.order_by('pk').first()
+        return reverse(url_name, args=[case.pk]) if case else None
+    task = Task.objects.filter(assignor=user).order_by('pk').first()
+    return reverse(url_name, args=[task.pk]) if task else None
+
+
+def summarize(role, url_name, path, timings, db_timings, queries):
+    timings, db_timings = sorted(timings), sorted(db_timings)
+    return {
+        'role': role,
+        'url_name': url_name,
+        'path': path,
+        'requests': len(timings),
+        'p50_ms': round(percentile(timings, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(timings, 0.99) * 1000, 2),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 2),
+        'db_p50_ms': round(percentile(db_timings, 0.50) * 1000, 2),
+        'queries_mean': round(sum(queries) / len(queries), 2),
+        'queries_max': max(queries),
+    }
+
+
+def run_benchmark(roles=None, requests=50, warmup=5, cold=False, progress=None):
+    """
+    Request every page of ``ROLE_PAGES`` for one user per role through the
+    test client, and return per-page latency percentiles and query counts.
+
+    ``warmup`` requests per page are made first and not measured. With
+    ``cold``, the cache is cleared before every request, so cached panels
+    and fragments are rebuilt each time.
+    """
+    results = []
+    # The test client always sends Host: testserver.
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        for role in roles or ROLE_PAGES:
+            user = benchmark_user(role)
+            if user is None:
+                continue
+            client = Client()
+            client.force_login(user)
+            for url_name, argument in ROLE_PAGES[role]:
+                path = page_path(user, url_name, argument)
+                if path is None:
+                    continue
+                for _number in range(warmup):
+                    client.get(path)
+                timings, db_timings, queries = [], [], []
+                for _number in range(requests):
+                    if cold:
+                        cache.clear()
+                    stats = QueryStats()
+                    start = time.perf_counter()
+                    with stats.record():
+                        response = client.get(path)
+                    timings.append(time.perf_counter() - start)
+                    db_timings.append(stats.duration)
+                    queries.append(stats.count)
+                    if response.status_code != 200:
+                        raise RuntimeError(f'{path} returned {response.status_code} for {user.username}.')
+                result = summarize(role, url_name, path, timings, db_timings, queries)
+                results.append(result)
+                if progress:
+                    progress(result)
+    return results
+
+
+def compare(results, baseline):
+    """
+    Pair each result with the same page in ``baseline`` (a saved run) and
+    return ``(result, baseline_result or None)`` pairs.
+    """
+    previous = {(result['role'], result['url_name']): result for result in baseline['results']}
+    return [(result, previous.get((result['role'], result['url_name']))) for result in results]
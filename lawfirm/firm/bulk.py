@@ -0,0 +1,117 @@
+from django import forms
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .directory import assignee_queryset
+from .forms import AssigneeAutocomplete
+from .models import Task, User
+from .signals import invalidate
+
+BULK_TASK_ACTIONS = (
+    ('status', 'Set status'),
+    ('priority', 'Set priority'),
+    ('due_date', 'Set due date'),
+    ('reassign', 'Reassign'),
+    ('delete', 'Delete'),
+)
+
+
+class BulkTaskError(Exception):
+    pass
+
+
+class BulkTaskForm(forms.Form):
+    """
+    One change applied to every selected task. Tasks can be reassigned to
+    the users TaskForm lets the user assign to.
+    """
+    action = forms.ChoiceField(choices=BULK_TASK_ACTIONS)
+    status = forms.ChoiceField(choices=Task.STATUS_CHOICES, required=False)
+    priority = forms.ChoiceField(choices=Task._meta.get_field('priority').choices, required=False)
+    due_date = forms.DateField(required=False)
+    assignee = forms.ModelChoiceField(
+        queryset=User.objects.none(),
+        required=False,
+        widget=AssigneeAutocomplete(attrs={'class': 'form-control'}),
+    )
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if user is not None:
+            self.fields['assignee'].queryset = assignee_queryset(user)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        action = cleaned_data.get('action')
+        field = 'assignee' if action == 'reassign' else action
+        if action and action != 'delete' and not cleaned_data.get(field):
+            self.add_error(field, 'This field is required for the selected action.')
+        return cleaned_data
+
+    def changes(self):
+        """The column values the action sets."""
+        action = self.cleaned_data['action']
+        if action == 'delete':
+            return {'deleted_at': timezone.now()}
+        if action == 'reassign':
+            return {'assignee': self.cleaned_data['assignee']}
+        return {action: self.cleaned_data[action]}
+
+
+def parse_task_ids(values):
+    """
+    Read the selected task ids. Raises ``BulkTaskError`` for anything that
+    is not an id, or for more than BULK_TASK_MAX_SELECTION tasks.
+    """
+    try:
+        task_ids = {int(value) for value in values}
+    except ValueError:
+        raise BulkTaskError('Invalid task selection.')
+    if not task_ids:
+        raise BulkTaskError('Select at least one task.')
+    if len(task_ids) > settings.BULK_TASK_MAX_SELECTION:
+        raise BulkTaskError(f'Select at most {settings.BULK_TASK_MAX_SELECTION} tasks at a time.')
+    return task_ids
+
+
+def permitted_tasks(user, action):
+    """
+    The rules of update_task and delete_task as one filter: the assignor or
+    assignee may change a task, only the assignor may delete it.
+    """
+    if action == 'delete':
+        return Q(assignor=user)
+    return Q(assignor=user) | Q(assignee=user)
+
+
+def bulk_update_tasks(user, task_ids, form):
+    """
+    Apply the change of a valid BulkTaskForm to ``task_ids`` and return the
+    number of tasks changed.
+
+    In one transaction, the selected tasks the user may change are read in a
+    single query and, if that is all of them, changed with a single UPDATE.
+    Otherwise nothing is changed and ``BulkTaskError`` is raised. Deleting
+    leaves tombstones, as Task.delete does. Queryset updates send no
+    signals, so the cache versions of every affected user are bumped here.
+    """
+    action = form.cleaned_data['action']
+    with transaction.atomic():
+        rows = list(Task.objects.select_for_update().filter(
+            permitted_tasks(user, action), pk__in=task_ids
+        ).values_list('pk', 'assignor_id', 'assignee_id'))
+        if len(rows) != len(task_ids):
+            verb = 'delete' if action == 'delete' else 'change'
+            raise BulkTaskError(
+                f'You are not authorized to {verb} {len(task_ids) - len(rows)} of the selected tasks.'
+            )
+        changes = form.changes()
+        updated = Task.objects.filter(pk__in=task_ids).update(updated_at=timezone.now(), **changes)
+
+        owners = {owner for _pk, assignor_id, assignee_id in rows for owner in (assignor_id, assignee_id)}
+        if 'assignee' in changes:
+            owners.add(changes['assignee'].pk)
+        invalidate('tasks', owners)
+    return updated
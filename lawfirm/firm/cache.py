@@ -0,0 +1,131 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+FIRM_WIDE = 'firm'
+
+
+def version_key(scope, owner):
+    return f'firm:version:{scope}:{owner}'
+
+
+def new_version():
+    # Seeded from the clock so a version key that was evicted from the cache
+    # restarts above every value it could have held before.
+    return time.time_ns()
+
+
+def get_versions(*scopes):
+    """
+    Return the current data version for each ``(scope, owner)`` pair.
+
+    Versions live in the cache itself, so every app node sharing the cache
+    sees the same values. Missing versions are created on first read.
+    """
+    keys = [version_key(scope, owner) for scope, owner in scopes]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, new_version(), timeout=None)
+        # Re-read so a version added concurrently by another node wins.
+        found.update(cache.get_many(missing))
+    return [found.get(key, 0) for key in keys]
+
+
+def bump_version(scope, owner):
+    """
+    Invalidate every cache entry built from ``(scope, owner)`` data.
+    """
+    key = version_key(scope, owner)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, new_version(), timeout=None)
+
+
+def cache_keys(entries):
+    """
+    The cache key of each entry of ``cached_many``: its name and the current
+    versions of its scopes, read in one round trip.
+    """
+    all_scopes = []
+    for scopes, _builder in entries.values():
+        all_scopes.extend(scope for scope in scopes if scope not in all_scopes)
+    versions = dict(zip(all_scopes, get_versions(*all_scopes)))
+
+    keys = {}
+    for name, (scopes, _builder) in entries.items():
+        parts = [f'{scope}.{owner}.{versions[(scope, owner)]}' for scope, owner in scopes]
+        keys[name] = f'firm:cached:{name}:' + ':'.join(parts)
+    return keys
+
+
+def cached_many(entries, timeout=None, keys=None):
+    """
+    Fetch several versioned values in two cache round trips.
+
+    ``entries`` maps a name to ``(scopes, builder)``. Each value is cached
+    under a key made of its name and the versions of its scopes, and
+    ``builder`` is only called when that key is missing. ``keys`` may pass
+    in keys already read with ``cache_keys``.
+    """
+    if timeout is None:
+        timeout = settings.DASHBOARD_CACHE_TIMEOUT
+    if keys is None:
+        keys = cache_keys(entries)
+
+    found = cache.get_many(keys.values())
+    values, to_store = {}, {}
+    for name, (_scopes, builder) in entries.items():
+        key = keys[name]
+        if key in found:
+            values[name] = found[key]
+        else:
+            values[name] = to_store[key] = builder()
+    if to_store:
+        cache.set_many(to_store, timeout)
+    return values
+
+
+class CachedPanels:
+    """
+    ``cached_many`` deferred until a value is first read.
+
+    The keys are read up front and double as the keys of the template
+    fragments rendered from each value (``{% cache ... panels.keys.name %}``),
+    so a fragment is invalidated by the same version bumps as its data, and
+    a page whose fragments are all cached never fetches the values at all.
+    """
+
+    def __init__(self, entries, timeout=None):
+        self.entries = entries
+        self.timeout = timeout
+        self.keys = cache_keys(entries)
+        self._values = None
+
+    def __getitem__(self, name):
+        if self._values is None:
+            self._values = cached_many(self.entries, self.timeout, self.keys)
+        return self._values[name]
+
+    def lazy(self, name, item=None):
+        """A template value reading ``name`` (or its ``item``) when rendered."""
+        if item is None:
+            return SimpleLazyObject(lambda: self[name])
+        return SimpleLazyObject(lambda: self[name][item])
+
+
+def versions_etag(scopes, *parts):
+    """
+    Build a strong ETag from the current versions of ``scopes`` and any
+    other ``parts`` the response depends on.
+
+    Only the cache is read, so a matching If-None-Match can be answered
+    without querying the rows behind the response.
+    """
+    text = '|'.join(str(part) for part in [*get_versions(*scopes), *parts])
+    return '"%s"' % hashlib.sha256(text.encode()).hexdigest()[:32]
@@ -0,0 +1,119 @@
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import FIRM_WIDE, get_versions
+from .models import User
+
+# Roles each role may assign tasks to; None means any role. Roles missing
+# here cannot assign tasks.
+ASSIGNEE_ROLES = {
+    'lawyer': None,
+    'secretary': ('attache', 'legal_assistant'),
+}
+
+ROLE_LABELS = dict(User.ROLE_CHOICES)
+
+
+def assignee_queryset(assignor):
+    """
+    Users ``assignor`` may assign tasks to, for validating TaskForm. Like
+    the directory, it leaves out inactive users.
+    """
+    if assignor.role not in ASSIGNEE_ROLES:
+        return User.objects.none()
+    roles = ASSIGNEE_ROLES[assignor.role]
+    if roles is None:
+        return User.objects.filter(is_active=True).exclude(pk=assignor.pk)
+    return User.objects.filter(is_active=True, role__in=roles)
+
+
+class UserDirectory:
+    """
+    Active users indexed for prefix search on their username, first name,
+    last name and full name.
+
+    Search terms are kept in one sorted list, so a prefix is found by
+    bisection and its matches are the entries that follow.
+    """
+    __slots__ = ('users', 'terms', 'term_users')
+
+    def __init__(self, rows):
+        # id -> (label, role)
+        self.users = {}
+        entries = set()
+        for pk, username, first_name, last_name, role in rows:
+            full_name = f'{first_name} {last_name}'.strip()
+            self.users[pk] = (f'{full_name or username} ({ROLE_LABELS.get(role, role)})', role)
+            for term in (username, first_name, last_name, full_name):
+                if term:
+                    entries.add((term.casefold(), pk))
+        entries = sorted(entries)
+        self.terms = [term for term, _pk in entries]
+        self.term_users = [pk for _term, pk in entries]
+
+    def label(self, pk):
+        user = self.users.get(pk)
+        return user[0] if user else ''
+
+    def search(self, prefix, roles=None, exclude=None, limit=20):
+        """
+        Return up to ``limit`` ``(id, label, role)`` of users with a term
+        starting with ``prefix``, ordered by the matching term. ``roles``
+        restricts the roles matched; None matches any.
+        """
+        prefix = prefix.strip().casefold()
+        results, seen = [], {exclude}
+        index = bisect_left(self.terms, prefix)
+        while index < len(self.terms) and len(results) < limit:
+            if not self.terms[index].startswith(prefix):
+                break
+            pk = self.term_users[index]
+            index += 1
+            if pk in seen:
+                continue
+            seen.add(pk)
+            label, role = self.users[pk]
+            if roles is None or role in roles:
+                results.append((pk, label, role))
+        return results
+
+    def search_assignees(self, assignor, prefix, limit=20):
+        """Prefix matches among the users ``assignor`` may assign tasks to."""
+        if assignor.role not in ASSIGNEE_ROLES:
+            return []
+        return self.search(prefix, ASSIGNEE_ROLES[assignor.role], assignor.pk, limit)
+
+
+def build_directory():
+    return UserDirectory(
+        User.objects.filter(is_active=True).values_list(
+            'pk', 'username', 'first_name', 'last_name', 'role'
+        )
+    )
+
+
+# (version, directory) of the last directory used by this process
+_loaded = (None, None)
+
+
+def get_directory():
+    """
+    The user directory, rebuilt only after User rows change.
+
+    The built directory is shared through the cache under the 'users'
+    version; each process also keeps the last one it loaded, so a lookup
+    normally costs one cache read for the version.
+    """
+    global _loaded
+    version, = get_versions(('users', FIRM_WIDE))
+    if _loaded[0] == version:
+        return _loaded[1]
+    key = f'firm:directory:{version}'
+    directory = cache.get(key)
+    if directory is None:
+        directory = build_directory()
+        cache.set(key, directory, settings.USER_DIRECTORY_CACHE_TIMEOUT)
+    _loaded = (version, directory)
+    return directory
@@ -0,0 +1,139 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header
+
+from .storage import content_hash_from_name
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class RangeFile:
+    """
+    Read at most ``length`` bytes of an open file, starting at ``start``.
+    """
+
+    def __init__(self, handle, start, length):
+        handle.seek(start)
+        self.handle = handle
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.handle.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.handle.close()
+
+
+def document_etag(document, size):
+    """
+    Content-addressed files are named by their SHA-256, which makes a strong
+    ETag for free. Older files fall back to their name, size and mtime.
+    """
+    digest = content_hash_from_name(document.file.name)
+    if digest is None:
+        mtime = int(os.path.getmtime(document.file.path))
+        digest = f'{document.pk}-{size}-{mtime}'
+    return f'"{digest}"'
+
+
+def parse_range(header, size):
+    """
+    Return the inclusive ``(start, end)`` byte range requested by a Range
+    header, or ``None`` to send the whole file.
+
+    Only single ranges are honoured; servers may ignore multi-range requests
+    and answer with the full content.
+    """
+    match = RANGE_PATTERN.match((header or '').strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes.
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def sendfile_response(document, content_type):
+    """
+    Hand the transfer over to the front server. Range requests are then
+    answered by the front server itself.
+    """
+    response = HttpResponse(content_type=content_type)
+    backend = settings.DOCUMENT_SENDFILE_BACKEND
+    if backend == 'nginx':
+        response['X-Accel-Redirect'] = settings.DOCUMENT_SENDFILE_PREFIX + quote(document.file.name)
+    elif backend == 'apache':
+        response['X-Sendfile'] = document.file.path
+    else:
+        raise ValueError(f'Unknown DOCUMENT_SENDFILE_BACKEND {backend!r}.')
+    return response
+
+
+def serve_document(request, document, as_attachment=False):
+    """
+    Respond with a document's file, honouring If-None-Match and a single
+    byte Range. Callers are responsible for the permission check.
+    """
+    size = document.file.size
+    etag = document_etag(document, size)
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        return response
+
+    filename = document.filename()
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if settings.DOCUMENT_SENDFILE_BACKEND:
+        response = sendfile_response(document, content_type)
+    else:
+        byte_range = None
+        # A stale If-Range means the client's partial copy is outdated.
+        if request.headers.get('If-Range', etag) == etag:
+            try:
+                byte_range = parse_range(request.headers.get('Range'), size)
+            except RangeNotSatisfiable:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+
+        handle = document.file.storage.open(document.file.name, 'rb')
+        if byte_range is None:
+            response = FileResponse(handle, content_type=content_type)
+            response['Content-Length'] = size
+        else:
+            start, end = byte_range
+            response = FileResponse(
+                RangeFile(handle, start, end - start + 1), status=206, content_type=content_type
+            )
+            response['Content-Length'] = end - start + 1
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    return response
@@ -0,0 +1,112 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .recurrence import Occurrence, expand
+
+
+def parse_boundary(value):
+    """
+    Parse a FullCalendar range boundary into an aware datetime.
+
+    FullCalendar sends ISO 8601 values such as ``2025-03-30T00:00:00+03:00``
+    or plain dates. A ``+`` in an unencoded query string arrives as a space,
+    so it is restored before parsing.
+    """
+    value = value.strip().replace(' ', '+')
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date or datetime: {value!r}")
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_window(params):
+    """
+    Read the ``start``/``end`` window from request parameters.
+
+    Returns ``(None, None)`` when neither is given. Raises ``ValueError`` when
+    only one is given, either cannot be parsed or the window is empty.
+    """
+    start, end = params.get('start'), params.get('end')
+    if not start and not end:
+        return None, None
+    if not start or not end:
+        raise ValueError("Both 'start' and 'end' are required.")
+    start, end = parse_boundary(start), parse_boundary(end)
+    if end <= start:
+        raise ValueError("'end' must be after 'start'.")
+    return start, end
+
+
+def events_in_window(queryset, start, end):
+    """
+    Restrict a Calendar queryset to events overlapping ``[start, end)``.
+
+    Events ending exactly at ``start`` are left out, except zero-length
+    events such as deadlines that sit on the boundary. The predicate only
+    compares raw column values, so it can be served by the
+    ``(user, start_time, end_time)`` and ``(user, end_time, start_time)``
+    indexes on Calendar.
+    """
+    if start is None or end is None:
+        return queryset
+    return queryset.filter(
+        start_time__lt=end,
+        end_time__gte=start,
+    ).exclude(end_time=start, start_time__lt=start)
+
+
+def day_bounds(day):
+    """
+    Return the aware ``[day_start, day_end)`` datetimes of a calendar day
+    in the current time zone.
+    """
+    day_start = timezone.make_aware(datetime.combine(day, time.min))
+    day_end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    return day_start, day_end
+
+
+def events_on_day(queryset, day):
+    """
+    Restrict a Calendar queryset to events touching ``day``, including
+    multi-day events that started earlier or end later.
+    """
+    return events_in_window(queryset, *day_bounds(day))
+
+
+def series_in_window(queryset, start, end):
+    """
+    Restrict a Calendar queryset to recurring series that may have
+    occurrences in ``[start, end)``.
+    """
+    return queryset.exclude(recurrence_rule='').filter(
+        Q(recurrence_end__isnull=True) | Q(recurrence_end__gte=start),
+        start_time__lt=end,
+    )
+
+
+def occurrences_in_window(queryset, start, end):
+    """
+    Return the :class:`~firm.recurrence.Occurrence` objects of a Calendar
+    queryset overlapping ``[start, end)``, sorted by start.
+
+    Single events come from the indexed overlap query; recurring series are
+    fetched as their master rows and expanded in memory for the window only.
+    """
+    singles = events_in_window(queryset.filter(recurrence_rule=''), start, end)
+    occurrences = [Occurrence(event, event.start_time, event.end_time) for event in singles]
+    for event in series_in_window(queryset, start, end):
+        occurrences.extend(expand(event, start, end))
+    occurrences.sort(key=lambda occurrence: (occurrence.start_time, occurrence.event.pk))
+    return occurrences
+
+
+def occurrences_on_day(queryset, day):
+    return occurrences_in_window(queryset, *day_bounds(day))
@@ -0,0 +1,114 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from .models import Calendar, Case, Diary, Task
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Exported models and their columns; related users are exported by username.
+# A recurring event is exported once, as its series, with its rule and the
+# cancelled occurrences (exdates); an overridden occurrence is a separate row
+# pointing at its series.
+EXPORTS = {
+    'cases': (Case, (
+        'id', 'case_number', 'client_name', 'description', 'case_type', 'status',
+        'lawyer__username', 'client_contact_info', 'initial_consultation_date',
+        'created_at', 'updated_at',
+    )),
+    'tasks': (Task, (
+        'id', 'title', 'description', 'assignor__username', 'assignee__username',
+        'status', 'priority', 'due_date', 'created_at',
+    )),
+    'events': (Calendar, (
+        'id', 'user__username', 'title', 'description', 'event_type', 'location',
+        'start_time', 'end_time', 'is_all_day', 'recurrence_rule', 'exdates',
+        'recurrence_parent_id', 'original_start',
+    )),
+    'diary': (Diary, (
+        'id', 'user__username', 'date', 'title', 'content', 'related_event_id',
+        'created_at', 'updated_at',
+    )),
+}
+
+
+def column_name(field):
+    """``lawyer__username`` is exported as ``lawyer``."""
+    return field.split('__')[0]
+
+
+def export_scope(kind, user):
+    if kind == 'cases':
+        return Q(lawyer=user) if user.role == 'lawyer' else Q()
+    if kind == 'tasks':
+        if user.role == 'attache':
+            return Q(assignee=user)
+        return Q(assignor=user) | Q(assignee=user)
+    return Q(user=user)
+
+
+def export_queryset(kind, user=None):
+    """
+    Rows of ``kind`` that ``user`` sees in the matching list view; everything
+    when ``user`` is ``None``.
+
+    Lawyers export their own cases, the other roles every case. Attaches
+    export the tasks assigned to them, the other roles the tasks they
+    assigned or were assigned. Events and diary entries are private.
+    """
+    model, _fields = EXPORTS[kind]
+    queryset = model.objects.all()
+    if user is not None:
+        queryset = queryset.filter(export_scope(kind, user))
+    # Ordering by primary key walks an index instead of sorting the export.
+    return queryset.order_by('pk')
+
+
+def export_rows(kind, queryset, chunk_size=None):
+    """
+    Iterate over the export's rows as tuples without caching the queryset.
+    """
+    _model, fields = EXPORTS[kind]
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    return queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def csv_lines(kind, rows):
+    _model, fields = EXPORTS[kind]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column_name(field) for field in fields])
+    yield buffer.getvalue()
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        # Lists such as exdates are written as JSON arrays
+        writer.writerow([json.dumps(value) if isinstance(value, list) else value for value in row])
+        yield buffer.getvalue()
+
+
+def ndjson_lines(kind, rows):
+    _model, fields = EXPORTS[kind]
+    columns = [column_name(field) for field in fields]
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_chunks(kind, format, user=None, chunk_size=None):
+    """
+    Yield the export as text chunks of ``chunk_size`` rows, so memory use does
+    not depend on the number of rows.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    rows = export_rows(kind, export_queryset(kind, user), chunk_size)
+    lines = csv_lines(kind, rows) if format == 'csv' else ndjson_lines(kind, rows)
+    while chunk := ''.join(islice(lines, chunk_size)):
+        yield chunk
@@ -0,0 +1,128 @@
+import hashlib
+import logging
+import os
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+from django.conf import settings
+from django.db import transaction
+
+from . import jobs, search
+from .models import Document, DocumentText
+from .storage import content_hash_from_name
+
+try:
+    # Optional: PDF text extraction is skipped when pypdf is not installed.
+    from pypdf import PdfReader
+except ImportError:  # pragma: no cover
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+class UnsupportedDocument(Exception):
+    pass
+
+
+def schedule_extraction(document):
+    """
+    Queue text extraction for a document as a background job, so it never
+    runs inside the upload request.
+    """
+    jobs.enqueue('documents.extract_text', document_id=document.pk)
+
+
+def file_hash(field_file):
+    digest = hashlib.sha256()
+    with field_file.open('rb') as handle:
+        for chunk in handle.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def pdf_pages(handle):
+    """
+    Yield the text of a PDF one page at a time, so only the current page's
+    text is held in memory.
+    """
+    if PdfReader is None:
+        raise UnsupportedDocument("pypdf is not installed.")
+    for page in PdfReader(handle).pages:
+        yield page.extract_text() or ''
+
+
+def docx_paragraphs(handle):
+    """
+    Yield the paragraphs of a DOCX file by stream-parsing its XML body.
+    """
+    with zipfile.ZipFile(handle) as archive:
+        with archive.open('word/document.xml') as body:
+            parts = []
+            for _event, element in iterparse(body):
+                if element.tag == WORD_NAMESPACE + 't' and element.text:
+                    parts.append(element.text)
+                elif element.tag == WORD_NAMESPACE + 'p':
+                    if parts:
+                        yield ''.join(parts)
+                    parts = []
+                    element.clear()
+
+
+EXTRACTORS = {
+    '.pdf': pdf_pages,
+    '.docx': docx_paragraphs,
+}
+
+
+def extract_text(field_file, max_chars):
+    """
+    Extract up to ``max_chars`` characters of text from a stored file.
+    """
+    ext = os.path.splitext(field_file.name)[1].lower()
+    extractor = EXTRACTORS.get(ext)
+    if extractor is None:
+        raise UnsupportedDocument(f"No text extractor for {ext or 'files without extension'}.")
+
+    parts, length = [], 0
+    with field_file.open('rb') as handle:
+        for part in extractor(handle):
+            parts.append(part[:max_chars - length])
+            length += len(parts[-1])
+            if length >= max_chars:
+                break
+    return '\n'.join(parts)
+
+
+@jobs.register('documents.extract_text', max_attempts=3)
+def extract_document_text(document_id):
+    """
+    Extract and index the text of one document.
+
+    Files whose SHA-256 matches the last extraction are skipped.
+    """
+    document = Document.objects.filter(pk=document_id).first()
+    if document is None or not document.file:
+        return None
+
+    # Content-addressed files carry their hash in the name.
+    content_hash = content_hash_from_name(document.file.name) or file_hash(document.file)
+    existing = DocumentText.objects.filter(document=document).first()
+    if existing is not None and existing.content_hash == content_hash:
+        return existing
+
+    result = DocumentText(document=document, content_hash=content_hash)
+    try:
+        result.text = extract_text(document.file, settings.DOCUMENT_TEXT_MAX_CHARS)
+        result.status = 'done'
+    except UnsupportedDocument as error:
+        result.status, result.error = 'unsupported', str(error)
+    except Exception as error:
+        logger.warning("Could not extract text from document %s: %s", document_id, error)
+        result.status, result.error = 'failed', str(error)
+
+    with transaction.atomic():
+        result.save()
+        search.index_instance(document)
+    return result
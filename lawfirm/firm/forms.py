@@ -1,11 +1,34 @@
 from django import forms
+from django.conf import settings
 from django.contrib.auth import get_user_model, authenticate
+from django.template.defaultfilters import filesizeformat
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from .directory import assignee_queryset, get_directory
 from .models import Diary, Calendar, Task, Case, Document
+from .recurrence import RecurrenceRule
+from .scheduling import find_conflicts
 import os
 
 User = get_user_model()
 
+ALLOWED_DOCUMENT_EXTENSIONS = ['.pdf', '.doc', '.docx']
+
+
+def validate_document_upload(name, size):
+    """
+    Apply the document type and size rules shared by every upload path.
+    """
+    ext = os.path.splitext(name)[1].lower()
+    if ext not in ALLOWED_DOCUMENT_EXTENSIONS:
+        raise ValidationError("Only PDF, DOC, and DOCX files are allowed.")
+    if size > settings.DOCUMENT_MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            f"File size must be under {filesizeformat(settings.DOCUMENT_MAX_UPLOAD_SIZE)}."
+        )
+
 class UserCreationForm(forms.ModelForm):
     """
     Form for creating new users in the legal practice management system.
@@ -147,17 +170,98 @@ class DiaryEntryForm(forms.ModelForm):
             raise ValidationError("Diary entry must be at least 10 characters long.")
         return content
 
+# Overlapping events listed in a CalendarEventForm error
+MAX_REPORTED_CONFLICTS = 5
+
+
 class CalendarEventForm(forms.ModelForm):
+    """
+    Form for calendar events. When created with ``user``, events that would
+    overlap the user's other events are rejected unless ``allow_overlap``
+    is ticked.
+    """
+    allow_overlap = forms.BooleanField(
+        required=False,
+        label="Allow overlapping events",
+        help_text="Save even if this overlaps another of your events."
+    )
+
     class Meta:
         model = Calendar
-        fields = ['title', 'description','start_time', 'end_time', 'event_type', 'location', 'is_all_day']
+        fields = ['title', 'description','start_time', 'end_time', 'event_type', 'location', 'is_all_day', 'recurrence_rule']
         widgets = {
             'start_time': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
             'end_time': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_time, end_time = cleaned_data.get('start_time'), cleaned_data.get('end_time')
+        if start_time and end_time and end_time < start_time:
+            raise ValidationError("The event cannot end before it starts.")
+        rule = cleaned_data.get('recurrence_rule')
+        if rule and start_time and not RecurrenceRule.parse(rule).repeats(timezone.localtime(start_time).date()):
+            self.add_error('recurrence_rule', "This rule never repeats after the first occurrence.")
+        if self.user is None or cleaned_data.get('allow_overlap') or self.errors:
+            return cleaned_data
+
+        event = Calendar(
+            pk=self.instance.pk,
+            user=self.user,
+            start_time=start_time,
+            end_time=end_time,
+            is_all_day=cleaned_data.get('is_all_day', False),
+            recurrence_rule=cleaned_data.get('recurrence_rule', ''),
+            exdates=self.instance.exdates,
+        )
+        conflicts = find_conflicts(event, Calendar.objects.filter(user=self.user))
+        if conflicts:
+            raise ValidationError([
+                ValidationError(
+                    "Overlaps with %(title)s (%(start)s - %(end)s).",
+                    params={
+                        'title': existing.title,
+                        'start': timezone.localtime(existing.start_time).strftime('%b %d, %H:%M'),
+                        'end': timezone.localtime(existing.end_time).strftime('%b %d, %H:%M'),
+                    },
+                    code='overlap',
+                )
+                for _candidate, existing in conflicts[:MAX_REPORTED_CONFLICTS]
+            ])
+        return cleaned_data
+
+    def clean_recurrence_rule(self):
+        rule = self.cleaned_data.get('recurrence_rule', '').strip()
+        if not rule:
+            return ''
+        try:
+            return str(RecurrenceRule.parse(rule))
+        except ValueError as error:
+            raise ValidationError(str(error))
+
 
 
+class AssigneeAutocomplete(forms.Widget):
+    """
+    A search box completed from the assignee directory (firm.directory),
+    so the page does not list every user as an option.
+    """
+    template_name = 'firm/widgets/assignee_autocomplete.html'
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        try:
+            label = get_directory().label(int(value)) if value else ''
+        except (TypeError, ValueError):
+            label = ''
+        context['widget']['label'] = label
+        context['widget']['search_url'] = reverse('assignee_search_json')
+        return context
+
 class TaskForm(forms.ModelForm):
     """
     Form for creating tasks with role-based assignment restrictions.
@@ -166,19 +270,10 @@ class TaskForm(forms.ModelForm):
         assignor = kwargs.pop('assignor', None)
         super().__init__(*args, **kwargs)
 
-        # Dynamically filter assignees based on assignor's role
+        # Lawyers can assign to everyone else, secretaries to attachés and
+        # legal assistants, other roles to nobody
         if assignor:
-            if assignor.role == 'lawyer':
-                # Lawyer can assign to everyone
-                self.fields['assignee'].queryset = User.objects.exclude(username=assignor.username)
-            elif assignor.role == 'secretary':
-                # Secretary can assign to attache and legal assistant
-                self.fields['assignee'].queryset = User.objects.filter(
-                    role__in=['attache', 'legal_assistant']
-                )
-            else:
-                # Other roles cannot assign tasks
-                self.fields['assignee'].queryset = User.objects.none()
+            self.fields['assignee'].queryset = assignee_queryset(assignor)
 
     title = forms.CharField(
         max_length=200,
@@ -203,7 +298,7 @@ class TaskForm(forms.ModelForm):
     )
     assignee = forms.ModelChoiceField(
         queryset=User.objects.all(),
-        widget=forms.Select(attrs={
+        widget=AssigneeAutocomplete(attrs={
             'class': 'form-control'
         })
     )
@@ -269,17 +364,20 @@ class CaseForm(forms.ModelForm):
             case.lawyer = self.request.user
         
         if commit:
-            case.save()
-            
-            # Handle document uploads
-            if 'documents' in self.files:
-                for file in self.files.getlist('documents'):
-                    Document.objects.create(
-                        file=file,
-                        case=case,
-                        user=self.request.user,  # Now properly using request.user
-                        document_type='case_document'
-                    )
+            # The case, its documents and their follow-up jobs (text
+            # extraction) are committed together.
+            with transaction.atomic():
+                case.save()
+                
+                # Handle document uploads
+                if 'documents' in self.files:
+                    for file in self.files.getlist('documents'):
+                        Document.objects.create(
+                            file=file,
+                            case=case,
+                            user=self.request.user,  # Now properly using request.user
+                            document_type='case_document'
+                        )
         return case
 
 class DocumentUploadForm(forms.ModelForm):
@@ -290,7 +388,7 @@ class DocumentUploadForm(forms.ModelForm):
         widget=forms.ClearableFileInput(attrs={
             'class': 'form-control-file'
         }),
-        help_text="Upload PDF, DOC, or DOCX files (Max 10MB)"
+        help_text=f"Upload PDF, DOC, or DOCX files (Max {filesizeformat(settings.DOCUMENT_MAX_UPLOAD_SIZE)})"
     )
     document_type = forms.ChoiceField(
         choices=[
@@ -320,14 +418,7 @@ class DocumentUploadForm(forms.ModelForm):
     def clean_file(self):
         file = self.cleaned_data['file']
         
-        # File type validation
-        allowed_extensions = ['.pdf', '.doc', '.docx']
-        ext = os.path.splitext(file.name)[1].lower()
-        if ext not in allowed_extensions:
-            raise ValidationError("Only PDF, DOC, and DOCX files are allowed.")
-        
-        # File size validation (10MB max)
-        if file.size > 10 * 1024 * 1024:
-            raise ValidationError("File size must be under 10MB.")
+        # File type and size validation
+        validate_document_upload(file.name, file.size)
         
         return file
\ No newline at end of file
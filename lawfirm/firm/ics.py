@@ -0,0 +1,283 @@
+import zoneinfo
+from datetime import datetime, timedelta, timezone as datetime_timezone
+from functools import lru_cache
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from .cache import versions_etag
+from .models import Calendar
+from .recurrence import RecurrenceRule, excluded_starts
+
+CRLF = '\r\n'
+ICS_CONTENT_TYPE = 'text/calendar; charset=utf-8'
+PRODID = '-//Firm Management System//Calendar//EN'
+UID_DOMAIN = 'firm-management-system'
+# Bumped when the VEVENT layout changes, so cached fragments are rebuilt.
+FORMAT_VERSION = 2
+# The VTIMEZONE lists the time zone's offset changes from the year of the
+# first series in the feed to this many years ahead.
+VTIMEZONE_YEARS_AHEAD = 10
+
+
+def escape_text(value):
+    """Escape a TEXT value (RFC 5545, 3.3.11)."""
+    return (
+        (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\r', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    """
+    Terminate a content line, folding it into lines of at most 75 octets
+    without splitting a UTF-8 character (RFC 5545, 3.1).
+    """
+    if len(line.encode()) <= 75:
+        return line + CRLF
+    lines, current, size = [], '', 0
+    for char in line:
+        length = len(char.encode())
+        if size + length > 75:
+            lines.append(current)
+            current, size = ' ', 1
+        current += char
+        size += length
+    lines.append(current)
+    return CRLF.join(lines) + CRLF
+
+
+def format_utc(value):
+    return value.astimezone(datetime_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def format_offset(offset):
+    minutes = int(offset.total_seconds()) // 60
+    return f'{"-" if minutes < 0 else "+"}{abs(minutes) // 60:02d}{abs(minutes) % 60:02d}'
+
+
+def utc_offset(zone, instant):
+    return instant.astimezone(zone).utcoffset()
+
+
+def offset_changes(zone, start, end):
+    """
+    Yield ``(instant, offset before, offset after)`` for each UTC offset
+    change of ``zone`` between two UTC datetimes, found day by day and then
+    narrowed down to the second.
+    """
+    day = timedelta(days=1)
+    previous = utc_offset(zone, start)
+    while start < end:
+        offset = utc_offset(zone, start + day)
+        if offset != previous:
+            low, high = start, start + day
+            while high - low > timedelta(seconds=1):
+                middle = low + (high - low) / 2
+                if utc_offset(zone, middle) == previous:
+                    low = middle
+                else:
+                    high = middle
+            yield high, previous, offset
+            previous = offset
+        start += day
+
+
+@lru_cache(maxsize=16)
+def vtimezone(zone_name, first_year, last_year):
+    """
+    The VTIMEZONE of ``zone_name``: one observance per offset change from
+    ``first_year`` through ``last_year``, after an observance giving the
+    offset at the start of ``first_year``.
+    """
+    zone = zoneinfo.ZoneInfo(zone_name)
+    start = datetime(first_year, 1, 1, tzinfo=datetime_timezone.utc)
+    end = datetime(last_year + 1, 1, 1, tzinfo=datetime_timezone.utc)
+    lines = ['BEGIN:VTIMEZONE', f'TZID:{zone_name}']
+
+    def observance(instant, offset_from, offset_to):
+        local = instant.astimezone(zone)
+        kind = 'DAYLIGHT' if local.dst() else 'STANDARD'
+        lines.extend([
+            f'BEGIN:{kind}',
+            # The onset in the wall-clock time in effect before it
+            f'DTSTART:{(instant + offset_from).strftime("%Y%m%dT%H%M%S")}',
+            f'TZOFFSETFROM:{format_offset(offset_from)}',
+            f'TZOFFSETTO:{format_offset(offset_to)}',
+        ])
+        if local.tzname():
+            lines.append(f'TZNAME:{escape_text(local.tzname())}')
+        lines.append(f'END:{kind}')
+
+    offset = utc_offset(zone, start)
+    observance(start, offset, offset)
+    for instant, offset_from, offset_to in offset_changes(zone, start, end):
+        observance(instant, offset_from, offset_to)
+    lines.append('END:VTIMEZONE')
+    return ''.join(fold(line) for line in lines)
+
+
+def date_property(name, value, is_all_day, local=False):
+    """
+    A DTSTART/DTEND/EXDATE/RECURRENCE-ID line. All-day events use dates.
+    Series use local wall-clock time (``local``), which their recurrence
+    rule is expanded in, so their occurrences stay at the same hour across
+    daylight saving changes; the feed's VTIMEZONE defines that time zone.
+    """
+    if is_all_day:
+        return f'{name};VALUE=DATE:{timezone.localtime(value).strftime("%Y%m%d")}'
+    if local:
+        local_time = timezone.localtime(value).strftime('%Y%m%dT%H%M%S')
+        return f'{name};TZID={timezone.get_current_timezone_name()}:{local_time}'
+    return f'{name}:{format_utc(value)}'
+
+
+def render_event(event, overridden=()):
+    """
+    The VEVENT of a calendar event. A series is rendered once with its RRULE
+    and EXDATEs for its cancelled occurrences. An override is published
+    under its series' UID with a RECURRENCE-ID naming the occurrence it
+    replaces; ``overridden`` holds those occurrences' starts, which are
+    left out of the series' EXDATEs so clients apply the overrides.
+    """
+    end_time = event.end_time
+    if event.is_all_day:
+        # DTEND of an all-day event is the day after the last day.
+        end_time = max(end_time, event.start_time) + timedelta(days=1)
+    series = bool(event.recurrence_rule)
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:event-{event.recurrence_parent_id or event.pk}@{UID_DOMAIN}',
+    ]
+    if event.recurrence_parent_id:
+        lines.append(date_property('RECURRENCE-ID', event.original_start, event.is_all_day, local=True))
+    lines.extend([
+        f'DTSTAMP:{format_utc(event.updated_at)}',
+        f'CREATED:{format_utc(event.created_at)}',
+        f'LAST-MODIFIED:{format_utc(event.updated_at)}',
+        date_property('DTSTART', event.start_time, event.is_all_day, series),
+        date_property('DTEND', end_time, event.is_all_day, series),
+        f'SUMMARY:{escape_text(event.title)}',
+        f'CATEGORIES:{escape_text(event.get_event_type_display())}',
+    ])
+    if event.description:
+        lines.append(f'DESCRIPTION:{escape_text(event.description)}')
+    if event.location:
+        lines.append(f'LOCATION:{escape_text(event.location)}')
+    if series:
+        lines.append(f'RRULE:{RecurrenceRule.parse(event.recurrence_rule)}')
+        lines.extend(
+            date_property('EXDATE', start, event.is_all_day, local=True)
+            for start in sorted(excluded_starts(event) - set(overridden))
+        )
+    lines.append('END:VEVENT')
+    return ''.join(fold(line) for line in lines)
+
+
+def fragment_key(event, overrides=0):
+    # A series' VEVENT also depends on which of its occurrences are
+    # overridden; overrides are only added or removed along with an EXDATE
+    # change, or deleted, so counting them is enough.
+    return f'firm:ics:vevent:{FORMAT_VERSION}:{event.pk}:{event.updated_at.timestamp()}:{overrides}'
+
+
+def render_events(events):
+    """
+    VEVENTs of a batch of events. Each one is cached under the event's
+    ``updated_at``, so rebuilding a feed after a change only renders the
+    events that changed.
+    """
+    overridden = {}
+    series = [event.pk for event in events if event.recurrence_rule]
+    if series:
+        for parent_id, original_start in Calendar.objects.filter(
+            recurrence_parent__in=series, original_start__isnull=False,
+        ).values_list('recurrence_parent_id', 'original_start'):
+            overridden.setdefault(parent_id, set()).add(original_start)
+    keys = {fragment_key(event, len(overridden.get(event.pk, ()))): event for event in events}
+    found = cache.get_many(keys)
+    missing = {
+        key: render_event(event, overridden.get(event.pk, ()))
+        for key, event in keys.items() if key not in found
+    }
+    if missing:
+        cache.set_many(missing, settings.ICS_FEED_CACHE_TIMEOUT)
+        found.update(missing)
+    return ''.join(found[key] for key in keys)
+
+
+def feed_events(user):
+    """
+    The user's events for the feed: everything that has not ended more
+    than ICS_FEED_PAST_DAYS ago.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.ICS_FEED_PAST_DAYS)
+    return Calendar.objects.filter(user=user).filter(
+        Q(recurrence_rule='', end_time__gte=cutoff)
+        | (~Q(recurrence_rule='') & (Q(recurrence_end__isnull=True) | Q(recurrence_end__gte=cutoff)))
+    ).order_by('pk')
+
+
+def feed_etag(user):
+    """
+    Changes with the user's calendar version, and daily as past events
+    leave the feed. Checking it only reads the cache.
+    """
+    return versions_etag([('calendar', user.pk)], 'ics', FORMAT_VERSION, user.pk, timezone.localdate())
+
+
+def feed_cache_key(etag):
+    return 'firm:ics:feed:' + etag.strip('"')
+
+
+def render_feed(user):
+    """
+    Yield the user's feed in chunks of ICS_FEED_CHUNK_SIZE events, so large
+    calendars are streamed rather than built in memory.
+    """
+    name = f'{user.get_full_name() or user.username} - Firm calendar'
+    yield ''.join(fold(line) for line in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(name)}',
+        f'X-WR-TIMEZONE:{timezone.get_current_timezone_name()}',
+        f'REFRESH-INTERVAL;VALUE=DURATION:PT{settings.ICS_FEED_REFRESH_MINUTES}M',
+        f'X-PUBLISHED-TTL:PT{settings.ICS_FEED_REFRESH_MINUTES}M',
+    ])
+    first_series = feed_events(user).exclude(recurrence_rule='').aggregate(first=Min('start_time'))['first']
+    if first_series is not None:
+        # Series are written in local time, which clients need defined. A
+        # year of margin covers starts just before the first UTC new year.
+        yield vtimezone(
+            timezone.get_current_timezone_name(),
+            timezone.localtime(first_series).year - 1,
+            timezone.localdate().year + VTIMEZONE_YEARS_AHEAD,
+        )
+    events = feed_events(user).iterator(chunk_size=settings.ICS_FEED_CHUNK_SIZE)
+    while batch := list(islice(events, settings.ICS_FEED_CHUNK_SIZE)):
+        yield render_events(batch)
+    yield fold('END:VCALENDAR')
+
+
+def feed_chunks(user, cache_key):
+    """
+    Stream the feed and, once it has been sent in full, cache it under
+    ``cache_key`` unless it is larger than ICS_FEED_CACHE_MAX_SIZE.
+    """
+    parts, size = [], 0
+    for chunk in render_feed(user):
+        if parts is not None:
+            size += len(chunk)
+            if size <= settings.ICS_FEED_CACHE_MAX_SIZE:
+                parts.append(chunk)
+            else:
+                parts = None
+        yield chunk
+    if parts is not None:
+        cache.set(cache_key, ''.join(parts), settings.ICS_FEED_CACHE_TIMEOUT)
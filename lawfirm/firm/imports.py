@@ -0,0 +1,176 @@
+import csv
+import json
+from itertools import islice
+
+from django import forms
+from django.conf import settings
+from django.db import transaction
+
+from . import search
+from .cache import FIRM_WIDE
+from .forms import CaseForm
+from .models import Case, User
+from .signals import invalidate
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+# Columns of the error report written by write_error_report.
+ERROR_REPORT_FIELDS = ('line', 'case_number', 'errors')
+
+
+class CaseImportForm(CaseForm):
+    """
+    Validates one imported row with the same rules as CaseForm.
+
+    Uniqueness of ``case_number`` is not checked per row: the import looks
+    existing numbers up once per batch and skips them.
+    """
+    documents = None
+    status = forms.ChoiceField(choices=Case.STATUS_CHOICES, required=False)
+
+    class Meta(CaseForm.Meta):
+        fields = CaseForm.Meta.fields + [
+            'status', 'client_contact_info', 'initial_consultation_date'
+        ]
+
+    def clean_status(self):
+        return self.cleaned_data['status'] or 'open'
+
+    def validate_unique(self):
+        pass
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+
+    def add_error(self, line, case_number, messages):
+        self.errors.append((line, case_number or '', messages))
+
+
+def read_rows(stream, format):
+    """
+    Yield ``(line, row)`` pairs from a text stream without loading it whole.
+    A JSONL line that cannot be parsed is yielded with ``row`` set to the
+    error message.
+    """
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif format == 'jsonl':
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as error:
+                yield line, f'Invalid JSON: {error}'
+                continue
+            yield line, row if isinstance(row, dict) else 'Expected a JSON object.'
+    else:
+        raise ValueError(f'Unknown import format {format!r}; use one of {", ".join(IMPORT_FORMATS)}.')
+
+
+def form_errors(form):
+    return [
+        f'{field}: {message}' if field != '__all__' else message
+        for field, messages in form.errors.items() for message in messages
+    ]
+
+
+def import_batch(rows, lawyers, seen, result):
+    """
+    Validate and insert one batch of rows.
+
+    ``lawyers`` caches username lookups across batches and ``seen`` holds
+    the case numbers already handled in this import.
+    """
+    usernames = {
+        str(row.get('lawyer') or '').strip() for _line, row in rows if isinstance(row, dict)
+    } - set(lawyers) - {''}
+    if usernames:
+        found = dict(
+            User.objects.filter(username__in=usernames, role='lawyer').values_list('username', 'pk')
+        )
+        for username in usernames:
+            lawyers[username] = found.get(username)
+
+    numbers = {
+        str(row.get('case_number') or '').strip() for _line, row in rows if isinstance(row, dict)
+    }
+    existing = set(
+        Case.objects.filter(case_number__in=numbers).values_list('case_number', flat=True)
+    )
+
+    cases = []
+    for line, row in rows:
+        if not isinstance(row, dict):
+            result.add_error(line, '', [row])
+            continue
+        case_number = str(row.get('case_number') or '').strip()
+        if case_number in existing or case_number in seen:
+            # Imported before: re-running an import is a no-op.
+            result.skipped += 1
+            continue
+        form = CaseImportForm(data=row)
+        errors = [] if form.is_valid() else form_errors(form)
+        username = str(row.get('lawyer') or '').strip()
+        if not username:
+            errors.append('lawyer: This field is required.')
+        elif lawyers.get(username) is None:
+            errors.append(f'lawyer: No lawyer with username {username!r}.')
+        if errors:
+            result.add_error(line, case_number, errors)
+            continue
+        case = form.instance
+        case.lawyer_id = lawyers[username]
+        seen.add(case.case_number)
+        cases.append(case)
+
+    if not cases:
+        return
+    numbers = [case.case_number for case in cases]
+    with transaction.atomic():
+        # A concurrent import may have inserted some of these case numbers
+        # since the lookup above. Those rows are not ours: ignore_conflicts
+        # skips them and they are counted as skipped, not created.
+        before = set(Case.objects.filter(case_number__in=numbers).values_list('case_number', flat=True))
+        Case.objects.bulk_create(
+            [case for case in cases if case.case_number not in before], ignore_conflicts=True
+        )
+        # bulk_create skips save() signals, so index the new rows and
+        # invalidate cached case data here.
+        created = list(Case.objects.filter(case_number__in=numbers).exclude(case_number__in=before))
+        for case in created:
+            search.index_instance(case)
+        invalidate('cases', {case.lawyer_id for case in created} | {FIRM_WIDE})
+    result.created += len(created)
+    result.skipped += len(cases) - len(created)
+
+
+def import_cases(stream, format='csv', batch_size=None):
+    """
+    Import cases from a CSV or JSONL text stream.
+
+    Each row has the CaseForm fields, optionally ``status``,
+    ``client_contact_info`` and ``initial_consultation_date``, and the
+    ``lawyer``'s username. Rows whose case number already exists are
+    skipped, so an import can safely be re-run. Returns an
+    :class:`ImportResult`.
+    """
+    batch_size = batch_size or settings.CASE_IMPORT_BATCH_SIZE
+    result, lawyers, seen = ImportResult(), {}, set()
+    rows = read_rows(stream, format)
+    while batch := list(islice(rows, batch_size)):
+        import_batch(batch, lawyers, seen, result)
+    return result
+
+
+def write_error_report(result, stream):
+    writer = csv.writer(stream)
+    writer.writerow(ERROR_REPORT_FIELDS)
+    for line, case_number, messages in result.errors:
+        writer.writerow([line, case_number, '; '.join(messages)])
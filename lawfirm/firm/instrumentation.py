@@ -0,0 +1,102 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    """
+    Counts and times the queries run through it; installed on each database
+    connection with ``connection.execute_wrapper``.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_duration = 0.0
+        self.slowest_sql = ''
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            if duration >= self.slowest_duration:
+                self.slowest_duration = duration
+                self.slowest_sql = sql
+
+    def __str__(self):
+        text = f'{self.count} queries in {self.duration * 1000:.1f} ms'
+        if self.count:
+            text += f'; slowest {self.slowest_duration * 1000:.1f} ms: {self.slowest_sql}'
+        return text
+
+    def record(self):
+        """Install on every connection for the duration of a ``with`` block."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+
+def query_budget(url_name):
+    """The most queries QUERY_BUDGETS allows the view ``url_name``, or None."""
+    return settings.QUERY_BUDGETS.get(url_name)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record the number of queries, their total time and the slowest query of
+    each request.
+
+    The figures are logged to ``firm.instrumentation`` (at DEBUG, or WARNING
+    when the view's QUERY_BUDGETS entry is exceeded), attached to the
+    response as ``query_stats`` and, with QUERY_INSTRUMENTATION_HEADERS,
+    sent as ``X-Query-Count`` and ``Server-Timing`` headers. With
+    QUERY_BUDGETS_STRICT an exceeded budget raises QueryBudgetExceeded,
+    which fails the test that made the request.
+
+    Queries run while a streaming response is consumed happen after the
+    middleware returns and are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        with stats.record():
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        url_name = match.view_name if match else None
+        budget = query_budget(url_name)
+        over_budget = budget is not None and stats.count > budget
+        if over_budget:
+            logger.warning(
+                "%s %s (%s) exceeded its budget of %s queries: %s",
+                request.method, request.path, url_name, budget, stats,
+            )
+            if settings.QUERY_BUDGETS_STRICT:
+                raise QueryBudgetExceeded(
+                    f'{url_name} ran {stats.count} queries, over its budget of {budget}: {stats}'
+                )
+        else:
+            logger.debug("%s %s (%s): %s", request.method, request.path, url_name, stats)
+
+        response.query_stats = stats
+        if settings.QUERY_INSTRUMENTATION_HEADERS:
+            response['X-Query-Count'] = str(stats.count)
+            response['Server-Timing'] = f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"'
+        return response
@@ -0,0 +1,154 @@
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Handlers by job name, filled by the ``register`` decorator.
+REGISTRY = {}
+
+# Candidates read per claim attempt; another worker may win some of them.
+CLAIM_BATCH = 10
+
+
+def register(name, max_attempts=5, priority=0):
+    """
+    Register ``func`` as the handler for jobs called ``name``. The job's
+    payload is passed to it as keyword arguments.
+    """
+    def decorator(func):
+        REGISTRY[name] = (func, max_attempts, priority)
+        return func
+    return decorator
+
+
+def enqueue(name, priority=None, delay=None, **payload):
+    """
+    Queue a job. The row is written in the caller's transaction, so the job
+    only becomes visible to workers if that transaction commits.
+    """
+    if name not in REGISTRY:
+        raise KeyError(f'No job handler registered as {name!r}.')
+    _func, max_attempts, default_priority = REGISTRY[name]
+    run_at = timezone.now()
+    if delay:
+        run_at += delay
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        priority=default_priority if priority is None else priority,
+        max_attempts=max_attempts,
+        run_at=run_at,
+    )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def requeue_stale():
+    """
+    Put back jobs whose worker stopped without finishing them; returns how
+    many were requeued.
+
+    The lost run counted as an attempt, so a job that has used all of its
+    attempts is failed instead. Otherwise a job that kills its worker would
+    be retried forever.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status='running', locked_at__lt=now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT))
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', locked_by='', locked_at=None, finished_at=now,
+        last_error='The worker stopped before the job finished.',
+    )
+    if failed:
+        logger.error("%s stale jobs had no attempts left and failed permanently", failed)
+    return stale.update(status='queued', locked_by='', locked_at=None)
+
+
+def claim(worker):
+    """
+    Take the most urgent due job, or return ``None`` when there is none.
+
+    A job is claimed with a conditional update, so of several workers racing
+    for it exactly one sees its update succeed.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        status='queued', run_at__lte=now
+    ).order_by('-priority', 'run_at').values_list('pk', flat=True)[:CLAIM_BATCH]
+    for pk in candidates:
+        claimed = Job.objects.filter(pk=pk, status='queued').update(
+            status='running',
+            locked_by=worker,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def retry_delay(attempts):
+    """
+    Exponential backoff with a little jitter so failed jobs don't retry in
+    lockstep.
+    """
+    delay = min(settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_DELAY)
+    return timedelta(seconds=delay * random.uniform(1, 1.1))
+
+
+def run_job(job):
+    handler = REGISTRY.get(job.name)
+    try:
+        if handler is None:
+            raise KeyError(f'No job handler registered as {job.name!r}.')
+        handler[0](**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts and handler is not None:
+            job.status = 'queued'
+            job.run_at = timezone.now() + retry_delay(job.attempts)
+            logger.warning("Job %s (%s) failed, retrying at %s", job.pk, job.name, job.run_at)
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+            logger.error("Job %s (%s) failed permanently", job.pk, job.name)
+    else:
+        job.status = 'done'
+        job.finished_at = timezone.now()
+    job.locked_by, job.locked_at = '', None
+    job.save(update_fields=['status', 'run_at', 'last_error', 'finished_at', 'locked_by', 'locked_at'])
+    return job
+
+
+def work_one(worker):
+    """
+    Claim and run a single job. Returns ``False`` when no job was due.
+    """
+    job = claim(worker)
+    if job is None:
+        return False
+    run_job(job)
+    return True
+
+
+def run_pending():
+    """
+    Run due jobs in the current thread until none is left; returns how many
+    ran.
+    """
+    worker, processed = worker_name(), 0
+    while work_one(worker):
+        processed += 1
+    return processed
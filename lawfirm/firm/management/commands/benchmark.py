@@ -0,0 +1,78 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from firm.benchmark import ROLE_PAGES, compare, run_benchmark
+from firm.models import Calendar, Case, Diary, Document, Task, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every role's dashboard, calendar, list and detail pages through the "
+        "test client and report latency percentiles and queries per request. "
+        "Run `manage.py seed` first for a realistic dataset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Measured requests per page.')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per page made first.')
+        parser.add_argument('--role', action='append', choices=sorted(ROLE_PAGES), help='Only these roles.')
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every request.')
+        parser.add_argument('--label', default='', help='Name of this run in the saved results.')
+        parser.add_argument('--output', help='Save the results as JSON to this file.')
+        parser.add_argument('--compare', dest='baseline_path', help='Show the change from results saved by an earlier run.')
+
+    def handle(self, *args, requests, warmup, role, cold, label, output, baseline_path, **options):
+        if requests < 1 or warmup < 0:
+            raise CommandError('--requests must be positive and --warmup not negative.')
+        baseline = None
+        if baseline_path:
+            try:
+                with open(baseline_path, encoding='utf-8') as stream:
+                    baseline = json.load(stream)
+            except (OSError, ValueError) as error:
+                raise CommandError(f'Cannot read {baseline_path}: {error}')
+
+        started_at = timezone.now()
+        self.stdout.write(
+            f"{'role':<16} {'page':<28} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db ms':>7} {'queries':>8}"
+        )
+        results = run_benchmark(role, requests, warmup, cold, progress=self.write_result)
+
+        if baseline is not None:
+            self.stdout.write(f"\nChange from {baseline_path} ({baseline.get('label') or baseline.get('started_at')}):")
+            for result, previous in compare(results, baseline):
+                if previous is None:
+                    continue
+                change = (result['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100 if previous['p95_ms'] else 0
+                self.stdout.write(
+                    f"{result['role']:<16} {result['url_name']:<28} p95 {previous['p95_ms']:>8} -> "
+                    f"{result['p95_ms']:>8} ms ({change:+.0f}%), queries "
+                    f"{previous['queries_max']} -> {result['queries_max']}"
+                )
+
+        if output:
+            run = {
+                'label': label,
+                'started_at': started_at.isoformat(),
+                'database': connection.vendor,
+                'requests': requests,
+                'warmup': warmup,
+                'cold_cache': cold,
+                'rows': {
+                    model._meta.model_name: model.objects.count()
+                    for model in (User, Case, Task, Calendar, Diary, Document)
+                },
+                'results': results,
+            }
+            with open(output, 'w', encoding='utf-8') as stream:
+                json.dump(run, stream, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results saved to {output}.'))
+
+    def write_result(self, result):
+        self.stdout.write(
+            f"{result['role']:<16} {result['url_name']:<28} {result['p50_ms']:>8} {result['p95_ms']:>8} "
+            f"{result['p99_ms']:>8} {result['db_p50_ms']:>7} {result['queries_max']:>8}"
+        )
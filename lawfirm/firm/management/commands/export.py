@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from firm.exports import EXPORTS, EXPORT_FORMATS, export_chunks
+from firm.models import User
+
+
+class Command(BaseCommand):
+    help = 'Export cases, tasks, events or diary entries as CSV or NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument(
+            '--user',
+            help="Only export what this user's lists show; everything by default.",
+        )
+        parser.add_argument('--output', help='File to write; standard output by default.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE,
+            help='Rows fetched from the database at a time.',
+        )
+
+    def handle(self, *args, kind, format, user, output, chunk_size, **options):
+        if user is not None:
+            try:
+                user = User.objects.get(username=user)
+            except User.DoesNotExist:
+                raise CommandError(f'No user named {user!r}.')
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be positive.')
+
+        chunks = export_chunks(kind, format, user, chunk_size)
+        if output is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(output, 'w', newline='', encoding='utf-8') as stream:
+            for chunk in chunks:
+                stream.write(chunk)
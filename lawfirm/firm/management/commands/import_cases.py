@@ -0,0 +1,55 @@
+import os
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from firm.imports import IMPORT_FORMATS, import_cases, write_error_report
+
+
+class Command(BaseCommand):
+    help = 'Import cases from a CSV or JSONL file. Existing case numbers are skipped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for standard input.")
+        parser.add_argument(
+            '--format', choices=IMPORT_FORMATS,
+            help='Input format; guessed from the file extension by default.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.CASE_IMPORT_BATCH_SIZE,
+            help='Rows validated and inserted per transaction.',
+        )
+        parser.add_argument(
+            '--error-report',
+            help='Write rejected rows to this CSV file.',
+        )
+
+    def handle(self, *args, path, format, batch_size, error_report, **options):
+        if format is None:
+            format = os.path.splitext(path)[1].lstrip('.').lower()
+            if format not in IMPORT_FORMATS:
+                raise CommandError('Cannot guess the format; pass --format.')
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        if path == '-':
+            result = import_cases(sys.stdin, format, batch_size)
+        else:
+            try:
+                stream = open(path, newline='', encoding='utf-8-sig')
+            except OSError as error:
+                raise CommandError(error)
+            with stream:
+                result = import_cases(stream, format, batch_size)
+
+        if error_report:
+            with open(error_report, 'w', newline='', encoding='utf-8') as report:
+                write_error_report(result, report)
+        elif result.errors:
+            write_error_report(result, self.stderr)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.created} created, {result.skipped} already imported, '
+            f'{len(result.errors)} rejected.'
+        ))
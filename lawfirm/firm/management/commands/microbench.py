@@ -0,0 +1,82 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.test.utils import setup_databases, teardown_databases
+from django.utils import timezone
+
+from firm.microbench import MICROBENCHMARKS, find_regressions, run_microbenchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the serialization, form and template hot paths against a fixed '
+        'firm in a throwaway test database, report time and peak allocation '
+        'per call, and fail when either grew past the threshold since the '
+        'saved baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bench', action='append', choices=sorted(MICROBENCHMARKS), help='Only these benchmarks.')
+        parser.add_argument('--min-time', type=float, default=0.2, help='Least seconds per timed batch of calls.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed batches per benchmark.')
+        parser.add_argument(
+            '--baseline', dest='baseline_path', default=str(settings.MICROBENCH_BASELINE),
+            help='Baseline file to compare with or save to.',
+        )
+        parser.add_argument('--save-baseline', action='store_true', help='Save this run as the baseline.')
+        parser.add_argument(
+            '--threshold', type=float, default=settings.MICROBENCH_REGRESSION_THRESHOLD,
+            help='Growth over the baseline reported as a regression, e.g. 0.25 for 25%%.',
+        )
+
+    def handle(self, *args, bench, min_time, repeat, baseline_path, save_baseline, threshold, **options):
+        if min_time <= 0 or repeat < 1:
+            raise CommandError('--min-time and --repeat must be positive.')
+        baseline = None
+        if not save_baseline:
+            try:
+                with open(baseline_path, encoding='utf-8') as stream:
+                    baseline = json.load(stream)
+            except FileNotFoundError:
+                self.stdout.write(f'No baseline at {baseline_path}; run with --save-baseline to create one.')
+            except (OSError, ValueError) as error:
+                raise CommandError(f'Cannot read {baseline_path}: {error}')
+
+        started_at = timezone.now()
+        self.stdout.write(f"{'benchmark':<24} {'calls':>8} {'best us':>11} {'median us':>11} {'peak KiB':>9}")
+        # DEBUG would log every query, adding to the measured time and memory
+        with override_settings(DEBUG=False):
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                results = run_microbenchmarks(bench, min_time, repeat, progress=self.write_result)
+            finally:
+                teardown_databases(old_config, verbosity=0)
+
+        if save_baseline:
+            run = {'started_at': started_at.isoformat(), 'min_time': min_time, 'repeat': repeat, 'results': results}
+            with open(baseline_path, 'w', encoding='utf-8') as stream:
+                json.dump(run, stream, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {baseline_path}.'))
+            return
+        if baseline is None:
+            return
+
+        regressions = find_regressions(results, baseline, threshold)
+        for name, metric, before, after in regressions:
+            self.stdout.write(self.style.ERROR(
+                f'{name}: {metric} {before} -> {after} ({(after - before) / before * 100:+.0f}%)'
+            ))
+        if regressions:
+            raise CommandError(
+                f'{len(regressions)} measurements regressed by more than {threshold:.0%} '
+                f"since the baseline of {baseline['started_at']}."
+            )
+        self.stdout.write(self.style.SUCCESS(f'No regressions over {threshold:.0%} since the baseline.'))
+
+    def write_result(self, result):
+        self.stdout.write(
+            f"{result['name']:<24} {result['calls']:>8} {result['best_us']:>11} "
+            f"{result['median_us']:>11} {result['peak_kib']:>9}"
+        )
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from firm.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Permanently delete events and tasks soft-deleted before the sync retention period.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{purge_tombstones()} rows purged.')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from firm.uploads import purge_expired_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete expired chunked uploads and their temporary files.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{purge_expired_uploads()} uploads purged.')
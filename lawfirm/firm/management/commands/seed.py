@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from firm.seeding import SEED_PASSWORD, clear_seed, seed, seeded_users
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with a synthetic firm for development and benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lawyers', type=int, default=10)
+        parser.add_argument('--secretaries', type=int, default=3)
+        parser.add_argument('--legal-assistants', type=int, default=4)
+        parser.add_argument('--attaches', type=int, default=6)
+        parser.add_argument('--cases-per-lawyer', type=int, default=40)
+        parser.add_argument('--tasks-per-user', type=int, default=30, help='Tasks each assigning user creates.')
+        parser.add_argument('--events-per-user', type=int, default=80)
+        parser.add_argument('--diary-per-user', type=int, default=40)
+        parser.add_argument('--documents-per-case', type=float, default=1.0)
+        parser.add_argument('--seed', dest='random_seed', type=int, default=0, help='Random seed; the same seed gives the same firm.')
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete a previously seeded firm first.',
+        )
+
+    def handle(self, *args, lawyers, secretaries, legal_assistants, attaches, cases_per_lawyer,
+               tasks_per_user, events_per_user, diary_per_user, documents_per_case, random_seed,
+               clear, **options):
+        counts = {
+            'lawyer': lawyers,
+            'secretary': secretaries,
+            'legal_assistant': legal_assistants,
+            'attache': attaches,
+        }
+        numbers = [*counts.values(), cases_per_lawyer, tasks_per_user, events_per_user, diary_per_user]
+        if min(numbers) < 0 or documents_per_case < 0:
+            raise CommandError('Counts cannot be negative.')
+        if clear:
+            self.stdout.write(f'{clear_seed()} rows of the previous seed deleted.')
+        elif seeded_users().exists():
+            raise CommandError('The database already holds a seeded firm; pass --clear to replace it.')
+
+        created = seed(
+            counts, cases_per_lawyer, tasks_per_user, events_per_user, diary_per_user,
+            documents_per_case, random_seed,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Created ' + ', '.join(f'{count} {name}' for name, count in created.items()) + '.'
+        ))
+        self.stdout.write(f"Seeded users are named seed_<role>_<n> with password {SEED_PASSWORD!r}.")
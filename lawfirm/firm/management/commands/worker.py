@@ -0,0 +1,58 @@
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from firm import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs from the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.JOB_WORKER_CONCURRENCY,
+            help='Number of jobs to run at the same time.',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once no job is due instead of waiting for more.',
+        )
+
+    def handle(self, *args, concurrency, burst, **options):
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=self.run, args=(stop, burst), name=f'job-worker-{number}')
+            for number in range(max(1, concurrency))
+        ]
+        self.stdout.write(f'Starting {len(threads)} job worker thread(s).')
+        jobs.requeue_stale()
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(settings.JOB_POLL_INTERVAL)
+                if not burst:
+                    jobs.requeue_stale()
+                    close_old_connections()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping after the running jobs finish...')
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def run(self, stop, burst):
+        worker = jobs.worker_name()
+        try:
+            while not stop.is_set():
+                # Long-running threads must not hold on to broken or expired
+                # connections.
+                close_old_connections()
+                if not jobs.work_one(worker):
+                    if burst:
+                        break
+                    stop.wait(settings.JOB_POLL_INTERVAL)
+        finally:
+            connection.close()
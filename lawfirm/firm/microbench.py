@@ -0,0 +1,203 @@
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.utils import timezone
+
+from .events import occurrences_in_window
+from .forms import CaseForm, TaskForm
+from .models import Calendar, User
+from .seeding import seed
+from .views import dashboard_context, event_json, get_event_color
+
+# The fixed firm every micro-benchmark runs against: seeded with the same
+# counts and random seed each time, and without documents so no files are
+# written.
+FIXTURE_COUNTS = {'lawyer': 2, 'secretary': 1, 'legal_assistant': 1, 'attache': 2}
+FIXTURE_SIZES = {
+    'cases_per_lawyer': 20, 'tasks_per_user': 20, 'events_per_user': 120,
+    'diary_per_user': 20, 'documents_per_case': 0, 'random_seed': 0,
+}
+
+# Registered micro-benchmarks: name -> setup function. A setup function takes
+# the fixtures and returns the callable to time.
+MICROBENCHMARKS = {}
+
+
+def microbenchmark(name):
+    """Register the decorated setup function under ``name``."""
+    def register(setup):
+        MICROBENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def create_fixtures():
+    """
+    Seed the fixed firm and return the objects the benchmarks share.
+    """
+    seed(FIXTURE_COUNTS, **FIXTURE_SIZES)
+    lawyer = User.objects.filter(role='lawyer').order_by('pk').first()
+    start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=7)
+    return {
+        'lawyer': lawyer,
+        'attache': User.objects.filter(role='attache').order_by('pk').first(),
+        # Six weeks, the widest window FullCalendar asks for
+        'occurrences': occurrences_in_window(
+            Calendar.objects.filter(user=lawyer), start, start + timedelta(days=42),
+        ),
+    }
+
+
+@microbenchmark('event_json')
+def bench_event_json(fixtures):
+    occurrences = fixtures['occurrences']
+    return lambda: [event_json(occurrence) for occurrence in occurrences]
+
+
+@microbenchmark('get_event_color')
+def bench_get_event_color(fixtures):
+    return lambda: get_event_color('deadline')
+
+
+@microbenchmark('task_form.construct')
+def bench_task_form_construct(fixtures):
+    lawyer = fixtures['lawyer']
+    return lambda: TaskForm(assignor=lawyer)
+
+
+@microbenchmark('task_form.validate')
+def bench_task_form_validate(fixtures):
+    lawyer = fixtures['lawyer']
+    data = {
+        'title': 'File the witness statements',
+        'description': 'Before the mention date',
+        'due_date': timezone.localdate().isoformat(),
+        'assignee': fixtures['attache'].pk,
+    }
+    return lambda: TaskForm(data, assignor=lawyer).is_valid()
+
+
+@microbenchmark('case_form.construct')
+def bench_case_form_construct(fixtures):
+    return CaseForm
+
+
+@microbenchmark('case_form.validate')
+def bench_case_form_validate(fixtures):
+    data = {
+        'case_number': 'MB-0001',
+        'client_name': 'Wanjiru Holdings',
+        'description': 'Breach of a supply contract',
+        'case_type': 'corporate',
+    }
+    return lambda: CaseForm(data).is_valid()
+
+
+def dashboard_renderer(lawyer, **overrides):
+    request = RequestFactory().get('/')
+    request.user = lawyer
+    context = {**dashboard_context(lawyer), **overrides}
+    return lambda: render_to_string('dashboards/lawyer/dashboard.html', context, request)
+
+
+@microbenchmark('dashboard.render')
+def bench_dashboard_render(fixtures):
+    # Cached panel fragments expire at once, so every call renders them
+    return dashboard_renderer(fixtures['lawyer'], panel_cache_timeout=0)
+
+
+@microbenchmark('dashboard.render_cached')
+def bench_dashboard_render_cached(fixtures):
+    return dashboard_renderer(fixtures['lawyer'])
+
+
+def time_calls(function, min_time, repeat):
+    """
+    Time ``function`` like ``timeit``: find a number of calls taking at
+    least ``min_time`` seconds, time ``repeat`` batches of that many calls
+    and return ``(calls, seconds per call of each batch)``.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _call in range(number):
+            function()
+        if time.perf_counter() - start >= min_time:
+            break
+        number *= 2
+    timings = []
+    for _batch in range(repeat):
+        start = time.perf_counter()
+        for _call in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return number, timings
+
+
+def peak_allocation(function, repeat):
+    """
+    The median over ``repeat`` calls of the most memory ``function`` had
+    allocated at once during a call, in bytes, as traced by tracemalloc.
+    """
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _call in range(repeat):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            function()
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return statistics.median(peaks)
+
+
+def run_microbenchmarks(names=None, min_time=0.2, repeat=5, progress=None):
+    """
+    Create the fixtures and measure each micro-benchmark of ``names`` (all
+    of them by default), returning per-call times in microseconds and peak
+    allocations in KiB.
+
+    The benchmarks write to the database, so run this against a test
+    database (``manage.py microbench`` creates one).
+    """
+    fixtures = create_fixtures()
+    results = []
+    for name in names or MICROBENCHMARKS:
+        function = MICROBENCHMARKS[name](fixtures)
+        # The first call fills caches and evaluates lazy querysets
+        function()
+        calls, timings = time_calls(function, min_time, repeat)
+        result = {
+            'name': name,
+            'calls': calls,
+            'best_us': round(min(timings) * 1e6, 3),
+            'median_us': round(statistics.median(timings) * 1e6, 3),
+            'peak_kib': round(peak_allocation(function, repeat) / 1024, 2),
+        }
+        results.append(result)
+        if progress:
+            progress(result)
+    return results
+
+
+def find_regressions(results, baseline, threshold):
+    """
+    Compare ``results`` with a saved ``baseline`` run and return
+    ``(name, metric, before, after)`` for each best time or peak allocation
+    that grew by more than ``threshold`` (0.25 for 25%).
+    """
+    previous = {result['name']: result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get(result['name'])
+        if before is None:
+            continue
+        for metric in ('best_us', 'peak_kib'):
+            if before[metric] and result[metric] > before[metric] * (1 + threshold):
+                regressions.append((result['name'], metric, before[metric], result[metric]))
+    return regressions
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('firm', '0004_calendar_is_all_day'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calendar',
+            index=models.Index(fields=['user', 'start_time', 'end_time'], name='calendar_user_window_idx'),
+        ),
+    ]
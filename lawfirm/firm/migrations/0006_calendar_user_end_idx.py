@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('firm', '0005_calendar_user_window_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calendar',
+            index=models.Index(fields=['user', 'end_time', 'start_time'], name='calendar_user_end_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+from django.db import migrations
+
+# Full-text search index over cases, diary entries and documents.
+#
+# SQLite: one FTS5 table per model whose rowid is the model's primary key,
+# kept in sync by firm.signals.
+# PostgreSQL: GIN indexes over the same to_tsvector() expressions used by
+# firm.search, maintained by the database itself.
+
+SOURCES = [
+    ('firm_case', 'firm_case_fts', ('client_name', 'description')),
+    ('firm_diary', 'firm_diary_fts', ('title', 'content')),
+    ('firm_document', 'firm_document_fts', ('description',)),
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, fts_table, columns in SOURCES:
+        texts = [f"coalesce({column}, '')" for column in columns]
+        if vendor == 'sqlite':
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {fts_table} USING fts5("
+                f"{', '.join(columns)}, tokenize='porter unicode61')"
+            )
+            schema_editor.execute(
+                f"INSERT INTO {fts_table} (rowid, {', '.join(columns)}) "
+                f"SELECT id, {', '.join(texts)} FROM {table}"
+            )
+        elif vendor == 'postgresql':
+            document = " || ' ' || ".join(texts)
+            schema_editor.execute(
+                f"CREATE INDEX {table}_search_idx ON {table} "
+                f"USING GIN (to_tsvector('english', {document}))"
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, fts_table, _columns in SOURCES:
+        if vendor == 'sqlite':
+            schema_editor.execute(f"DROP TABLE IF EXISTS {fts_table}")
+        elif vendor == 'postgresql':
+            schema_editor.execute(f"DROP INDEX IF EXISTS {table}_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('firm', '0007_list_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
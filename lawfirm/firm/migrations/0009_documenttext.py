@@ -0,0 +1,65 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Extracted document text joins the search index: on SQLite the document
+# FTS5 table gains a content column, on PostgreSQL the text gets its own
+# GIN index.
+
+def add_text_to_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS firm_document_fts")
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE firm_document_fts USING fts5("
+            "description, content, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO firm_document_fts (rowid, description, content) "
+            "SELECT id, coalesce(description, ''), '' FROM firm_document"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX firm_documenttext_search_idx ON firm_documenttext "
+            "USING GIN (to_tsvector('english', coalesce(text, '')))"
+        )
+
+
+def remove_text_from_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS firm_document_fts")
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE firm_document_fts USING fts5("
+            "description, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO firm_document_fts (rowid, description) "
+            "SELECT id, coalesce(description, '') FROM firm_document"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS firm_documenttext_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('firm', '0008_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentText',
+            fields=[
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='extracted_text', serialize=False, to='firm.document')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('text', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('done', 'Done'), ('unsupported', 'Unsupported'), ('failed', 'Failed')], default='done', max_length=20)),
+                ('error', models.TextField(blank=True)),
+                ('extracted_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(add_text_to_search_index, remove_text_from_search_index),
+    ]
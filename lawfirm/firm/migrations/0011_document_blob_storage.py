@@ -0,0 +1,35 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:08
+
+import os
+
+import firm.storage
+from django.db import migrations, models
+
+
+def backfill_original_filenames(apps, schema_editor):
+    Document = apps.get_model('firm', 'Document')
+    for document in Document.objects.filter(original_filename='').only('pk', 'file').iterator():
+        Document.objects.filter(pk=document.pk).update(
+            original_filename=os.path.basename(document.file.name)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('firm', '0010_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='original_filename',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='file',
+            field=models.FileField(db_index=True, max_length=255, storage=firm.storage.get_document_storage, upload_to='documents/%Y/%m/%d/'),
+        ),
+        migrations.RunPython(backfill_original_filenames, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('firm', '0012_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendar',
+            name='exdates',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='calendar',
+            name='original_start',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='calendar',
+            name='recurrence_end',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='calendar',
+            name='recurrence_parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='overrides', to='firm.calendar'),
+        ),
+        migrations.AddField(
+            model_name='calendar',
+            name='recurrence_rule',
+            field=models.CharField(blank=True, help_text='iCalendar RRULE, e.g. FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10', max_length=200),
+        ),
+        migrations.AddIndex(
+            model_name='calendar',
+            index=models.Index(condition=models.Q(('recurrence_rule', ''), _negated=True), fields=['user', 'start_time', 'recurrence_end'], name='calendar_user_series_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:00
+
+import firm.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('firm', '0016_blob_lock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, default=firm.models.upload_expiry),
+        ),
+    ]
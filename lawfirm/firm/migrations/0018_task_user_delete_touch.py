@@ -0,0 +1,25 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:25
+
+import firm.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('firm', '0017_upload_expiry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='task',
+            name='assignee',
+            field=models.ForeignKey(null=True, on_delete=firm.models.SET_NULL_AND_TOUCH, related_name='received_tasks', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='assignor',
+            field=models.ForeignKey(null=True, on_delete=firm.models.SET_NULL_AND_TOUCH, related_name='assigned_tasks', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -1,9 +1,15 @@
+import secrets
 import uuid
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser, Group, Permission
+from django.dispatch import Signal
 from django.utils import timezone
 import os
-from datetime import date
+from datetime import date, timedelta
+from django.conf import settings
+
+from .recurrence import series_end
+from .storage import get_document_storage
 
 class User(AbstractUser):
     """
@@ -50,7 +56,80 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.username} - {self.get_role_display()}"
 
-class Calendar(models.Model):
+# Sent with the ``pks`` of rows a queryset turned into tombstones. No
+# instance is saved or deleted, so firm.signals listens for this to
+# invalidate the cached data of their owners.
+soft_deleted = Signal()
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+    def deletion_rows(self):
+        """
+        The live rows ``delete`` turns into tombstones.
+        """
+        return self.filter(deleted_at__isnull=True)
+
+    def delete(self):
+        """
+        Keep the rows as tombstones, like ``SoftDeleteModel.delete``, and
+        return what ``QuerySet.delete`` would.
+        """
+        pks = list(self.deletion_rows().values_list('pk', flat=True))
+        if pks:
+            now = timezone.now()
+            self.model.all_objects.filter(pk__in=pks).update(deleted_at=now, updated_at=now)
+            soft_deleted.send(sender=self.model, pks=pks)
+        return len(pks), {self.model._meta.label: len(pks)}
+
+
+class ActiveManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """
+    Hides soft-deleted rows.
+    """
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+def SET_NULL_AND_TOUCH(collector, field, sub_objs, using):
+    """
+    ``SET_NULL`` that also bumps ``updated_at``, so sync clients of the
+    other user on a row learn that the deleted user left it.
+    """
+    collector.add_field_update(field, None, sub_objs)
+    collector.add_field_update(field.model._meta.get_field('updated_at'), timezone.now(), sub_objs)
+
+
+class SoftDeleteModel(models.Model):
+    """
+    Rows are kept as tombstones when deleted, so sync clients (see
+    firm.sync) learn about deletions. ``objects`` hides them and its
+    querysets delete by leaving tombstones too; ``all_objects`` includes
+    them and deletes for good.
+    """
+    updated_at = models.DateTimeField(auto_now=True)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = ActiveManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        abstract = True
+
+    def delete(self, using=None, keep_parents=False):
+        self.deleted_at = timezone.now()
+        self.save(using=using, update_fields=['deleted_at', 'updated_at'])
+
+    def hard_delete(self, using=None, keep_parents=False):
+        return super().delete(using=using, keep_parents=keep_parents)
+
+class CalendarQuerySet(SoftDeleteQuerySet):
+    def deletion_rows(self):
+        # Overrides belong to their series.
+        series = self.values('pk')
+        return Calendar.objects.filter(models.Q(pk__in=series) | models.Q(recurrence_parent__in=series))
+
+
+class Calendar(SoftDeleteModel):
     """
     Calendar events for tracking appointments, meetings, and deadlines.
     """
@@ -80,13 +159,129 @@ class Calendar(models.Model):
     location = models.CharField(max_length=200, blank=True, null=True)
     is_all_day = models.BooleanField(default=False) 
     
+    # Recurrence: one row stands for a whole series (see firm.recurrence).
+    # start_time/end_time are those of the first occurrence.
+    recurrence_rule = models.CharField(
+        max_length=200,
+        blank=True,
+        help_text="iCalendar RRULE, e.g. FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10"
+    )
+    # End of the last occurrence; null for series without an end
+    recurrence_end = models.DateTimeField(null=True, blank=True, editable=False)
+    # Start times (ISO 8601) of cancelled or overridden occurrences
+    exdates = models.JSONField(default=list, blank=True)
+    # An override replaces the occurrence of its parent series that would
+    # have started at original_start
+    recurrence_parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        related_name='overrides',
+        null=True,
+        blank=True
+    )
+    original_start = models.DateTimeField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ActiveManager.from_queryset(CalendarQuerySet)()
+    all_objects = models.Manager()
+    
     class Meta:
         ordering = ['start_time']
+        indexes = [
+            # Change feed of the sync API on (updated_at, id)
+            models.Index(fields=['user', 'updated_at', 'id'], name='calendar_user_updated_idx'),
+            # Serves the date-window overlap queries of the calendar API
+            models.Index(fields=['user', 'start_time', 'end_time'], name='calendar_user_window_idx'),
+            # Lets day and window lookups range-scan on end_time instead
+            models.Index(fields=['user', 'end_time', 'start_time'], name='calendar_user_end_idx'),
+            # Finds a user's recurring series without touching single events
+            models.Index(
+                fields=['user', 'start_time', 'recurrence_end'],
+                condition=~models.Q(recurrence_rule=''),
+                name='calendar_user_series_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.start_time}"
+
+    def save(self, *args, **kwargs):
+        self.recurrence_end = series_end(self) if self.recurrence_rule else None
+        super().save(*args, **kwargs)
+
+    def delete(self, using=None, keep_parents=False):
+        # Overrides belong to their series.
+        for override in self.overrides.all():
+            override.delete(using=using)
+        super().delete(using=using, keep_parents=keep_parents)
+
+    def cancel_occurrence(self, original_start):
+        """
+        Remove the occurrence starting at ``original_start`` from the series.
+        """
+        value = original_start.isoformat()
+        if value not in self.exdates:
+            self.exdates = [*self.exdates, value]
+            self.save()
+
+    def override_occurrence(self, original_start, **changes):
+        """
+        Replace one occurrence of the series with a separate event, copied
+        from the series and updated with ``changes``.
+        """
+        with transaction.atomic():
+            self.cancel_occurrence(original_start)
+            override = Calendar(
+                user=self.user,
+                title=self.title,
+                description=self.description,
+                start_time=original_start,
+                end_time=original_start + (self.end_time - self.start_time),
+                event_type=self.event_type,
+                location=self.location,
+                is_all_day=self.is_all_day,
+                recurrence_parent=self,
+                original_start=original_start,
+            )
+            for field, value in changes.items():
+                setattr(override, field, value)
+            override.save()
+        return override
     
 
+def new_feed_key():
+    return secrets.token_urlsafe(32)
+
+class CalendarFeedToken(models.Model):
+    """
+    Secret key in the URL of a user's iCalendar subscription feed. Phone
+    calendars cannot log in, so the key is the credential; revoking it
+    stops the feed.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='calendar_feed_tokens'
+    )
+    key = models.CharField(max_length=64, unique=True, default=new_feed_key, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Calendar feed of {self.user.username}"
+
+    @property
+    def is_active(self):
+        return self.revoked_at is None
+
+    def revoke(self):
+        self.revoked_at = timezone.now()
+        self.save(update_fields=['revoked_at'])
+
 class Diary(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     date = models.DateField(default=date.today)
@@ -108,7 +303,7 @@ class Diary(models.Model):
     def __str__(self):
         return f"{self.title} - {self.date}"
 
-class Task(models.Model):
+class Task(SoftDeleteModel):
     """
     Tasks that can be assigned between different roles in the legal practice.
     """
@@ -124,13 +319,13 @@ class Task(models.Model):
     
     assignor = models.ForeignKey(
         User, 
-        on_delete=models.SET_NULL, 
+        on_delete=SET_NULL_AND_TOUCH,
         related_name='assigned_tasks',
         null=True
     )
     assignee = models.ForeignKey(
         User, 
-        on_delete=models.SET_NULL, 
+        on_delete=SET_NULL_AND_TOUCH,
         related_name='received_tasks',
         null=True
     )
@@ -157,6 +352,14 @@ class Task(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of task lists on (created_at, id)
+            models.Index(fields=['assignor', 'created_at', 'id'], name='task_assignor_created_idx'),
+            models.Index(fields=['assignee', 'created_at', 'id'], name='task_assignee_created_idx'),
+            # Change feed of the sync API on (updated_at, id)
+            models.Index(fields=['assignor', 'updated_at', 'id'], name='task_assignor_updated_idx'),
+            models.Index(fields=['assignee', 'updated_at', 'id'], name='task_assignee_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - Assigned to {self.assignee.username}"
@@ -226,6 +429,11 @@ class Case(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'Cases'
+        indexes = [
+            # Keyset pagination of case lists on (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='case_created_idx'),
+            models.Index(fields=['lawyer', 'created_at', 'id'], name='case_lawyer_created_idx'),
+        ]
     
     def __str__(self):
         return f"Case {self.case_number} - {self.client_name}"
@@ -249,9 +457,19 @@ class Document(models.Model):
         related_name='documents'
     )
     
+    # Stored once per distinct content and shared between documents with
+    # identical files; indexed to count a blob's references.
     file = models.FileField(
         upload_to='documents/%Y/%m/%d/',
-        max_length=255
+        storage=get_document_storage,
+        max_length=255,
+        db_index=True
+    )
+    
+    # Name of the file as uploaded; the stored name is its content hash
+    original_filename = models.CharField(
+        max_length=255,
+        blank=True
     )
     
     document_type = models.CharField(
@@ -282,5 +500,163 @@ class Document(models.Model):
     def __str__(self):
         return f"{self.document_type} - {self.file.name}"
 
+    def save(self, *args, **kwargs):
+        if self.file and not self.file._committed and not self.original_filename:
+            self.original_filename = os.path.basename(self.file.name)
+        # The blob written for a new file stays locked until this row commits.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def filename(self):
-        return os.path.basename(self.file.name)
\ No newline at end of file
+        return self.original_filename or os.path.basename(self.file.name)
+
+class Blob(models.Model):
+    """
+    A stored document blob. The row is only used as a lock between writing
+    and releasing the blob (see firm.storage.lock_blob).
+    """
+    name = models.CharField(max_length=255, primary_key=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+class DocumentText(models.Model):
+    """
+    Text extracted from an uploaded document in the background, used to
+    make its contents searchable.
+    """
+    STATUS_CHOICES = (
+        ('done', 'Done'),
+        ('unsupported', 'Unsupported'),
+        ('failed', 'Failed')
+    )
+
+    document = models.OneToOneField(
+        Document,
+        on_delete=models.CASCADE,
+        related_name='extracted_text',
+        primary_key=True
+    )
+    # SHA-256 of the file the text was extracted from
+    content_hash = models.CharField(max_length=64)
+    text = models.TextField(blank=True)
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='done'
+    )
+    error = models.TextField(blank=True)
+    extracted_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Text of {self.document_id} ({self.status})"
+
+
+
+def upload_expiry():
+    return timezone.now() + timedelta(hours=settings.DOCUMENT_UPLOAD_EXPIRY_HOURS)
+
+class UploadSession(models.Model):
+    """
+    A resumable, chunked document upload. Chunks are appended to a temporary
+    file until the upload is finalized into a Document.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions'
+    )
+    case = models.ForeignKey(
+        Case,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions'
+    )
+    filename = models.CharField(max_length=255)
+    document_type = models.CharField(
+        max_length=30,
+        choices=Document.DOCUMENT_TYPES,
+        default='case_document'
+    )
+    description = models.TextField(blank=True, null=True)
+
+    total_size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    # SHA-256 of the complete file, checked when the upload is finalized
+    checksum = models.CharField(max_length=64)
+    received_chunks = models.PositiveIntegerField(default=0)
+    received_bytes = models.PositiveBigIntegerField(default=0)
+
+    document = models.OneToOneField(
+        Document,
+        on_delete=models.SET_NULL,
+        related_name='upload_session',
+        null=True,
+        blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Pushed back with every chunk; expired sessions are purged with their
+    # temporary files (see `manage.py purge_uploads`)
+    expires_at = models.DateTimeField(default=upload_expiry, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Upload {self.id} - {self.filename}"
+
+    @property
+    def is_expired(self):
+        return not self.is_complete and self.expires_at <= timezone.now()
+
+    @property
+    def total_chunks(self):
+        return max(1, -(-self.total_size // self.chunk_size))
+
+    @property
+    def is_complete(self):
+        return self.document_id is not None
+
+class Job(models.Model):
+    """
+    A unit of background work stored in the database and run by
+    ``manage.py worker``. See firm.jobs.
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed')
+    )
+
+    # Name of the handler registered with firm.jobs.register
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    # Higher priorities are claimed first
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='queued'
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    # Not claimed before this time; pushed back after a failed attempt
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-priority', 'run_at']
+        indexes = [
+            # Claiming: due queued jobs, most urgent first
+            models.Index(fields=['status', '-priority', 'run_at'], name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
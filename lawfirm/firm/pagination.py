@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+CURSOR_SALT = 'firm.pagination.cursor'
+
+
+def encode_cursor(row, direction):
+    """
+    Build an opaque, tamper-proof token pointing just past ``row``.
+    """
+    return signing.dumps(
+        {'c': row.created_at.isoformat(), 'i': row.pk, 'd': direction},
+        salt=CURSOR_SALT,
+    )
+
+
+def decode_cursor(token):
+    """
+    Return ``(created_at, pk, direction)`` for a token, or ``None`` when the
+    token is missing or invalid so callers fall back to the first page.
+    """
+    if not token:
+        return None
+    try:
+        data = signing.loads(token, salt=CURSOR_SALT)
+        created_at = parse_datetime(data['c'])
+        pk, direction = int(data['i']), data['d']
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+    if created_at is None or direction not in ('next', 'previous'):
+        return None
+    return created_at, pk, direction
+
+
+def get_page_size(request):
+    default = settings.FIRM_PAGE_SIZE
+    try:
+        size = int(request.GET.get('page_size', default))
+    except ValueError:
+        return default
+    return max(1, min(size, settings.FIRM_MAX_PAGE_SIZE))
+
+
+class KeysetPage:
+    """
+    One page of rows ordered newest first on ``(created_at, id)``.
+    """
+
+    def __init__(self, items, request, has_next, has_previous, cursor_param):
+        self.items = items
+        self.request = request
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.cursor_param = cursor_param
+        self.next_cursor = encode_cursor(items[-1], 'next') if has_next else None
+        self.previous_cursor = encode_cursor(items[0], 'previous') if has_previous else None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _query(self, cursor):
+        params = self.request.GET.copy()
+        params[self.cursor_param] = cursor
+        return params.urlencode()
+
+    @property
+    def next_query(self):
+        return self._query(self.next_cursor) if self.has_next else ''
+
+    @property
+    def previous_query(self):
+        return self._query(self.previous_cursor) if self.has_previous else ''
+
+
+def paginate(queryset, request, cursor_param='cursor'):
+    """
+    Return the page of ``queryset`` addressed by the request's cursor.
+
+    Pages are selected with a ``(created_at, id)`` comparison instead of an
+    OFFSET, so every page costs one index range scan however deep it is.
+    ``?page_size=`` overrides ``FIRM_PAGE_SIZE`` up to ``FIRM_MAX_PAGE_SIZE``.
+    """
+    page_size = get_page_size(request)
+    cursor = decode_cursor(request.GET.get(cursor_param))
+
+    if cursor is None:
+        rows = list(queryset.order_by('-created_at', '-pk')[:page_size + 1])
+        has_more = len(rows) > page_size
+        return KeysetPage(rows[:page_size], request, has_more, False, cursor_param)
+
+    created_at, pk, direction = cursor
+    if direction == 'next':
+        rows = list(queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+        ).order_by('-created_at', '-pk')[:page_size + 1])
+        has_more = len(rows) > page_size
+        return KeysetPage(rows[:page_size], request, has_more, bool(rows), cursor_param)
+
+    rows = list(queryset.filter(
+        Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+    ).order_by('created_at', 'pk')[:page_size + 1])
+    has_more = len(rows) > page_size
+    items = rows[:page_size][::-1]
+    return KeysetPage(items, request, bool(items), has_more, cursor_param)
@@ -0,0 +1,17 @@
+def can_view_case(user, case):
+    """
+    Lawyers may only open their own cases; the other roles may open any case.
+    """
+    if user.role == 'lawyer':
+        return case.lawyer_id == user.pk
+    return True
+
+
+def can_view_document(user, document):
+    """
+    Documents are visible to their uploader and to anyone who may open the
+    case they belong to.
+    """
+    if document.user_id == user.pk:
+        return True
+    return document.case is not None and can_view_case(user, document.case)
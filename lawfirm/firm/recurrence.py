@@ -0,0 +1,320 @@
+import calendar
+import re
+from datetime import date, datetime, timedelta, timezone as datetime_timezone
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+# Series with COUNT are expanded from their first occurrence, so keep them
+# bounded.
+MAX_COUNT = 1000
+
+# Consecutive periods without a date after which a series is taken to have
+# ended. Valid rules go at most a few periods without one (a February 29th
+# repeats within eight years), but a rule such as a yearly-stepped
+# BYMONTHDAY=31 that only ever visits April never matches again.
+MAX_EMPTY_PERIODS = 100
+
+BYDAY_PATTERN = re.compile(r'^([+-]?\d{1,2})?(MO|TU|WE|TH|FR|SA|SU)$')
+
+
+class RecurrenceRule:
+    """
+    The subset of an iCalendar RRULE (RFC 5545) used by calendar events:
+    FREQ, INTERVAL, COUNT, UNTIL, BYDAY and BYMONTHDAY.
+
+    Dates are generated in local wall-clock time, so a weekly 9:00 meeting
+    stays at 9:00 across daylight saving changes.
+    """
+    __slots__ = ('freq', 'interval', 'count', 'until', 'byday', 'bymonthday')
+
+    def __init__(self, freq, interval=1, count=None, until=None, byday=(), bymonthday=()):
+        self.freq = freq
+        self.interval = interval
+        self.count = count
+        self.until = until
+        # (ordinal or None, weekday number) pairs; ordinals only for MONTHLY
+        self.byday = tuple(byday)
+        self.bymonthday = tuple(bymonthday)
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Parse ``FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10``-style text. Raises
+        ``ValueError`` for anything outside the supported subset.
+        """
+        parts = {}
+        for part in (text or '').strip().upper().removeprefix('RRULE:').split(';'):
+            if not part:
+                continue
+            name, sep, value = part.partition('=')
+            if not sep or not value or name in parts:
+                raise ValueError(f"Invalid recurrence rule part {part!r}.")
+            parts[name] = value
+
+        freq = parts.pop('FREQ', None)
+        if freq not in FREQUENCIES:
+            raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}.")
+        try:
+            interval = int(parts.pop('INTERVAL', 1))
+            count = int(parts.pop('COUNT')) if 'COUNT' in parts else None
+            bymonthday = [int(day) for day in parts.pop('BYMONTHDAY').split(',')] if 'BYMONTHDAY' in parts else []
+        except ValueError:
+            raise ValueError("INTERVAL, COUNT and BYMONTHDAY must be integers.")
+        if interval < 1:
+            raise ValueError("INTERVAL must be positive.")
+        if count is not None and not 1 <= count <= MAX_COUNT:
+            raise ValueError(f"COUNT must be between 1 and {MAX_COUNT}.")
+        if any(day == 0 or not -31 <= day <= 31 for day in bymonthday):
+            raise ValueError("BYMONTHDAY values must be between -31 and 31, excluding 0.")
+
+        until = None
+        if 'UNTIL' in parts:
+            until = parse_until(parts.pop('UNTIL'))
+        if count is not None and until is not None:
+            raise ValueError("COUNT and UNTIL cannot be combined.")
+
+        byday = []
+        for value in parts.pop('BYDAY').split(',') if 'BYDAY' in parts else []:
+            match = BYDAY_PATTERN.match(value)
+            if not match:
+                raise ValueError(f"Invalid BYDAY value {value!r}.")
+            ordinal = int(match.group(1)) if match.group(1) else None
+            if ordinal is not None and (freq != 'MONTHLY' or ordinal == 0 or not -5 <= ordinal <= 5):
+                raise ValueError(f"Unsupported BYDAY value {value!r}.")
+            byday.append((ordinal, WEEKDAYS.index(match.group(2))))
+        if bymonthday and freq != 'MONTHLY':
+            raise ValueError("BYMONTHDAY is only supported with FREQ=MONTHLY.")
+
+        if parts:
+            raise ValueError(f"Unsupported recurrence rule parts: {', '.join(sorted(parts))}.")
+        return cls(freq, interval, count, until, byday, bymonthday)
+
+    def __str__(self):
+        parts = [f'FREQ={self.freq}']
+        if self.interval != 1:
+            parts.append(f'INTERVAL={self.interval}')
+        if self.byday:
+            parts.append('BYDAY=' + ','.join(
+                f'{ordinal or ""}{WEEKDAYS[weekday]}' for ordinal, weekday in self.byday
+            ))
+        if self.bymonthday:
+            parts.append('BYMONTHDAY=' + ','.join(str(day) for day in self.bymonthday))
+        if self.count is not None:
+            parts.append(f'COUNT={self.count}')
+        if self.until is not None:
+            parts.append('UNTIL=' + self.until.astimezone(datetime_timezone.utc).strftime('%Y%m%dT%H%M%SZ'))
+        return ';'.join(parts)
+
+    def period_index(self, first, day):
+        """
+        Index of the period (counted in INTERVAL steps from ``first``) that
+        contains ``day``.
+        """
+        if self.freq == 'DAILY':
+            steps = (day - first).days
+        elif self.freq == 'WEEKLY':
+            week_start = first - timedelta(days=first.weekday())
+            steps = (day - timedelta(days=day.weekday()) - week_start).days // 7
+        elif self.freq == 'MONTHLY':
+            steps = (day.year - first.year) * 12 + day.month - first.month
+        else:
+            steps = day.year - first.year
+        return max(0, steps // self.interval)
+
+    def period_dates(self, first, index):
+        """
+        Candidate dates of period ``index``, sorted.
+        """
+        step = index * self.interval
+        if self.freq == 'DAILY':
+            day = first + timedelta(days=step)
+            if self.byday and day.weekday() not in {weekday for _ordinal, weekday in self.byday}:
+                return []
+            return [day]
+        if self.freq == 'WEEKLY':
+            week_start = first - timedelta(days=first.weekday()) + timedelta(weeks=step)
+            weekdays = {weekday for _ordinal, weekday in self.byday} or {first.weekday()}
+            return [week_start + timedelta(days=weekday) for weekday in sorted(weekdays)]
+        if self.freq == 'MONTHLY':
+            year, month = divmod(first.month - 1 + step, 12)
+            year, month = first.year + year, month + 1
+            return monthly_dates(year, month, first, self.byday, self.bymonthday)
+        year = first.year + step
+        if first.month == 2 and first.day == 29 and not calendar.isleap(year):
+            return []
+        return [first.replace(year=year)]
+
+    def dates(self, first, from_day=None):
+        """
+        Yield the local dates of the series starting on ``first``, in order.
+
+        Without COUNT, generation skips ahead to the period containing
+        ``from_day``; COUNT series are always counted from the start. The
+        series ends after MAX_EMPTY_PERIODS periods without a date, or at
+        the end of the calendar.
+        """
+        index = 0
+        if from_day is not None and self.count is None and from_day > first:
+            index = self.period_index(first, from_day)
+        if index == 0:
+            # The first occurrence is always the event itself (RFC 5545).
+            yield first
+        empty_periods = 0
+        while empty_periods < MAX_EMPTY_PERIODS:
+            try:
+                days = [day for day in self.period_dates(first, index) if day > first]
+            except (OverflowError, ValueError):
+                return
+            empty_periods = 0 if days else empty_periods + 1
+            yield from days
+            index += 1
+
+    def repeats(self, first):
+        """Whether the series starting on ``first`` has a second date."""
+        dates = self.dates(first)
+        next(dates)
+        return next(dates, None) is not None
+
+
+def parse_until(value):
+    """UNTIL is a UTC timestamp (``20251231T235959Z``) or a date."""
+    for pattern in ('%Y%m%dT%H%M%SZ', '%Y%m%dT%H%M%S'):
+        try:
+            parsed = datetime.strptime(value, pattern)
+        except ValueError:
+            continue
+        return parsed.replace(tzinfo=datetime_timezone.utc) if value.endswith('Z') else timezone.make_aware(parsed)
+    try:
+        day = datetime.strptime(value, '%Y%m%d').date()
+    except ValueError:
+        raise ValueError(f"Invalid UNTIL value {value!r}.")
+    # A date UNTIL includes the whole day.
+    return timezone.make_aware(datetime.combine(day, datetime.max.time()))
+
+
+def monthly_dates(year, month, first, byday, bymonthday):
+    days_in_month = calendar.monthrange(year, month)[1]
+    if bymonthday:
+        days = {day if day > 0 else days_in_month + day + 1 for day in bymonthday}
+    elif byday:
+        days = set()
+        for ordinal, weekday in byday:
+            matching = [
+                day for day in range(1, days_in_month + 1)
+                if date(year, month, day).weekday() == weekday
+            ]
+            if ordinal is None:
+                days.update(matching)
+            elif abs(ordinal) <= len(matching):
+                days.add(matching[ordinal - 1] if ordinal > 0 else matching[ordinal])
+    else:
+        # Months without the start's day (e.g. the 31st) are skipped.
+        days = {first.day}
+    return [date(year, month, day) for day in sorted(days) if 1 <= day <= days_in_month]
+
+
+class Occurrence:
+    """
+    One occurrence of a calendar event in an expanded window.
+
+    Only the occurrence's own times are stored; everything else is read
+    from the event row, so expanding a long series stays cheap. A plain
+    event is wrapped as its single occurrence.
+    """
+    __slots__ = ('event', 'start_time', 'end_time')
+
+    def __init__(self, event, start_time, end_time):
+        self.event = event
+        self.start_time = start_time
+        self.end_time = end_time
+
+    def __getattr__(self, name):
+        return getattr(self.event, name)
+
+    def __repr__(self):
+        return f'<Occurrence {self.event.pk} at {self.start_time.isoformat()}>'
+
+    @property
+    def is_recurring(self):
+        return bool(self.event.recurrence_rule)
+
+    @property
+    def occurrence_id(self):
+        """Unique per occurrence: the event id, plus the start for a series."""
+        if not self.is_recurring:
+            return str(self.event.pk)
+        return f'{self.event.pk}:{self.start_time.astimezone(datetime_timezone.utc).strftime("%Y%m%dT%H%M%SZ")}'
+
+
+def excluded_starts(event):
+    starts = set()
+    for value in event.exdates or ():
+        parsed = parse_datetime(value)
+        if parsed is None and parse_date(value) is not None:
+            parsed = timezone.make_aware(datetime.combine(parse_date(value), event.start_time.time()))
+        if parsed is not None:
+            starts.add(parsed)
+    return starts
+
+
+def iter_occurrences(event, window_start=None):
+    """
+    Yield the occurrences of a recurring event in order, optionally starting
+    near ``window_start``. The generator is unbounded unless the rule has
+    COUNT or UNTIL; callers stop it.
+    """
+    rule = RecurrenceRule.parse(event.recurrence_rule)
+    duration = event.end_time - event.start_time
+    local_start = timezone.localtime(event.start_time)
+    wall_time = local_start.time()
+    from_day = None
+    if window_start is not None:
+        from_day = timezone.localtime(window_start - duration).date()
+    excluded = excluded_starts(event)
+
+    for number, day in enumerate(rule.dates(local_start.date(), from_day), start=1):
+        if rule.count is not None and number > rule.count:
+            return
+        start = timezone.make_aware(datetime.combine(day, wall_time))
+        if rule.until is not None and start > rule.until:
+            return
+        if start not in excluded:
+            yield Occurrence(event, start, start + duration)
+
+
+def expand(event, window_start, window_end):
+    """
+    Occurrences of a recurring event overlapping ``[window_start,
+    window_end)``, with the same boundary rules as
+    ``firm.events.events_in_window``.
+    """
+    occurrences = []
+    for occurrence in iter_occurrences(event, window_start):
+        if occurrence.start_time >= window_end:
+            break
+        if occurrence.end_time > window_start or (
+            occurrence.end_time == window_start and occurrence.start_time == window_start
+        ):
+            occurrences.append(occurrence)
+    return occurrences
+
+
+def series_end(event):
+    """
+    End of the last occurrence of a bounded series, or ``None`` when the
+    series never ends. Stored on the event so window queries can skip
+    finished series.
+    """
+    rule = RecurrenceRule.parse(event.recurrence_rule)
+    if rule.count is None and rule.until is None:
+        return None
+    last = None
+    for last in iter_occurrences(event):
+        pass
+    if last is None:
+        return event.end_time
+    return last.end_time
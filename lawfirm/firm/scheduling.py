@@ -0,0 +1,185 @@
+import heapq
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_time
+
+from .events import events_in_window, occurrences_in_window, series_in_window
+from .recurrence import Occurrence, expand
+
+
+def blocks_time(occurrence):
+    """
+    All-day events and zero-length deadlines mark a day or a moment rather
+    than time the user is busy, so they never conflict.
+    """
+    return not occurrence.is_all_day and occurrence.end_time > occurrence.start_time
+
+
+def overlapping_pairs(occurrences):
+    """
+    Return the ``(earlier, later)`` pairs of occurrences whose times overlap.
+
+    Sort-and-sweep: occurrences are visited by start time while a heap keeps
+    the ones still running, ordered by end time. Each occurrence is pushed
+    and popped once, so the cost is O(n log n) plus the number of pairs
+    rather than O(n^2).
+    """
+    pairs = []
+    active = []
+    ordered = sorted(
+        (occurrence for occurrence in occurrences if blocks_time(occurrence)),
+        key=lambda occurrence: occurrence.start_time,
+    )
+    for number, occurrence in enumerate(ordered):
+        while active and active[0][0] <= occurrence.start_time:
+            heapq.heappop(active)
+        pairs.extend((running, occurrence) for _end, _number, running in active)
+        heapq.heappush(active, (occurrence.end_time, number, occurrence))
+    return pairs
+
+
+def conflicts_in_window(queryset, start, end):
+    """
+    Overlapping pairs among the occurrences of a Calendar queryset in
+    ``[start, end)``.
+    """
+    return overlapping_pairs(occurrences_in_window(queryset, start, end))
+
+
+def candidate_occurrences(event):
+    """
+    The occurrences of an unsaved or edited event to check for conflicts.
+    A series is checked up to SCHEDULING_CONFLICT_HORIZON days ahead.
+    """
+    if not event.recurrence_rule:
+        return [Occurrence(event, event.start_time, event.end_time)]
+    horizon = event.start_time + timedelta(days=settings.SCHEDULING_CONFLICT_HORIZON)
+    return expand(event, event.start_time, horizon)
+
+
+def find_conflicts(event, queryset):
+    """
+    Return the occurrences in ``queryset`` (normally the user's calendar)
+    that ``event`` would overlap, as ``(candidate, existing)`` pairs.
+
+    The user's events are fetched once for the span of the candidates with
+    the indexed window query and matched by a single sweep.
+    """
+    candidates = [occurrence for occurrence in candidate_occurrences(event) if blocks_time(occurrence)]
+    if not candidates:
+        return []
+    if event.pk:
+        queryset = queryset.exclude(pk=event.pk)
+    start = min(occurrence.start_time for occurrence in candidates)
+    end = max(occurrence.end_time for occurrence in candidates)
+    existing = occurrences_in_window(queryset, start, end)
+
+    conflicts = []
+    for first, second in overlapping_pairs(candidates + existing):
+        first_is_candidate = first.event is event
+        if first_is_candidate != (second.event is event):
+            conflicts.append((first, second) if first_is_candidate else (second, first))
+    return conflicts
+
+
+def busy_intervals(queryset, start, end):
+    """
+    Map each user id to the sorted, merged ``[(start, end), ...]`` intervals
+    in which the user is busy within ``[start, end)``.
+
+    The users' events are fetched together, rather than one query per user.
+    All-day and zero-length events are left out (see :func:`blocks_time`).
+    """
+    queryset = queryset.filter(is_all_day=False).order_by()
+    # Single events are read as bare tuples; building model instances would
+    # dominate the cost for large calendars.
+    rows = list(events_in_window(queryset.filter(recurrence_rule=''), start, end).filter(
+        end_time__gt=F('start_time')
+    ).values_list('user_id', 'start_time', 'end_time'))
+    for event in series_in_window(queryset, start, end):
+        rows.extend(
+            (event.user_id, occurrence.start_time, occurrence.end_time)
+            for occurrence in expand(event, start, end) if blocks_time(occurrence)
+        )
+
+    busy = {}
+    for user_id, busy_start, busy_end in rows:
+        busy.setdefault(user_id, []).append((max(busy_start, start), min(busy_end, end)))
+    return {user_id: merge_intervals(intervals) for user_id, intervals in busy.items()}
+
+
+def merge_intervals(intervals):
+    """
+    Merge overlapping or touching intervals into a sorted, disjoint list.
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def working_periods(start, end):
+    """
+    Yield the working hours (SCHEDULING_WORKDAY_START to _END on
+    SCHEDULING_WORKING_DAYS, local time) that fall within ``[start, end)``.
+    """
+    day_start = parse_time(settings.SCHEDULING_WORKDAY_START)
+    day_end = parse_time(settings.SCHEDULING_WORKDAY_END)
+    day = timezone.localtime(start).date()
+    last_day = timezone.localtime(end).date()
+    while day <= last_day:
+        if day.weekday() in settings.SCHEDULING_WORKING_DAYS:
+            period_start = max(timezone.make_aware(datetime.combine(day, day_start)), start)
+            period_end = min(timezone.make_aware(datetime.combine(day, day_end)), end)
+            if period_start < period_end:
+                yield period_start, period_end
+        day += timedelta(days=1)
+
+
+def free_slots(busy, start, end, duration, count):
+    """
+    Return up to ``count`` of the earliest ``duration``-long slots within
+    working hours in ``[start, end)`` that avoid every interval in ``busy``
+    (sorted and disjoint, see :func:`merge_intervals`).
+
+    Slots are laid back to back from the start of each free gap.
+    """
+    slots = []
+    position = 0
+    for period_start, period_end in working_periods(start, end):
+        cursor = period_start
+        # Busy intervals before this period can never matter again.
+        while position < len(busy) and busy[position][1] <= cursor:
+            position += 1
+        index = position
+        while len(slots) < count:
+            gap_end = period_end
+            if index < len(busy) and busy[index][0] < period_end:
+                gap_end = max(cursor, busy[index][0])
+            while cursor + duration <= gap_end and len(slots) < count:
+                slots.append((cursor, cursor + duration))
+                cursor += duration
+            if gap_end == period_end:
+                break
+            cursor = max(cursor, busy[index][1])
+            index += 1
+        if len(slots) >= count:
+            break
+    return slots
+
+
+def find_common_free_slots(queryset, start, end, duration, count):
+    """
+    Earliest free slots shared by the owners of a Calendar queryset, plus
+    each owner's busy intervals.
+    """
+    busy = busy_intervals(queryset, start, end)
+    combined = merge_intervals(interval for intervals in busy.values() for interval in intervals)
+    return free_slots(combined, start, end, duration, count), busy
@@ -0,0 +1,196 @@
+import re
+
+from django.db import connection
+
+from .models import Case, Diary, Document, DocumentText
+
+# Each searchable model, the FTS5 table mirroring it on SQLite (rowid is the
+# model's primary key) and the text columns that are indexed. A document's
+# ``content`` is the text extracted from its file (see firm.extraction).
+SEARCH_SOURCES = {
+    'case': (Case, 'firm_case_fts', ('client_name', 'description')),
+    'diary': (Diary, 'firm_diary_fts', ('title', 'content')),
+    'document': (Document, 'firm_document_fts', ('description', 'content')),
+}
+
+# Text search configuration of the PostgreSQL expression indexes.
+POSTGRES_CONFIG = 'english'
+
+# The GIN-indexed expressions on PostgreSQL, as (table alias, columns).
+POSTGRES_VECTORS = {
+    'case': [('c', ('client_name', 'description'))],
+    'diary': [('o', ('title', 'content'))],
+    'document': [('o', ('description',)), ('t', ('text',))],
+}
+
+MAX_QUERY_TERMS = 10
+
+
+def source_for(model):
+    for kind, (source_model, table, columns) in SEARCH_SOURCES.items():
+        if source_model is model:
+            return kind, table, columns
+    return None
+
+
+def indexed_values(instance, columns):
+    if isinstance(instance, Document):
+        text = DocumentText.objects.filter(
+            document_id=instance.pk, status='done'
+        ).values_list('text', flat=True).first()
+        return [instance.description or '', text or '']
+    return [getattr(instance, column) or '' for column in columns]
+
+
+def index_instance(instance):
+    """
+    Copy an instance's text into its FTS5 table.
+
+    Only SQLite keeps a separate index; PostgreSQL's GIN expression indexes
+    are maintained by the database itself.
+    """
+    source = source_for(type(instance))
+    if source is None or connection.vendor != 'sqlite':
+        return
+    _kind, table, columns = source
+    values = indexed_values(instance, columns)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [instance.pk])
+        cursor.execute(
+            f'INSERT INTO {table} (rowid, {", ".join(columns)}) '
+            f'VALUES (%s, {", ".join(["%s"] * len(columns))})',
+            [instance.pk, *values],
+        )
+
+
+def unindex_instance(instance):
+    source = source_for(type(instance))
+    if source is None or connection.vendor != 'sqlite':
+        return
+    _kind, table, _columns = source
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [instance.pk])
+
+
+def query_terms(text):
+    return re.findall(r'\w+', text or '')[:MAX_QUERY_TERMS]
+
+
+def fts5_query(terms):
+    """
+    Quote every term so user input cannot inject FTS5 syntax, and match the
+    last one as a prefix so results appear while the user is still typing.
+    """
+    quoted = ['"%s"' % term.replace('"', '""') for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def visibility(kind, user):
+    """
+    SQL restricting search hits to what the role rules in views.py allow.
+
+    Lawyers only see their own cases; the other roles see every case.
+    Diary entries are private. Documents are visible to their uploader and
+    to anyone who may open the case they belong to.
+    """
+    if kind == 'case':
+        if user.role == 'lawyer':
+            return 'c.lawyer_id = %s', [user.pk]
+        return '1 = 1', []
+    if kind == 'diary':
+        return 'o.user_id = %s', [user.pk]
+    if user.role == 'lawyer':
+        return '(o.user_id = %s OR c.lawyer_id = %s)', [user.pk, user.pk]
+    return '(o.user_id = %s OR o.case_id IS NOT NULL)', [user.pk]
+
+
+def ranked_ids(kind, user, terms, limit):
+    """
+    Return ``[(pk, score), ...]`` best first; higher scores are better.
+    """
+    model, table, _columns = SEARCH_SOURCES[kind]
+    alias = 'c' if kind == 'case' else 'o'
+    joins = ''
+    if kind == 'document':
+        joins = f' LEFT JOIN {Case._meta.db_table} c ON c.id = o.case_id'
+    where, params = visibility(kind, user)
+
+    if connection.vendor == 'sqlite':
+        sql = (
+            f'SELECT {table}.rowid, -bm25({table}) AS score FROM {table} '
+            f'JOIN {model._meta.db_table} {alias} ON {alias}.id = {table}.rowid{joins} '
+            f'WHERE {table} MATCH %s AND {where} '
+            f'ORDER BY bm25({table}) LIMIT %s'
+        )
+        params = [fts5_query(terms), *params, limit]
+    elif connection.vendor == 'postgresql':
+        if kind == 'document':
+            joins += f' LEFT JOIN {DocumentText._meta.db_table} t ON t.document_id = o.id'
+        # Must match the indexed expressions of the GIN indexes exactly.
+        vectors = []
+        for vector_alias, vector_columns in POSTGRES_VECTORS[kind]:
+            document = " || ' ' || ".join(
+                f"coalesce({vector_alias}.{column}, '')" for column in vector_columns
+            )
+            vectors.append(f"to_tsvector('{POSTGRES_CONFIG}', {document})")
+        score = ' + '.join(f'ts_rank({vector}, query)' for vector in vectors)
+        matches = ' OR '.join(f'{vector} @@ query' for vector in vectors)
+        sql = (
+            f'SELECT {alias}.id, {score} AS score '
+            f'FROM {model._meta.db_table} {alias}{joins} '
+            f"CROSS JOIN websearch_to_tsquery('{POSTGRES_CONFIG}', %s) query "
+            f'WHERE ({matches}) AND {where} '
+            f'ORDER BY score DESC LIMIT %s'
+        )
+        params = [' '.join(terms), *params, limit]
+    else:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+class SearchResult:
+    def __init__(self, kind, obj, score):
+        self.kind = kind
+        self.object = obj
+        self.score = score
+
+    @property
+    def title(self):
+        if self.kind == 'case':
+            return f'{self.object.case_number} - {self.object.client_name}'
+        if self.kind == 'diary':
+            return f'{self.object.title} ({self.object.date})'
+        return self.object.filename()
+
+    @property
+    def excerpt(self):
+        text = self.object.content if self.kind == 'diary' else self.object.description
+        text = text or ''
+        return text if len(text) <= 200 else text[:197] + '...'
+
+
+def search(user, text, limit=20, kinds=None):
+    """
+    Full-text search over cases, diary entries and documents for ``user``.
+
+    Returns at most ``limit`` :class:`SearchResult` objects, best first.
+    """
+    terms = query_terms(text)
+    if not terms:
+        return []
+
+    results = []
+    for kind in kinds or SEARCH_SOURCES:
+        model = SEARCH_SOURCES[kind][0]
+        hits = ranked_ids(kind, user, terms, limit)
+        objects = model.objects.in_bulk([pk for pk, _score in hits])
+        results.extend(
+            SearchResult(kind, objects[pk], score)
+            for pk, score in hits if pk in objects
+        )
+    results.sort(key=lambda result: result.score, reverse=True)
+    return results[:limit]
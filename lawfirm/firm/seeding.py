@@ -0,0 +1,291 @@
+import math
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import search
+from .cache import FIRM_WIDE
+from .models import Calendar, Case, Diary, Document, Task, User
+from .recurrence import series_end
+from .signals import invalidate
+
+# Seeded users are named ``seed_<role>_<n>`` and share this password.
+SEED_PREFIX = 'seed_'
+SEED_PASSWORD = 'seed-password'
+
+BATCH_SIZE = 500
+
+FIRST_NAMES = (
+    'Wanjiku', 'Otieno', 'Achieng', 'Kamau', 'Njeri', 'Mwangi', 'Akinyi', 'Kiprop',
+    'Chebet', 'Mutua', 'Wambui', 'Odhiambo', 'Nyambura', 'Kiplagat', 'Atieno', 'Maina',
+)
+LAST_NAMES = (
+    'Kariuki', 'Ochieng', 'Wafula', 'Njoroge', 'Kipchumba', 'Mutiso', 'Omondi', 'Gathoni',
+    'Barasa', 'Koech', 'Nduta', 'Onyango', 'Kimani', 'Cherono', 'Musyoka', 'Wekesa',
+)
+COMPANY_SUFFIXES = ('Holdings', 'Enterprises', 'Ltd', 'Traders', 'Investments', 'Properties')
+PLACES = ('Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret', 'Thika', 'Nyeri', 'Machakos')
+MATTERS = (
+    'boundary dispute over land', 'breach of a supply contract', 'unfair dismissal claim',
+    'succession of an estate', 'custody of two minors', 'defamation in a newspaper article',
+    'recovery of an unpaid loan', 'tenancy eviction notice', 'shareholder dispute',
+    'road traffic accident compensation', 'charge of obtaining money by false pretences',
+)
+TASKS = (
+    'Draft pleadings', 'File submissions', 'Serve summons', 'Review contract',
+    'Prepare witness statements', 'Collect court order', 'Call client', 'Research precedents',
+    'Update case file', 'Book conference room', 'Prepare bill of costs', 'Scan exhibits',
+)
+EVENTS = (
+    'Client meeting', 'Mention', 'Hearing', 'Filing deadline', 'Partners meeting',
+    'Site visit', 'Mediation session', 'Judgment delivery', 'Training',
+)
+
+# Relative frequencies of the choices each field is drawn from
+CASE_STATUSES = {'open': 40, 'in_progress': 30, 'settled': 15, 'closed': 15}
+CASE_TYPES = {'civil': 40, 'criminal': 15, 'family': 15, 'corporate': 20, 'other': 10}
+TASK_STATUSES = {'pending': 40, 'in_progress': 25, 'completed': 30, 'on_hold': 5}
+TASK_PRIORITIES = {'low': 20, 'medium': 50, 'high': 22, 'urgent': 8}
+EVENT_TYPES = {'meeting': 45, 'court_appearance': 25, 'deadline': 15, 'personal': 5, 'other': 10}
+DOCUMENT_TYPES = {'case_document': 50, 'client_communication': 20, 'legal_research': 15, 'correspondence': 15}
+
+# Roles each role assigns tasks to, as create_task allows
+TASK_ASSIGNEES = {
+    'lawyer': ('secretary', 'legal_assistant', 'attache', 'lawyer'),
+    'secretary': ('attache', 'legal_assistant'),
+    'legal_assistant': ('attache', 'secretary'),
+}
+
+
+def weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def around(rng, mean):
+    """A count spread evenly over half to one and a half times ``mean``."""
+    return rng.randint(mean // 2, mean + mean // 2) if mean > 1 else mean
+
+
+def person(rng):
+    return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+
+def client_name(rng):
+    if rng.random() < 0.3:
+        return f'{rng.choice(LAST_NAMES)} {rng.choice(COMPANY_SUFFIXES)}'
+    return person(rng)
+
+
+def sentence(rng):
+    return f'{rng.choice(MATTERS).capitalize()} in {rng.choice(PLACES)}.'
+
+
+def pdf_bytes(text):
+    """A one-page PDF showing ``text``, small enough to seed thousands."""
+    text = text.replace('\\', '').replace('(', '').replace(')', '')
+    stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'.encode('latin-1', 'replace')
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+        b'/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>',
+        b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    output += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(output)
+
+
+def seeded_users():
+    return User.objects.filter(username__startswith=SEED_PREFIX)
+
+
+def clear_seed():
+    """
+    Delete the seeded users and everything they own. Tasks and cases only
+    lose their users on delete, so they are deleted first.
+    """
+    users = seeded_users()
+    with transaction.atomic():
+        deleted = Task.all_objects.filter(Q(assignor__in=users) | Q(assignee__in=users)).delete()[0]
+        deleted += Case.objects.filter(lawyer__in=users).delete()[0]
+        return deleted + users.delete()[0]
+
+
+def create_users(rng, counts):
+    password = make_password(SEED_PASSWORD)
+    users = []
+    for role, count in counts.items():
+        for number in range(1, count + 1):
+            first_name, last_name = person(rng).split()
+            users.append(User(
+                username=f'{SEED_PREFIX}{role}_{number}', role=role, password=password,
+                first_name=first_name, last_name=last_name,
+                email=f'{role}{number}@firm.example',
+            ))
+    User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+    by_role = {}
+    for user in seeded_users().order_by('pk'):
+        by_role.setdefault(user.role, []).append(user)
+    return by_role
+
+
+def create_cases(rng, lawyers, cases_per_lawyer):
+    cases = []
+    today = timezone.localdate()
+    for lawyer in lawyers:
+        for _number in range(around(rng, cases_per_lawyer)):
+            cases.append(Case(
+                case_number=f'SEED/{rng.choice(PLACES)[:3].upper()}/{len(cases) + 1:06d}',
+                client_name=client_name(rng),
+                description=sentence(rng),
+                lawyer=lawyer,
+                case_type=weighted(rng, CASE_TYPES),
+                status=weighted(rng, CASE_STATUSES),
+                client_contact_info=f'+2547{rng.randint(10000000, 99999999)}',
+                initial_consultation_date=today - timedelta(days=rng.randint(0, 720)),
+            ))
+    Case.objects.bulk_create(cases, batch_size=BATCH_SIZE)
+    created = list(Case.objects.filter(lawyer__in=lawyers))
+    # bulk_create skips the save() signal that indexes cases for search.
+    for case in created:
+        search.index_instance(case)
+    return created
+
+
+def create_tasks(rng, by_role, tasks_per_user):
+    tasks = []
+    today = timezone.localdate()
+    for role, assignee_roles in TASK_ASSIGNEES.items():
+        candidates = [user for assignee_role in assignee_roles for user in by_role.get(assignee_role, ())]
+        for assignor in by_role.get(role, ()):
+            choices = [user for user in candidates if user != assignor]
+            if not choices:
+                continue
+            for _number in range(around(rng, tasks_per_user)):
+                tasks.append(Task(
+                    title=f'{rng.choice(TASKS)} - {rng.choice(LAST_NAMES)}',
+                    description=sentence(rng),
+                    assignor=assignor,
+                    assignee=rng.choice(choices),
+                    due_date=today + timedelta(days=rng.randint(-60, 60)),
+                    status=weighted(rng, TASK_STATUSES),
+                    priority=weighted(rng, TASK_PRIORITIES),
+                ))
+    Task.objects.bulk_create(tasks, batch_size=BATCH_SIZE)
+    return len(tasks)
+
+
+def create_events(rng, users, events_per_user):
+    events = []
+    today = timezone.localdate()
+    for user in users:
+        for _number in range(around(rng, events_per_user)):
+            day = today + timedelta(days=rng.randint(-90, 90))
+            event_type = weighted(rng, EVENT_TYPES)
+            start = timezone.make_aware(datetime.combine(day, time(rng.randint(8, 16), rng.choice((0, 30)))))
+            event = Calendar(
+                user=user,
+                title=rng.choice(EVENTS),
+                description=sentence(rng),
+                event_type=event_type,
+                location=rng.choice(PLACES),
+                start_time=start,
+                end_time=start + timedelta(minutes=rng.choice((30, 60, 60, 90, 120))),
+            )
+            if event_type == 'deadline':
+                event.end_time = event.start_time
+            elif rng.random() < 0.05:
+                event.is_all_day = True
+            elif rng.random() < 0.08:
+                event.recurrence_rule = f'FREQ=WEEKLY;COUNT={rng.randint(4, 26)}'
+                # bulk_create skips Calendar.save(), which sets this.
+                event.recurrence_end = series_end(event)
+            events.append(event)
+    Calendar.objects.bulk_create(events, batch_size=BATCH_SIZE)
+    return len(events)
+
+
+def create_diary(rng, users, entries_per_user):
+    entries = []
+    today = timezone.localdate()
+    for user in users:
+        for _number in range(around(rng, entries_per_user)):
+            entries.append(Diary(
+                user=user,
+                date=today - timedelta(days=rng.randint(0, 120)),
+                title=f'{rng.choice(EVENTS)} notes',
+                content=f'{sentence(rng)} {sentence(rng)} Follow up with {person(rng)}.',
+            ))
+    Diary.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+    created = list(Diary.objects.filter(user__in=users))
+    for entry in created:
+        search.index_instance(entry)
+    return len(created)
+
+
+def create_documents(rng, cases, by_role, documents_per_case):
+    """
+    Documents are saved one by one so their files go through the document
+    storage and their text extraction is queued, as with an upload.
+    """
+    uploaders = [user for role in ('lawyer', 'secretary', 'legal_assistant') for user in by_role.get(role, ())]
+    # Binomially distributed around documents_per_case
+    slots = max(1, math.ceil(documents_per_case * 2))
+    created = 0
+    for case in cases:
+        count = sum(rng.random() < documents_per_case / slots for _number in range(slots))
+        for number in range(count):
+            text = f'{case.case_number} {case.client_name}: {sentence(rng)}'
+            Document.objects.create(
+                user=case.lawyer if rng.random() < 0.6 else rng.choice(uploaders),
+                case=case,
+                file=ContentFile(pdf_bytes(text), name=f'{case.case_number.replace("/", "-")}-{number + 1}.pdf'),
+                document_type=weighted(rng, DOCUMENT_TYPES),
+                description=sentence(rng),
+            )
+            created += 1
+    return created
+
+
+def seed(counts, cases_per_lawyer, tasks_per_user, events_per_user, diary_per_user,
+         documents_per_case, random_seed=0):
+    """
+    Create a synthetic firm: ``counts`` users per role with their cases,
+    tasks, calendar events, diary entries and small PDF documents. The same
+    ``random_seed`` gives the same firm. Returns the number of rows created
+    per model.
+    """
+    rng = random.Random(random_seed)
+    with transaction.atomic():
+        by_role = create_users(rng, counts)
+        users = [user for role_users in by_role.values() for user in role_users]
+        cases = create_cases(rng, by_role.get('lawyer', []), cases_per_lawyer)
+        created = {
+            'users': len(users),
+            'cases': len(cases),
+            'tasks': create_tasks(rng, by_role, tasks_per_user),
+            'events': create_events(rng, users, events_per_user),
+            'diary entries': create_diary(rng, users, diary_per_user),
+            'documents': create_documents(rng, cases, by_role, documents_per_case),
+        }
+        # Bulk inserts send no signals, so invalidate cached data here.
+        owners = [user.pk for user in users]
+        for scope in ('tasks', 'calendar', 'documents'):
+            invalidate(scope, owners)
+        invalidate('cases', owners + [FIRM_WIDE])
+        invalidate('users', [FIRM_WIDE])
+    return created
@@ -0,0 +1,149 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import extraction, search
+from .cache import FIRM_WIDE, bump_version
+from .models import Blob, Calendar, Case, Diary, Document, Task, User, soft_deleted
+from .storage import lock_blob
+
+# Fields whose users own cached data for each model, and the cache scope
+# their data belongs to.
+OWNER_FIELDS = {
+    Task: ('tasks', ('assignor_id', 'assignee_id')),
+    Case: ('cases', ('lawyer_id',)),
+    Calendar: ('calendar', ('user_id',)),
+    Document: ('documents', ('user_id',)),
+}
+
+
+def invalidate(scope, owners):
+    """
+    Bump the versions of ``scope`` for ``owners`` once the transaction commits.
+
+    Bumping earlier would let another request cache the pre-commit rows
+    under the new version.
+    """
+    owners = {owner for owner in owners if owner is not None}
+
+    def bump():
+        for owner in owners:
+            bump_version(scope, owner)
+
+    transaction.on_commit(bump)
+
+
+@receiver(soft_deleted, sender=Task)
+@receiver(soft_deleted, sender=Calendar)
+def invalidate_soft_deleted(sender, pks, **kwargs):
+    scope, fields = OWNER_FIELDS[sender]
+    rows = sender.all_objects.filter(pk__in=pks).values_list(*fields)
+    invalidate(scope, {owner for row in rows for owner in row})
+
+
+@receiver(pre_save, sender=Task)
+@receiver(pre_save, sender=Case)
+def remember_previous_owners(sender, instance, **kwargs):
+    """
+    Keep the owners a row had before an update so a reassignment also
+    invalidates the user it was taken from.
+    """
+    _scope, fields = OWNER_FIELDS[sender]
+    instance._previous_owners = ()
+    if instance.pk and not instance._state.adding:
+        previous = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+        instance._previous_owners = previous or ()
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Case)
+@receiver(post_save, sender=Calendar)
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Case)
+@receiver(post_delete, sender=Calendar)
+@receiver(post_delete, sender=Document)
+def invalidate_dashboard_cache(sender, instance, **kwargs):
+    scope, fields = OWNER_FIELDS[sender]
+    owners = [getattr(instance, field) for field in fields]
+    owners.extend(getattr(instance, '_previous_owners', ()))
+    if sender is Case:
+        owners.append(FIRM_WIDE)
+    invalidate(scope, owners)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_directory(sender, instance, update_fields=None, **kwargs):
+    """
+    Rebuild the assignee directory (firm.directory) after users change.
+    Logins only touch last_login, which the directory does not hold.
+    """
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate('users', [FIRM_WIDE])
+
+
+def release_blob(storage, name):
+    """
+    Delete a stored file once the transaction commits, unless a Document
+    still references it.
+
+    The check and the delete happen under the blob's lock, which a
+    concurrent upload of the same content holds until its Document row
+    commits (see firm.storage.lock_blob).
+    """
+    def release():
+        if not name:
+            return
+        with transaction.atomic():
+            lock_blob(name)
+            if Document.objects.filter(file=name).exists():
+                return
+            storage.delete(name)
+            Blob.objects.filter(name=name).delete()
+
+    transaction.on_commit(release)
+
+
+@receiver(pre_save, sender=Document)
+def remember_previous_file(sender, instance, **kwargs):
+    instance._previous_file = None
+    if instance.pk and not instance._state.adding:
+        instance._previous_file = sender.objects.filter(
+            pk=instance.pk
+        ).values_list('file', flat=True).first()
+
+
+@receiver(post_save, sender=Document)
+def release_replaced_blob(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_file', None)
+    if previous and previous != instance.file.name:
+        release_blob(instance.file.storage, previous)
+
+
+@receiver(post_delete, sender=Document)
+def release_document_blob(sender, instance, **kwargs):
+    # Blobs are shared between documents with identical content, so only
+    # the last reference removes the file.
+    release_blob(instance.file.storage, instance.file.name)
+
+
+@receiver(post_save, sender=Case)
+@receiver(post_save, sender=Diary)
+@receiver(post_save, sender=Document)
+def update_search_index(sender, instance, **kwargs):
+    search.index_instance(instance)
+
+
+@receiver(post_save, sender=Document)
+def extract_document_text(sender, instance, raw=False, **kwargs):
+    if not raw and instance.file:
+        extraction.schedule_extraction(instance)
+
+
+@receiver(post_delete, sender=Case)
+@receiver(post_delete, sender=Diary)
+@receiver(post_delete, sender=Document)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.unindex_instance(instance)
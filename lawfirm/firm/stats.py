@@ -0,0 +1,51 @@
+from django.db.models import Count, Q
+
+from .models import Calendar, Case, Task
+
+
+def breakdown(queryset, field, choices):
+    """
+    Count the rows of a queryset per choice of ``field`` in a single query.
+
+    Every choice gets a conditional ``COUNT`` so adding a new status or event
+    type to the model does not add a query. The result also holds ``total``.
+    """
+    aggregates = {'total': Count('pk')}
+    for value, _label in choices:
+        aggregates[value] = Count('pk', filter=Q(**{field: value}))
+    return queryset.aggregate(**aggregates)
+
+
+def percentage(part, total):
+    if not total:
+        return 0
+    return (part / total) * 100
+
+
+def case_stats(lawyer=None):
+    """
+    Case counts per status, for one lawyer or for the whole firm.
+    """
+    cases = Case.objects.all()
+    if lawyer is not None:
+        cases = cases.filter(lawyer=lawyer)
+    return breakdown(cases, 'status', Case.STATUS_CHOICES)
+
+
+def task_stats(user):
+    """
+    Task counts per status for the tasks a user assigned or received.
+    """
+    tasks = Task.objects.filter(Q(assignor=user) | Q(assignee=user))
+    stats = breakdown(tasks, 'status', Task.STATUS_CHOICES)
+    for value, _label in Task.STATUS_CHOICES:
+        stats[f'{value}_percentage'] = percentage(stats[value], stats['total'])
+    return stats
+
+
+def calendar_stats(user):
+    """
+    Calendar event counts per event type for a user.
+    """
+    events = Calendar.objects.filter(user=user)
+    return breakdown(events, 'event_type', Calendar.EVENT_TYPES)
@@ -0,0 +1,97 @@
+import hashlib
+import os
+import re
+import tempfile
+from contextlib import suppress
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils import timezone
+
+BLOB_PREFIX = 'blobs'
+BLOB_NAME_PATTERN = re.compile(r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})(\.[^/]*)?$')
+
+
+def blob_name(digest, ext):
+    """
+    Fan blobs out over two directory levels (``blobs/ab/cd/abcd...``) so no
+    single directory grows too large.
+    """
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+def content_hash_from_name(name):
+    """
+    Return the SHA-256 encoded in a blob name, or ``None`` for files stored
+    before content addressing.
+    """
+    match = BLOB_NAME_PATTERN.match(name or '')
+    return match.group(1) if match else None
+
+
+def lock_blob(name):
+    """
+    Lock the Blob row of ``name`` until the current transaction ends,
+    creating the row if needed.
+
+    Writing a blob and releasing it both take this lock, and an upload holds
+    it until its Document row commits, so a release never deletes a file
+    that an uncommitted upload has just stored again. The lock is taken
+    with an UPDATE, which also serializes writers on SQLite.
+    """
+    from .models import Blob
+
+    while not Blob.objects.filter(name=name).update(locked_at=timezone.now()):
+        Blob.objects.get_or_create(name=name)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that keeps each distinct file once, named by the
+    SHA-256 of its content.
+
+    The name passed in only contributes its extension. Identical uploads
+    resolve to the same blob, which Document rows share; see
+    ``firm.signals.release_blob`` for how unreferenced blobs are removed.
+    Save in the transaction that creates the referencing row, as
+    Document.save does, so the blob stays locked until the row commits.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name depends on the content, which is only known in _save.
+        return name
+
+    def _save(self, name, content):
+        ext = os.path.splitext(name)[1].lower()
+        temp_dir = self.path(os.path.join(BLOB_PREFIX, 'tmp'))
+        os.makedirs(temp_dir, exist_ok=True)
+
+        digest = hashlib.sha256()
+        handle, temp_path = tempfile.mkstemp(dir=temp_dir)
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+
+            name = blob_name(digest.hexdigest(), ext)
+            full_path = self.path(name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with transaction.atomic():
+                lock_blob(name)
+                # Replacing an existing blob is harmless (same content) and
+                # restores it should it have been released meanwhile.
+                os.replace(temp_path, full_path)
+            if self.file_permissions_mode is not None:
+                os.chmod(full_path, self.file_permissions_mode)
+        finally:
+            with suppress(FileNotFoundError):
+                os.remove(temp_path)
+        return name
+
+
+def get_document_storage():
+    # Location and URL default to MEDIA_ROOT and MEDIA_URL.
+    return ContentAddressedStorage()
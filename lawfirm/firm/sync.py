@@ -0,0 +1,149 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Calendar, Task
+
+SYNC_CURSOR_SALT = 'firm.sync.cursor'
+
+
+class CursorExpired(Exception):
+    """
+    The cursor predates the tombstone retention period; the client must
+    download everything again.
+    """
+
+
+def encode_sync_cursor(updated_at, pk, synced_at):
+    """
+    A cursor after the row ``(updated_at, pk)``, for a client that has seen
+    every change made up to ``synced_at``.
+    """
+    return signing.dumps(
+        {'u': updated_at.isoformat() if updated_at else None, 'i': pk, 's': synced_at.isoformat()},
+        salt=SYNC_CURSOR_SALT,
+    )
+
+
+def decode_sync_cursor(token):
+    """
+    Return ``(updated_at, pk, synced_at)`` for a token, or ``None`` for no
+    token. ``updated_at`` and ``pk`` are ``None`` when no row has been
+    synced yet. Raises ``ValueError`` for a token that was not issued by
+    this server.
+    """
+    if not token:
+        return None
+    try:
+        data = signing.loads(token, salt=SYNC_CURSOR_SALT)
+        updated_at = parse_datetime(data['u']) if data['u'] else None
+        pk = int(data['i']) if data['i'] is not None else None
+        # Cursors issued before synced_at was recorded
+        synced_at = parse_datetime(data['s']) if 's' in data else updated_at
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise ValueError("Invalid sync cursor.")
+    if synced_at is None or (updated_at is None) != (pk is None):
+        raise ValueError("Invalid sync cursor.")
+    return updated_at, pk, synced_at
+
+
+def serialize_event(event):
+    return {
+        'id': event.pk,
+        'title': event.title,
+        'description': event.description,
+        'start': event.start_time.isoformat(),
+        'end': event.end_time.isoformat(),
+        'allDay': event.is_all_day,
+        'type': event.event_type,
+        'location': event.location,
+        'rrule': event.recurrence_rule or None,
+        'exdates': event.exdates,
+        'recurrenceParent': event.recurrence_parent_id,
+        'originalStart': event.original_start.isoformat() if event.original_start else None,
+        'updatedAt': event.updated_at.isoformat(),
+    }
+
+
+def serialize_task(task):
+    return {
+        'id': task.pk,
+        'title': task.title,
+        'description': task.description,
+        'assignor': task.assignor_id,
+        'assignee': task.assignee_id,
+        'status': task.status,
+        'priority': task.priority,
+        'dueDate': task.due_date.isoformat(),
+        'createdAt': task.created_at.isoformat(),
+        'updatedAt': task.updated_at.isoformat(),
+    }
+
+
+# Synced models, how to scope them to a user and how to serialize a row.
+SYNC_SOURCES = {
+    'events': (Calendar, lambda user: Q(user=user), serialize_event),
+    'tasks': (Task, lambda user: Q(assignor=user) | Q(assignee=user), serialize_task),
+}
+
+
+def changes_since(kind, user, cursor=None, limit=None):
+    """
+    Return ``(changes, next_cursor, has_more)`` for rows of ``kind`` that
+    ``user`` can see and that changed after ``cursor``.
+
+    Rows are read in ``(updated_at, id)`` order from ``all_objects``, so
+    deletions arrive as ``{'id': ..., 'deleted': True}`` tombstones. Rows
+    changed in the last SYNC_SETTLE_SECONDS are held back until the
+    transactions writing them have surely committed; otherwise a slower
+    transaction could commit a row behind a cursor already handed out.
+
+    Every cursor, even that of an empty page, records when the client was
+    last fully up to date. It expires once that is longer ago than the
+    tombstone retention period, however long ago its last row changed.
+
+    A task reassigned away from the user simply stops appearing; clients
+    should drop tasks that are no longer assigned to or by them.
+    """
+    model, scope, serialize = SYNC_SOURCES[kind]
+    limit = limit or settings.SYNC_PAGE_SIZE
+    updated_at, pk, synced_at = decode_sync_cursor(cursor) or (None, None, None)
+    now = timezone.now()
+    if synced_at is not None and synced_at < now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+        raise CursorExpired
+
+    settled = now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    queryset = model.all_objects.filter(scope(user), updated_at__lte=settled)
+    if updated_at is not None:
+        queryset = queryset.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, pk__gt=pk))
+    rows = list(queryset.order_by('updated_at', 'pk')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    changes = [
+        {'id': row.pk, 'deleted': True} if row.deleted_at else serialize(row)
+        for row in rows
+    ]
+    if rows:
+        updated_at, pk = rows[-1].updated_at, rows[-1].pk
+    # Part way through a backlog the client is only as current as when it
+    # last caught up; a first sync starts from nothing, so from now.
+    if not has_more or synced_at is None:
+        synced_at = settled
+    return changes, encode_sync_cursor(updated_at, pk, synced_at), has_more
+
+
+def purge_tombstones():
+    """
+    Permanently delete rows soft-deleted longer ago than the retention
+    period. Cursors that old are rejected, so no client still needs them.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    purged = 0
+    for model, _scope, _serialize in SYNC_SOURCES.values():
+        purged += model.all_objects.filter(deleted_at__lt=cutoff).delete()[0]
+    return purged
@@ -0,0 +1,39 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .instrumentation import query_budget
+
+
+@override_settings(QUERY_BUDGETS_STRICT=True)
+class QueryBudgetTestCase(TestCase):
+    """
+    Test case whose requests fail with QueryBudgetExceeded when a view runs
+    more queries than its QUERY_BUDGETS entry allows.
+    """
+
+    def assertWithinQueryBudget(self, response):
+        """
+        Fail unless the view that served ``response`` has a declared budget
+        and kept to it. Returns the response's QueryStats.
+        """
+        url_name = response.resolver_match.view_name
+        budget = query_budget(url_name)
+        if budget is None:
+            self.fail(f'No query budget declared for {url_name!r} in QUERY_BUDGETS.')
+        stats = response.query_stats
+        self.assertLessEqual(stats.count, budget, f'{url_name}: {stats}')
+        return stats
+
+    @contextmanager
+    def assertMaxQueries(self, number):
+        """Like assertNumQueries, but any count up to ``number`` passes."""
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        queries = '\n'.join(query['sql'] for query in context.captured_queries)
+        self.assertLessEqual(
+            len(context), number,
+            f'{len(context)} queries executed, at most {number} expected:\n{queries}',
+        )
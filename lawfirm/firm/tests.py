@@ -1,3 +1,1677 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import json
+import os
+import tempfile
+import zipfile
+from datetime import date, datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from . import jobs
+from .benchmark import ROLE_PAGES, run_benchmark
+from .bulk import BulkTaskError, BulkTaskForm, bulk_update_tasks, parse_task_ids
+from .cache import FIRM_WIDE, cached_many, get_versions
+from .directory import get_directory
+from .events import events_in_window, events_on_day, occurrences_in_window, parse_window
+from .extraction import extract_document_text
+from .forms import CalendarEventForm
+from .imports import CaseImportForm, import_cases
+from .instrumentation import QueryBudgetExceeded
+from .microbench import MICROBENCHMARKS, find_regressions, run_microbenchmarks
+from .models import (
+    Blob, Calendar, CalendarFeedToken, Case, Diary, Document, DocumentText, Job, Task, UploadSession, User,
+)
+from .pagination import decode_cursor, encode_cursor
+from .recurrence import Occurrence, RecurrenceRule
+from .scheduling import (
+    busy_intervals, find_common_free_slots, find_conflicts, free_slots, merge_intervals, overlapping_pairs,
+)
+from .search import search
+from .seeding import clear_seed, seed, seeded_users
+from .stats import calendar_stats, case_stats, task_stats
+from .sync import changes_since, encode_sync_cursor, purge_tombstones
+from .uploads import UploadError, finalize_upload, purge_expired_uploads, start_upload, temp_path, write_chunk
+from .testing import QueryBudgetTestCase
+
+ROLES = ('lawyer', 'secretary', 'legal_assistant', 'attache')
+
+# Rows created per user, enough for a query per row to break the budgets
+ROWS_PER_USER = 5
+
+
+def create_firm():
+    """
+    One user per role, each with several tasks, events and diary entries,
+    and cases of the lawyer.
+    """
+    users = {role: User.objects.create_user(role, password='password123', role=role) for role in ROLES}
+    lawyer = users['lawyer']
+    now = timezone.now()
+    for number in range(ROWS_PER_USER):
+        Case.objects.create(
+            case_number=f'HC-{number}', client_name=f'Client {number}',
+            description='Boundary dispute over land', lawyer=lawyer,
+        )
+        for user in users.values():
+            if user != lawyer:
+                Task.objects.create(title=f'Task {number}', assignor=lawyer, assignee=user, due_date=date.today())
+                Task.objects.create(title=f'Request {number}', assignor=user, assignee=lawyer, due_date=date.today())
+            Calendar.objects.create(
+                user=user, title=f'Meeting {number}',
+                start_time=now + timedelta(hours=number), end_time=now + timedelta(hours=number + 1),
+            )
+            Diary.objects.create(user=user, title=f'Entry {number}', content='Visited the land', date=date.today())
+    return users
+
+
+def aware(*args):
+    """An aware datetime in the current time zone."""
+    return timezone.make_aware(datetime(*args))
+
+
+class QueryInstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = create_firm()
+        self.client.force_login(self.users['lawyer'])
+
+    @override_settings(QUERY_INSTRUMENTATION_HEADERS=True)
+    def test_reports_queries_in_headers(self):
+        response = self.client.get(reverse('task_list'))
+        self.assertEqual(response['X-Query-Count'], str(response.query_stats.count))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertGreater(response.query_stats.count, 0)
+        self.assertTrue(response.query_stats.slowest_sql.startswith('SELECT'))
+
+    @override_settings(QUERY_INSTRUMENTATION_HEADERS=False)
+    def test_headers_can_be_disabled(self):
+        response = self.client.get(reverse('task_list'))
+        self.assertNotIn('X-Query-Count', response)
+        self.assertTrue(hasattr(response, 'query_stats'))
+
+    @override_settings(QUERY_BUDGETS={'task_list': 1}, QUERY_BUDGETS_STRICT=False)
+    def test_exceeded_budget_is_logged(self):
+        with self.assertLogs('firm.instrumentation', 'WARNING') as logs:
+            response = self.client.get(reverse('task_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('exceeded its budget of 1 queries', logs.output[0])
+
+    @override_settings(QUERY_BUDGETS={'task_list': 1}, QUERY_BUDGETS_STRICT=True)
+    def test_exceeded_budget_fails_strict_requests(self):
+        with self.assertLogs('firm.instrumentation', 'WARNING'), self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('task_list'))
+
+    def test_budgets_name_existing_urls(self):
+        names = {name for name in get_resolver().reverse_dict if isinstance(name, str)}
+        self.assertEqual(set(settings.QUERY_BUDGETS) - names, set())
+
+
+class QueryBudgetTests(QueryBudgetTestCase):
+    """
+    Every page with a declared budget stays within it.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.users = create_firm()
+        self.case = Case.objects.first()
+        self.today = date.today().isoformat()
+
+    def get_within_budget(self, role, url_name, *args, **params):
+        self.client.force_login(self.users[role])
+        response = self.client.get(reverse(url_name, args=args), params)
+        self.assertEqual(response.status_code, 200, url_name)
+        self.assertWithinQueryBudget(response)
+
+    def test_lawyer_pages(self):
+        task = Task.objects.filter(assignor=self.users['lawyer']).first()
+        for url_name in ('lawyer_dashboard', 'task_list', 'view_cases', 'calendar', 'create_task', 'create_case'):
+            self.get_within_budget('lawyer', url_name)
+        self.get_within_budget('lawyer', 'date_detail', self.today)
+        self.get_within_budget('lawyer', 'view_case', self.case.pk)
+        self.get_within_budget('lawyer', 'update_case', self.case.pk)
+        self.get_within_budget('lawyer', 'update_task', task.pk)
+        self.get_within_budget('lawyer', 'search', q='land')
+        self.get_within_budget(
+            'lawyer', 'event_list_json',
+            start=self.today, end=(date.today() + timedelta(days=7)).isoformat(),
+        )
+
+    def test_secretary_pages(self):
+        for url_name in (
+            'secretary_dashboard', 'secretary_task_list', 'secretary_view_cases',
+            'secretary_calendar', 'secretary_create_task',
+        ):
+            self.get_within_budget('secretary', url_name)
+        self.get_within_budget('secretary', 'secretary_date_detail', self.today)
+        self.get_within_budget('secretary', 'secretary_view_case', self.case.pk)
+        self.get_within_budget(
+            'secretary', 'free_busy_json',
+            users=','.join(str(user.pk) for user in self.users.values()),
+            start=self.today, end=(date.today() + timedelta(days=7)).isoformat(),
+        )
+
+    def test_legal_assistant_pages(self):
+        for url_name in (
+            'legal_assistant_dashboard', 'legal_assistant_task_list', 'legal_assistant_view_cases',
+            'legal_assistant_calendar', 'legal_assistant_create_task',
+        ):
+            self.get_within_budget('legal_assistant', url_name)
+        self.get_within_budget('legal_assistant', 'legal_assistant_date_detail', self.today)
+        self.get_within_budget('legal_assistant', 'legal_assistant_view_case', self.case.pk)
+
+    def test_attache_pages(self):
+        for url_name in ('attache_dashboard', 'attache_task_list', 'attache_view_cases', 'attache_calendar'):
+            self.get_within_budget('attache', url_name)
+        self.get_within_budget('attache', 'attache_date_detail', self.today)
+        self.get_within_budget('attache', 'attache_view_case', self.case.pk)
+
+
+class DashboardFragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = create_firm()
+        self.lawyer = self.users['lawyer']
+        self.client.force_login(self.lawyer)
+
+    def get_dashboard(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('lawyer_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in context.captured_queries]
+
+    def test_cached_panels_fetch_no_data(self):
+        first, _queries = self.get_dashboard()
+        second, queries = self.get_dashboard()
+        self.assertEqual(second.content, first.content)
+        self.assertFalse([sql for sql in queries if 'firm_task' in sql or 'firm_case' in sql or 'firm_calendar' in sql])
+
+    def test_changed_panel_is_rendered_again(self):
+        self.get_dashboard()
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(title='Draft the plaint', assignor=self.lawyer, assignee=self.users['attache'], due_date=date.today())
+        response, queries = self.get_dashboard()
+        total = Task.objects.filter(assignor=self.lawyer).count() + Task.objects.filter(assignee=self.lawyer).count()
+        self.assertContains(response, f'<span class="badge bg-primary rounded-pill">{total}</span>', html=False)
+        self.assertTrue([sql for sql in queries if 'firm_task' in sql])
+        # The case overview did not change and is still served from the cache
+        self.assertFalse([sql for sql in queries if 'firm_case' in sql])
+
+
+class SeedAndBenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def seed_firm(self, random_seed=0):
+        counts = {'lawyer': 2, 'secretary': 1, 'legal_assistant': 1, 'attache': 1}
+        return seed(counts, 4, 3, 6, 3, 1.0, random_seed)
+
+    def test_seed_creates_a_firm(self):
+        created = self.seed_firm()
+        self.assertEqual(created['users'], 5)
+        self.assertEqual(Case.objects.count(), created['cases'])
+        self.assertEqual(Document.objects.count(), created['documents'])
+        self.assertGreater(created['tasks'], 0)
+        self.assertEqual(created['events'], Calendar.objects.count())
+        # Task assignments follow the role rules of create_task
+        self.assertFalse(Task.objects.filter(assignor__role='attache').exists())
+        self.assertFalse(Task.objects.filter(assignor__role='secretary', assignee__role='lawyer').exists())
+
+    def test_seed_is_reproducible(self):
+        first = self.seed_firm(random_seed=7)
+        titles = list(Case.objects.order_by('case_number').values_list('client_name', flat=True))
+        clear_seed()
+        self.assertFalse(seeded_users().exists())
+        self.assertEqual(self.seed_firm(random_seed=7), first)
+        self.assertEqual(list(Case.objects.order_by('case_number').values_list('client_name', flat=True)), titles)
+
+    def test_benchmark_reports_every_page(self):
+        self.seed_firm()
+        results = run_benchmark(requests=3, warmup=0)
+        self.assertEqual(len(results), sum(len(pages) for pages in ROLE_PAGES.values()))
+        for result in results:
+            self.assertEqual(result['requests'], 3)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['queries_max'], 0)
+
+
+class MicrobenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_every_benchmark_is_measured(self):
+        results = run_microbenchmarks(min_time=0.001, repeat=1)
+        self.assertEqual([result['name'] for result in results], list(MICROBENCHMARKS))
+        for result in results:
+            self.assertGreater(result['best_us'], 0)
+            self.assertLessEqual(result['best_us'], result['median_us'])
+
+    def test_regressions_past_the_threshold_are_reported(self):
+        baseline = {'results': [{'name': 'event_json', 'best_us': 100.0, 'peak_kib': 10.0}]}
+        results = [{'name': 'event_json', 'best_us': 120.0, 'peak_kib': 20.0}]
+        self.assertEqual(find_regressions(results, baseline, 0.25), [('event_json', 'peak_kib', 10.0, 20.0)])
+        self.assertEqual(find_regressions(results, {'results': []}, 0.25), [])
+
+
+class RecurrenceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('lawyer', password='password123', role='lawyer')
+
+    def take(self, dates, number):
+        return [next(dates) for _number in range(number)]
+
+    def window(self, start, end):
+        return [
+            (occurrence.title, occurrence.start_time)
+            for occurrence in occurrences_in_window(Calendar.objects.filter(user=self.user), start, end)
+        ]
+
+    def test_parse_normalizes_and_rejects(self):
+        rule = RecurrenceRule.parse('rrule:freq=monthly;byday=1mo;until=20261231')
+        self.assertEqual(str(rule), 'FREQ=MONTHLY;BYDAY=1MO;UNTIL=20261231T235959Z')
+        for text in (
+            'FREQ=HOURLY', 'FREQ=DAILY;COUNT=0', 'FREQ=WEEKLY;BYDAY=1MO', 'FREQ=DAILY;BYSETPOS=1',
+            'FREQ=DAILY;COUNT=2;UNTIL=20260101', 'FREQ=WEEKLY;BYMONTHDAY=3', 'FREQ=DAILY;INTERVAL=0',
+        ):
+            with self.assertRaises(ValueError, msg=text):
+                RecurrenceRule.parse(text)
+
+    def test_dates(self):
+        rule = RecurrenceRule.parse('FREQ=WEEKLY;BYDAY=MO,WE;INTERVAL=2')
+        # Starts on a Wednesday
+        self.assertEqual(
+            self.take(rule.dates(date(2026, 1, 7)), 4),
+            [date(2026, 1, 7), date(2026, 1, 19), date(2026, 1, 21), date(2026, 2, 2)],
+        )
+        self.assertEqual(
+            self.take(rule.dates(date(2026, 1, 7), from_day=date(2026, 3, 1)), 3),
+            [date(2026, 2, 16), date(2026, 2, 18), date(2026, 3, 2)],
+        )
+        self.assertEqual(
+            self.take(RecurrenceRule.parse('FREQ=MONTHLY;BYDAY=-1FR').dates(date(2026, 1, 30)), 3),
+            [date(2026, 1, 30), date(2026, 2, 27), date(2026, 3, 27)],
+        )
+        # Months without a 31st are skipped
+        self.assertEqual(
+            self.take(RecurrenceRule.parse('FREQ=MONTHLY').dates(date(2026, 1, 31)), 3),
+            [date(2026, 1, 31), date(2026, 3, 31), date(2026, 5, 31)],
+        )
+        self.assertEqual(
+            self.take(RecurrenceRule.parse('FREQ=YEARLY').dates(date(2024, 2, 29)), 2),
+            [date(2024, 2, 29), date(2028, 2, 29)],
+        )
+
+    def test_rules_that_never_repeat_end(self):
+        for text, first in (
+            # Only ever visits April, which has no 31st
+            ('FREQ=MONTHLY;INTERVAL=12;BYMONTHDAY=31;COUNT=2', date(2026, 4, 30)),
+            # Every seventh day from a Monday is never a Tuesday
+            ('FREQ=DAILY;INTERVAL=7;BYDAY=TU;COUNT=2', date(2026, 10, 19)),
+            ('FREQ=DAILY;INTERVAL=7;BYDAY=TU', date(2026, 10, 19)),
+        ):
+            rule = RecurrenceRule.parse(text)
+            self.assertEqual(list(rule.dates(first)), [first], text)
+            self.assertFalse(rule.repeats(first))
+
+        event = Calendar.objects.create(
+            user=self.user, title='Review', start_time=aware(2026, 4, 30, 9), end_time=aware(2026, 4, 30, 10),
+            recurrence_rule='FREQ=MONTHLY;INTERVAL=12;BYMONTHDAY=31;COUNT=2',
+        )
+        self.assertEqual(event.recurrence_end, aware(2026, 4, 30, 10))
+        event.recurrence_rule = 'FREQ=DAILY;INTERVAL=7;BYDAY=TU'
+        event.save()
+        self.assertEqual(self.window(aware(2026, 5, 1), aware(2027, 5, 1)), [])
+
+    def test_form_rejects_rules_that_never_repeat(self):
+        data = {
+            'title': 'Review', 'start_time': '2026-04-30T09:00', 'end_time': '2026-04-30T10:00',
+            'event_type': 'meeting', 'recurrence_rule': 'FREQ=MONTHLY;INTERVAL=12;BYMONTHDAY=31;COUNT=2',
+        }
+        form = CalendarEventForm(data, user=self.user)
+        self.assertFalse(form.is_valid())
+        self.assertIn('recurrence_rule', form.errors)
+        data['recurrence_rule'] = 'FREQ=MONTHLY;BYMONTHDAY=31;COUNT=2'
+        self.assertTrue(CalendarEventForm(data, user=self.user).is_valid())
+
+    def test_count_and_until_bound_the_series(self):
+        counted = Calendar.objects.create(
+            user=self.user, title='Filing', start_time=aware(2026, 1, 1, 9), end_time=aware(2026, 1, 1, 10),
+            recurrence_rule='FREQ=MONTHLY;COUNT=3',
+        )
+        until = Calendar.objects.create(
+            user=self.user, title='Mention', start_time=aware(2026, 1, 5, 9), end_time=aware(2026, 1, 5, 10),
+            recurrence_rule='FREQ=WEEKLY;UNTIL=20260119',
+        )
+        self.assertEqual(counted.recurrence_end, aware(2026, 3, 1, 10))
+        self.assertEqual(until.recurrence_end, aware(2026, 1, 19, 10))
+        self.assertEqual(self.window(aware(2026, 1, 1), aware(2026, 12, 1)), [
+            ('Filing', aware(2026, 1, 1, 9)), ('Mention', aware(2026, 1, 5, 9)),
+            ('Mention', aware(2026, 1, 12, 9)), ('Mention', aware(2026, 1, 19, 9)),
+            ('Filing', aware(2026, 2, 1, 9)), ('Filing', aware(2026, 3, 1, 9)),
+        ])
+
+    def test_exdates_and_overrides(self):
+        weekly = Calendar.objects.create(
+            user=self.user, title='Status', start_time=aware(2026, 1, 5, 9), end_time=aware(2026, 1, 5, 10),
+            recurrence_rule='FREQ=WEEKLY',
+        )
+        self.assertIsNone(weekly.recurrence_end)
+        weekly.cancel_occurrence(aware(2026, 6, 8, 9))
+        moved = weekly.override_occurrence(
+            aware(2026, 6, 1, 9), title='Status (moved)', start_time=aware(2026, 6, 2, 14), end_time=aware(2026, 6, 2, 15),
+        )
+        self.assertEqual(moved.recurrence_parent, weekly)
+        self.assertEqual(self.window(aware(2026, 6, 1), aware(2026, 6, 16)), [
+            ('Status (moved)', aware(2026, 6, 2, 14)), ('Status', aware(2026, 6, 15, 9)),
+        ])
+        weekly.delete()
+        self.assertEqual(self.window(aware(2026, 6, 1), aware(2026, 6, 16)), [])
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('lawyer', password='password123', role='lawyer')
+        self.other = User.objects.create_user('other', password='password123', role='lawyer')
+        now = timezone.now()
+        self.events = [
+            Calendar.objects.create(user=self.user, title=f'Meeting {number}', start_time=now, end_time=now + timedelta(hours=1))
+            for number in range(5)
+        ]
+        Calendar.objects.create(user=self.other, title='Not mine', start_time=now, end_time=now)
+        self.client.force_login(self.user)
+        self.url = reverse('sync_changes', args=['events'])
+
+    def sync(self, cursor=None, limit=None, status=200):
+        params = {'cursor': cursor or '', 'limit': limit or ''}
+        response = self.client.get(self.url, {name: value for name, value in params.items() if value})
+        self.assertEqual(response.status_code, status)
+        return response.json()
+
+    def test_pages_through_changes_and_tombstones(self):
+        page = self.sync(limit=2)
+        self.assertEqual([change['id'] for change in page['changes']], [event.pk for event in self.events[:2]])
+        self.assertTrue(page['has_more'])
+        page = self.sync(page['cursor'], limit=10)
+        self.assertEqual(len(page['changes']), 3)
+        self.assertFalse(page['has_more'])
+        cursor = page['cursor']
+        self.assertEqual(self.sync(cursor)['changes'], [])
+
+        self.events[1].delete()
+        self.events[2].title = 'Moved'
+        self.events[2].save()
+        self.assertEqual(Calendar.objects.filter(user=self.user).count(), 4)
+        changes = self.sync(cursor)['changes']
+        self.assertEqual(changes[0], {'id': self.events[1].pk, 'deleted': True})
+        self.assertEqual(changes[1]['title'], 'Moved')
+
+    def test_bad_cursor_and_kind(self):
+        self.sync('tampered', status=400)
+        self.assertEqual(self.client.get(reverse('sync_changes', args=['diary'])).status_code, 404)
+
+    @override_settings(SYNC_SETTLE_SECONDS=60)
+    def test_recent_changes_wait_for_the_settle_window(self):
+        self.assertEqual(self.sync()['changes'], [])
+        Calendar.all_objects.update(updated_at=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(len(self.sync()['changes']), 5)
+
+    def test_quiet_calendar_cursor_does_not_expire(self):
+        Calendar.all_objects.update(updated_at=timezone.now() - timedelta(days=100))
+        page = self.sync()
+        self.assertEqual(len(page['changes']), 5)
+        # Nothing changed for longer than the retention period, but the
+        # client has just caught up.
+        page = self.sync(page['cursor'])
+        self.assertEqual(page['changes'], [])
+        self.sync(page['cursor'])
+
+    def test_cursor_of_a_client_away_too_long_expires(self):
+        long_ago = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS + 1)
+        self.sync(encode_sync_cursor(long_ago, self.events[0].pk, long_ago), status=410)
+
+    def test_purge_removes_old_tombstones_only(self):
+        self.events[0].delete()
+        self.events[1].delete()
+        Calendar.all_objects.filter(pk=self.events[0].pk).update(deleted_at=timezone.now() - timedelta(days=100))
+        self.assertEqual(purge_tombstones(), 1)
+        self.assertFalse(Calendar.all_objects.filter(pk=self.events[0].pk).exists())
+        self.assertTrue(Calendar.all_objects.filter(pk=self.events[1].pk).exists())
+
+    def tombstones(self, kind, user, cursor):
+        changes, _cursor, _has_more = changes_since(kind, user, cursor)
+        return {change['id'] for change in changes if change.get('deleted')}
+
+    def test_queryset_delete_leaves_tombstones(self):
+        cursor = self.sync()['cursor']
+        override = self.events[0].override_occurrence(self.events[0].start_time, title='Moved')
+        self.events[0].recurrence_rule = 'FREQ=DAILY'
+        self.events[0].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted = Calendar.objects.filter(pk__in=[self.events[0].pk, self.events[1].pk]).delete()
+        self.assertEqual(deleted, (3, {'firm.Calendar': 3}))
+        self.assertEqual(Calendar.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(self.tombstones('events', self.user, cursor), {self.events[0].pk, self.events[1].pk, override.pk})
+
+    def test_queryset_delete_invalidates_cached_data(self):
+        [before] = get_versions(('calendar', self.user.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            Calendar.objects.filter(user=self.user).delete()
+        self.assertNotEqual(get_versions(('calendar', self.user.pk)), [before])
+
+    def test_admin_delete_action_leaves_tombstones(self):
+        cursor = self.sync()['cursor']
+        task = Task.objects.create(title='File', assignor=self.other, assignee=self.user, due_date=date.today())
+        task_cursor = changes_since('tasks', self.user)[1]
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password123'))
+        for model, pks in [('calendar', [self.events[0].pk]), ('task', [task.pk])]:
+            response = self.client.post(reverse(f'admin:firm_{model}_changelist'), {
+                'action': 'delete_selected', 'post': 'yes', '_selected_action': pks,
+            })
+            self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.tombstones('events', self.user, cursor), {self.events[0].pk})
+        self.assertEqual(self.tombstones('tasks', self.user, task_cursor), {task.pk})
+
+    def test_deleting_a_user_touches_their_tasks(self):
+        task = Task.objects.create(title='File', assignor=self.other, assignee=self.user, due_date=date.today())
+        Task.all_objects.filter(pk=task.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        cursor = changes_since('tasks', self.user)[1]
+        self.other.delete()
+        [change], _cursor, _has_more = changes_since('tasks', self.user, cursor)
+        self.assertEqual((change['id'], change['assignor']), (task.pk, None))
+
+
+class BulkTaskTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lawyer = User.objects.create_user('lawyer', password='password123', role='lawyer')
+        self.attache = User.objects.create_user('attache', password='password123', role='attache')
+        self.other = User.objects.create_user('other', password='password123', role='attache')
+        self.mine = [
+            Task.objects.create(title=f'Task {number}', assignor=self.lawyer, assignee=self.attache, due_date=date.today())
+            for number in range(3)
+        ]
+        self.to_me = Task.objects.create(title='Request', assignor=self.other, assignee=self.lawyer, due_date=date.today())
+        self.theirs = Task.objects.create(title='Theirs', assignor=self.other, assignee=self.other, due_date=date.today())
+        self.ids = {task.pk for task in self.mine}
+
+    def update(self, task_ids, **data):
+        form = BulkTaskForm(data, user=self.lawyer)
+        self.assertTrue(form.is_valid(), form.errors)
+        with self.captureOnCommitCallbacks(execute=True):
+            return bulk_update_tasks(self.lawyer, task_ids, form)
+
+    def test_parse_task_ids(self):
+        self.assertEqual(parse_task_ids(['3', '1', '3']), {1, 3})
+        for values in (['abc'], []):
+            with self.assertRaises(BulkTaskError):
+                parse_task_ids(values)
+        with override_settings(BULK_TASK_MAX_SELECTION=2), self.assertRaises(BulkTaskError):
+            parse_task_ids(['1', '2', '3'])
+
+    def test_updates_tasks_the_user_may_change(self):
+        self.assertEqual(self.update(self.ids | {self.to_me.pk}, action='status', status='completed'), 4)
+        self.assertEqual(Task.objects.filter(status='completed').count(), 4)
+        self.update(self.ids, action='reassign', assignee=self.other.pk)
+        self.assertEqual(Task.objects.filter(assignee=self.other).count(), 4)
+
+    def test_is_all_or_nothing(self):
+        with self.assertRaisesMessage(BulkTaskError, 'not authorized to change 1'):
+            self.update(self.ids | {self.theirs.pk}, action='priority', priority='urgent')
+        self.assertFalse(Task.objects.filter(priority='urgent').exists())
+        # Only the assignor may delete
+        with self.assertRaisesMessage(BulkTaskError, 'not authorized to delete 1'):
+            self.update(self.ids | {self.to_me.pk}, action='delete')
+        self.assertEqual(Task.objects.count(), 5)
+
+    def test_delete_leaves_tombstones(self):
+        self.assertEqual(self.update(self.ids, action='delete'), 3)
+        self.assertEqual(set(Task.objects.values_list('pk', flat=True)), {self.to_me.pk, self.theirs.pk})
+        self.assertEqual(set(Task.all_objects.filter(deleted_at__isnull=False).values_list('pk', flat=True)), self.ids)
+
+    def test_failed_action_message_is_not_hidden_by_a_304(self):
+        self.client.force_login(self.lawyer)
+        etag = self.client.get(reverse('task_list'))['ETag']
+        response = self.client.post(reverse('bulk_task_action'), {'tasks': [self.theirs.pk], 'action': 'delete'})
+        self.assertRedirects(response, reverse('task_list'), fetch_redirect_response=False)
+        response = self.client.get(reverse('task_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'not authorized to delete 1')
+        self.assertEqual(self.client.get(reverse('task_list'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_only_lawyers_may_post(self):
+        self.client.force_login(self.attache)
+        response = self.client.post(
+            reverse('bulk_task_action'), {'tasks': [self.mine[0].pk], 'action': 'status', 'status': 'completed'},
+        )
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        self.assertEqual(Task.objects.get(pk=self.mine[0].pk).status, 'pending')
+
+
+class BlobStorageTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.media = media.name
+        self.lawyer = User.objects.create_user('lawyer', password='password123', role='lawyer')
+
+    def upload(self, content, name='brief.pdf'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Document.objects.create(user=self.lawyer, file=ContentFile(content, name=name))
+
+    def delete(self, document):
+        with self.captureOnCommitCallbacks(execute=True):
+            document.delete()
+
+    def test_identical_files_share_one_blob(self):
+        first = self.upload(b'same content', 'Brief.PDF')
+        second = self.upload(b'same content', 'copy.pdf')
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertTrue(first.file.name.startswith('blobs/'))
+        self.assertEqual(first.filename(), 'Brief.PDF')
+        self.assertTrue(Blob.objects.filter(name=first.file.name).exists())
+        self.assertEqual(os.listdir(os.path.join(self.media, 'blobs', 'tmp')), [])
+
+    def test_blob_is_released_with_its_last_document(self):
+        first = self.upload(b'same content')
+        second = self.upload(b'same content')
+        path = first.file.path
+        self.delete(first)
+        self.assertTrue(os.path.exists(path))
+        self.delete(second)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(Blob.objects.exists())
+
+    def test_upload_in_progress_keeps_a_released_blob(self):
+        document = self.upload(b'same content')
+        path = document.file.path
+        # The release runs after an identical upload stored the blob again;
+        # its row is visible here, so the file stays.
+        with self.captureOnCommitCallbacks(execute=True):
+            document.delete()
+            again = Document.objects.create(user=self.lawyer, file=ContentFile(b'same content', name='again.pdf'))
+        self.assertEqual(again.file.name, document.file.name)
+        self.assertTrue(os.path.exists(path))
+
+
+@override_settings(SCHEDULING_WORKDAY_START='08:00', SCHEDULING_WORKDAY_END='17:00', SCHEDULING_WORKING_DAYS=(0, 1, 2, 3, 4))
+class FreeBusyTests(TestCase):
+    # Monday 1 June 2026 to Wednesday
+    start, end = aware(2026, 6, 1), aware(2026, 6, 3)
+
+    def setUp(self):
+        self.first = User.objects.create_user('first', password='password123', role='lawyer')
+        self.second = User.objects.create_user('second', password='password123', role='attache')
+        for event_start, event_end in (
+            # Starts before the window
+            (aware(2026, 5, 31, 23), aware(2026, 6, 1, 8, 30)),
+            # Touches the previous one
+            (aware(2026, 6, 1, 8, 30), aware(2026, 6, 1, 9)),
+            # Overlap each other
+            (aware(2026, 6, 1, 10), aware(2026, 6, 1, 11)),
+            (aware(2026, 6, 1, 10, 30), aware(2026, 6, 1, 11, 30)),
+        ):
+            self.add_event(self.first, event_start, event_end)
+        self.add_event(self.first, aware(2026, 6, 1), aware(2026, 6, 2), is_all_day=True)
+        self.add_event(self.second, aware(2026, 5, 25, 13), aware(2026, 5, 25, 14), recurrence_rule='FREQ=WEEKLY')
+
+    def add_event(self, user, start_time, end_time, **fields):
+        return Calendar.objects.create(user=user, title='Busy', start_time=start_time, end_time=end_time, **fields)
+
+    def test_merge_intervals(self):
+        self.assertEqual(merge_intervals([(5, 7), (1, 3), (3, 4), (2, 3), (6, 6)]), [(1, 4), (5, 7)])
+        self.assertEqual(merge_intervals([(1, 10), (2, 3)]), [(1, 10)])
+        self.assertEqual(merge_intervals([]), [])
+
+    def test_busy_intervals_are_clipped_and_merged(self):
+        busy = busy_intervals(Calendar.objects.all(), self.start, self.end)
+        self.assertEqual(busy[self.first.pk], [(self.start, aware(2026, 6, 1, 9)), (aware(2026, 6, 1, 10), aware(2026, 6, 1, 11, 30))])
+        # Recurring occurrences count; the all-day event does not
+        self.assertEqual(busy[self.second.pk], [(aware(2026, 6, 1, 13), aware(2026, 6, 1, 14))])
+
+    def test_common_free_slots(self):
+        slots, _busy = find_common_free_slots(Calendar.objects.all(), self.start, self.end, timedelta(hours=1), 5)
+        self.assertEqual([(slot_start.hour, slot_start.minute) for slot_start, _slot_end in slots], [
+            (9, 0), (11, 30), (14, 0), (15, 0), (16, 0),
+        ])
+
+    def test_slots_are_laid_back_to_back_at_the_requested_length(self):
+        busy = [(aware(2026, 6, 1, 9), aware(2026, 6, 1, 10)), (aware(2026, 6, 1, 16, 30), aware(2026, 6, 1, 17))]
+        slots = free_slots(busy, self.start, aware(2026, 6, 2), timedelta(minutes=45), 20)
+        self.assertEqual(slots[0], (aware(2026, 6, 1, 8), aware(2026, 6, 1, 8, 45)))
+        self.assertEqual(slots[1][0], aware(2026, 6, 1, 10))
+        # Nothing straddles the busy block at the end of the working day
+        self.assertEqual(slots[-1], (aware(2026, 6, 1, 15, 15), aware(2026, 6, 1, 16)))
+        self.assertEqual(len(slots), 9)
+        # Weekends have no working hours
+        self.assertEqual(free_slots([], aware(2026, 6, 6), aware(2026, 6, 8), timedelta(hours=1), 5), [])
+
+    def test_free_busy_json(self):
+        params = {
+            'users': f'{self.first.pk},{self.second.pk}', 'start': '2026-06-01', 'end': '2026-06-03',
+            'duration': 60, 'count': 2,
+        }
+        secretary = User.objects.create_user('secretary', password='password123', role='secretary')
+        self.client.force_login(secretary)
+        data = self.client.get(reverse('free_busy_json'), params).json()
+        self.assertEqual(len(data['free']), 2)
+        self.assertEqual(data['free'][0][0], aware(2026, 6, 1, 9).isoformat())
+        self.assertEqual(len(data['busy'][str(self.second.pk)]), 1)
+        self.assertEqual(self.client.get(reverse('free_busy_json'), {**params, 'duration': 1}).status_code, 400)
+        self.client.force_login(self.first)
+        self.assertEqual(self.client.get(reverse('free_busy_json'), params).status_code, 403)
+
+
+class ConflictTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('lawyer', password='password123', role='lawyer')
+
+    def occurrence(self, title, start_time, end_time, **fields):
+        return Occurrence(Calendar(title=title, start_time=start_time, end_time=end_time, **fields), start_time, end_time)
+
+    def titles(self, pairs):
+        return sorted((first.title, second.title) for first, second in pairs)
+
+    def test_overlapping_pairs(self):
+        occurrences = [
+            self.occurrence('long', aware(2026, 6, 1, 9), aware(2026, 6, 1, 12)),
+            self.occurrence('inside', aware(2026, 6, 1, 10), aware(2026, 6, 1, 11)),
+            self.occurrence('overlaps', aware(2026, 6, 1, 11, 30), aware(2026, 6, 1, 13)),
+            # Touching is not overlapping
+            self.occurrence('after', aware(2026, 6, 1, 13), aware(2026, 6, 1, 14)),
+            self.occurrence('all day', aware(2026, 6, 1), aware(2026, 6, 2), is_all_day=True),
+            self.occurrence('deadline', aware(2026, 6, 1, 10, 30), aware(2026, 6, 1, 10, 30)),
+        ]
+        self.assertEqual(self.titles(overlapping_pairs(occurrences)), [('long', 'inside'), ('long', 'overlaps')])
+
+    def test_find_conflicts_of_a_series(self):
+        Calendar.objects.create(user=self.user, title='Hearing', start_time=aware(2026, 6, 15, 9, 30), end_time=aware(2026, 6, 15, 11))
+        Calendar.objects.create(user=self.user, title='Lunch', start_time=aware(2026, 6, 8, 12), end_time=aware(2026, 6, 8, 13))
+        series = Calendar(
+            user=self.user, title='Status', start_time=aware(2026, 6, 1, 9), end_time=aware(2026, 6, 1, 10),
+            recurrence_rule='FREQ=WEEKLY;COUNT=4',
+        )
+        conflicts = find_conflicts(series, Calendar.objects.filter(user=self.user))
+        self.assertEqual([(candidate.start_time, existing.title) for candidate, existing in conflicts], [
+            (aware(2026, 6, 15, 9), 'Hearing'),
+        ])
+        # An edited event does not conflict with itself
+        series.save()
+        self.assertEqual(len(find_conflicts(series, Calendar.objects.filter(user=self.user))), 1)
+
+    def test_form_rejects_overlaps_unless_allowed(self):
+        Calendar.objects.create(user=self.user, title='Hearing', start_time=aware(2026, 6, 1, 9), end_time=aware(2026, 6, 1, 11))
+        data = {'title': 'Meeting', 'start_time': '2026-06-01T10:00', 'end_time': '2026-06-01T12:00', 'event_type': 'meeting'}
+        form = CalendarEventForm(data, user=self.user)
+        self.assertFalse(form.is_valid())
+        self.assertIn('Overlaps with Hearing', str(form.errors))
+        self.assertTrue(CalendarEventForm({**data, 'allow_overlap': 'on'}, user=self.user).is_valid())
+
+    def test_event_conflicts_json(self):
+        Calendar.objects.create(user=self.user, title='Hearing', start_time=aware(2026, 6, 1, 9), end_time=aware(2026, 6, 1, 11))
+        Calendar.objects.create(user=self.user, title='Meeting', start_time=aware(2026, 6, 1, 10), end_time=aware(2026, 6, 1, 12))
+        self.client.force_login(self.user)
+        url = reverse('event_conflicts_json')
+        data = self.client.get(url, {'start': '2026-06-01', 'end': '2026-06-02'}).json()
+        self.assertEqual([[pair[0]['title'], pair[1]['title']] for pair in data['conflicts']], [['Hearing', 'Meeting']])
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+@override_settings(DOCUMENT_UPLOAD_CHUNK_SIZE=4)
+class ChunkedUploadTests(TestCase):
+    content = b'0123456789'
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(
+            MEDIA_ROOT=media.name, DOCUMENT_UPLOAD_TEMP_DIR=os.path.join(media.name, 'upload_tmp'),
+        ))
+        self.lawyer = User.objects.create_user('lawyer', password='password123', role='lawyer')
+        self.case = Case.objects.create(case_number='HC-1', client_name='Client', description='Land', lawyer=self.lawyer)
+        self.session = start_upload(self.lawyer, self.case, 'brief.pdf', len(self.content), sha256(self.content))
+
+    def send(self, index, data=None):
+        data = self.content[index * 4:index * 4 + 4] if data is None else data
+        return write_chunk(self.session.pk, index, data, sha256(data))
+
+    def assertUploadError(self, status, function, *args):
+        with self.assertRaises(UploadError) as context:
+            function(*args)
+        self.assertEqual(context.exception.status, status)
+
+    def test_chunks_are_assembled_and_finalized(self):
+        self.assertEqual(self.session.total_chunks, 3)
+        for index in range(3):
+            self.send(index)
+        with self.captureOnCommitCallbacks(execute=True):
+            document = finalize_upload(self.session.pk)
+        self.assertEqual(document.case, self.case)
+        self.assertEqual(document.filename(), 'brief.pdf')
+        with document.file.open('rb') as handle:
+            self.assertEqual(handle.read(), self.content)
+        self.assertFalse(os.path.exists(temp_path(self.session)))
+        # Finalizing again returns the same document
+        self.assertEqual(finalize_upload(self.session.pk), document)
+        self.assertUploadError(409, self.send, 2)
+
+    def test_out_of_order_and_duplicate_chunks(self):
+        self.assertUploadError(409, self.send, 1)
+        self.send(0)
+        session = self.send(0)
+        self.assertEqual((session.received_chunks, session.received_bytes), (1, 4))
+        self.assertUploadError(409, self.send, 5)
+
+    def test_bad_chunks_are_rejected(self):
+        self.assertUploadError(400, self.send, 0, b'012')
+        self.assertUploadError(422, write_chunk, self.session.pk, 0, b'0123', sha256(b'abcd'))
+        self.send(0)
+        self.send(1)
+        self.assertUploadError(409, finalize_upload, self.session.pk)
+        self.assertUploadError(400, start_upload, self.lawyer, self.case, 'brief.exe', 10, sha256(b''))
+
+    def test_assembled_file_must_match_its_checksum(self):
+        session = start_upload(self.lawyer, self.case, 'brief.pdf', 4, sha256(b'other'))
+        write_chunk(session.pk, 0, b'0123', sha256(b'0123'))
+        self.assertUploadError(422, finalize_upload, session.pk)
+
+    def test_expired_uploads_are_refused_and_purged(self):
+        self.send(0)
+        active = start_upload(self.lawyer, self.case, 'notes.pdf', 4, sha256(b'0123'))
+        UploadSession.objects.filter(pk=self.session.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertUploadError(410, self.send, 1)
+        self.assertUploadError(410, finalize_upload, self.session.pk)
+
+        self.assertEqual(purge_expired_uploads(), 1)
+        self.assertFalse(UploadSession.objects.filter(pk=self.session.pk).exists())
+        self.assertFalse(os.path.exists(temp_path(self.session)))
+        self.assertTrue(os.path.exists(temp_path(active)))
+
+    def test_chunks_push_the_expiry_back(self):
+        UploadSession.objects.filter(pk=self.session.pk).update(expires_at=timezone.now() + timedelta(minutes=1))
+        session = self.send(0)
+        self.assertGreater(session.expires_at, timezone.now() + timedelta(hours=1))
+
+
+class CaseImportTests(TestCase):
+    header = 'case_number,client_name,description,case_type,lawyer,status\n'
+
+    def setUp(self):
+        self.lawyer = User.objects.create_user('lawyer', password='password123', role='lawyer')
+        User.objects.create_user('secretary', password='password123', role='secretary')
+
+    def import_rows(self, *rows, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return import_cases(io.StringIO(self.header + ''.join(f'{row}\n' for row in rows)), **kwargs)
+
+    def test_rows_are_imported_across_batches(self):
+        rows = [f'HC-{number},Client {number},Land,civil,lawyer,' for number in range(5)]
+        result = self.import_rows(*rows, batch_size=2)
+        self.assertEqual((result.created, result.skipped, result.errors), (5, 0, []))
+        self.assertEqual(
+            set(Case.objects.values_list('case_number', 'lawyer__username', 'status')),
+            {(f'HC-{number}', 'lawyer', 'open') for number in range(5)},
+        )
+
+    def test_duplicates_are_skipped(self):
+        Case.objects.create(case_number='HC-0', client_name='Client', description='Land', lawyer=self.lawyer)
+        result = self.import_rows(
+            'HC-0,Other,Land,civil,lawyer,', 'HC-1,Client,Land,civil,lawyer,', 'HC-1,Again,Land,civil,lawyer,',
+            batch_size=2,
+        )
+        self.assertEqual((result.created, result.skipped), (1, 2))
+        self.assertEqual(Case.objects.get(case_number='HC-1').client_name, 'Client')
+
+        result = self.import_rows('HC-0,Other,Land,civil,lawyer,', 'HC-1,Client,Land,civil,lawyer,')
+        self.assertEqual((result.created, result.skipped), (0, 2))
+
+    def test_rows_inserted_concurrently_are_not_counted_as_created(self):
+        is_valid = CaseImportForm.is_valid
+
+        def insert_first(form):
+            # Another import inserts HC-0 after this batch looked it up
+            Case.objects.get_or_create(
+                case_number='HC-0', defaults={'client_name': 'Theirs', 'description': 'Land', 'lawyer': self.lawyer},
+            )
+            return is_valid(form)
+
+        with mock.patch.object(CaseImportForm, 'is_valid', insert_first):
+            result = self.import_rows('HC-0,Ours,Land,civil,lawyer,', 'HC-1,Ours,Land,civil,lawyer,')
+        self.assertEqual((result.created, result.skipped), (1, 1))
+        self.assertEqual(Case.objects.get(case_number='HC-0').client_name, 'Theirs')
+
+    def test_bad_rows_are_reported_and_the_rest_imported(self):
+        result = self.import_rows(
+            'HC-0,Client,Land,bogus,lawyer,',
+            'HC-1,Client,Land,civil,secretary,',
+            'HC-2,Client,Land,civil,,',
+            'HC-3,Client,Land,family,lawyer,settled',
+        )
+        self.assertEqual(result.created, 1)
+        self.assertEqual([(line, number) for line, number, _messages in result.errors], [(2, 'HC-0'), (3, 'HC-1'), (4, 'HC-2')])
+        self.assertIn("lawyer: No lawyer with username 'secretary'.", result.errors[1][2])
+        self.assertEqual(result.errors[2][2], ['lawyer: This field is required.'])
+        self.assertEqual(Case.objects.get().status, 'settled')
+
+    def test_unparseable_jsonl_lines_are_reported(self):
+        result = import_cases(io.StringIO(
+            '{"case_number": "HC-0", "client_name": "Client", "description": "Land", "case_type": "civil", "lawyer": "lawyer"}\n'
+            '{bad\n'
+            '[1]\n'
+        ), 'jsonl')
+        self.assertEqual(result.created, 1)
+        self.assertEqual([line for line, _number, _messages in result.errors], [2, 3])
+        self.assertEqual(result.errors[1][2], ['Expected a JSON object.'])
+
+
+@override_settings(JOB_RETRY_BACKOFF=30, JOB_RETRY_MAX_DELAY=3600, JOB_LOCK_TIMEOUT=900)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.register('test.record', lambda number: self.calls.append(number))
+
+        def fail(number):
+            self.calls.append(number)
+            raise RuntimeError('Court registry unreachable')
+        self.register('test.fail', fail, max_attempts=2)
+
+    def register(self, name, func, **kwargs):
+        jobs.register(name, **kwargs)(func)
+        self.addCleanup(jobs.REGISTRY.pop, name)
+
+    def test_due_jobs_are_claimed_by_priority(self):
+        jobs.enqueue('test.record', number=1)
+        jobs.enqueue('test.record', priority=5, number=2)
+        later = jobs.enqueue('test.record', delay=timedelta(hours=1), number=3)
+        self.assertEqual(jobs.run_pending(), 2)
+        self.assertEqual(self.calls, [2, 1])
+        self.assertEqual(Job.objects.get(pk=later.pk).status, 'queued')
+
+    def test_claimed_job_is_not_claimed_again(self):
+        job = jobs.enqueue('test.record', number=1)
+        claimed = jobs.claim('worker-1')
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts, claimed.locked_by), (job.pk, 'running', 1, 'worker-1'))
+        self.assertIsNone(jobs.claim('worker-2'))
+
+    def test_failed_job_backs_off_then_fails(self):
+        job = jobs.enqueue('test.fail', number=1)
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertGreaterEqual(job.run_at, timezone.now() + timedelta(seconds=25))
+        self.assertIn('Court registry unreachable', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_retry_delay_doubles_up_to_the_cap(self):
+        with mock.patch('firm.jobs.random.uniform', return_value=1):
+            delays = [jobs.retry_delay(attempts).total_seconds() for attempts in (1, 2, 3, 10)]
+        self.assertEqual(delays, [30, 60, 120, 3600])
+
+    def test_stale_jobs_are_requeued(self):
+        job = jobs.enqueue('test.fail', number=1)
+        jobs.claim('worker-1')
+        self.assertEqual(jobs.requeue_stale(), 0)
+
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.locked_at), ('queued', '', None))
+
+    def test_stale_jobs_without_attempts_left_fail(self):
+        job = jobs.enqueue('test.fail', number=1)
+        Job.objects.filter(pk=job.pk).update(
+            status='running', attempts=2, locked_by='worker-1', locked_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(jobs.requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_at), ('failed', None))
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(jobs.claim('worker-2'))
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.lawyer = User.objects.create_user('lawyer', password='password123', role='lawyer')
+        self.other_lawyer = User.objects.create_user('other', password='password123', role='lawyer')
+        self.secretary = User.objects.create_user('secretary', password='password123', role='secretary')
+        self.case = Case.objects.create(
+            case_number='HC-1', client_name='Wanjiku Holdings',
+            description='Boundary dispute over land in Nakuru', lawyer=self.lawyer,
+        )
+
+    def found(self, user, text, **kwargs):
+        return [(result.kind, result.object.pk) for result in search(user, text, **kwargs)]
+
+    def test_index_follows_saves_and_deletes(self):
+        self.assertEqual(self.found(self.lawyer, 'nakuru'), [('case', self.case.pk)])
+
+        self.case.description = 'Boundary dispute over land in Naivasha'
+        self.case.save()
+        self.assertEqual(self.found(self.lawyer, 'nakuru'), [])
+        self.assertEqual(self.found(self.lawyer, 'naivasha'), [('case', self.case.pk)])
+
+        self.case.delete()
+        self.assertEqual(self.found(self.lawyer, 'naivasha'), [])
+
+    def test_results_are_ranked_by_relevance(self):
+        closer = Case.objects.create(
+            case_number='HC-2', client_name='Boundary Estates',
+            description='Boundary beacons moved at the boundary', lawyer=self.lawyer,
+        )
+        results = search(self.lawyer, 'boundary')
+        self.assertEqual([result.object for result in results], [closer, self.case])
+        self.assertGreater(results[0].score, results[1].score)
+
+    def test_last_term_matches_as_prefix(self):
+        self.assertEqual(self.found(self.lawyer, 'land nak'), [('case', self.case.pk)])
+        self.assertEqual(self.found(self.lawyer, 'nak land'), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.found(self.lawyer, 'boundary "( *'), [('case', self.case.pk)])
+        # OR is matched as a word, not as an operator
+        self.assertEqual(self.found(self.lawyer, 'nakuru OR zebra'), [])
+        self.assertEqual(self.found(self.lawyer, '"( *'), [])
+
+    def test_results_follow_role_visibility(self):
+        other_case = Case.objects.create(
+            case_number='HC-2', client_name='Otieno', description='Land boundary encroachment',
+            lawyer=self.other_lawyer,
+        )
+        own_entry = Diary.objects.create(user=self.lawyer, title='Site visit', content='Walked the boundary', date=date.today())
+        Diary.objects.create(user=self.secretary, title='Memo', content='Boundary file is late', date=date.today())
+
+        self.assertEqual(
+            set(self.found(self.lawyer, 'boundary')), {('case', self.case.pk), ('diary', own_entry.pk)},
+        )
+        self.assertEqual(
+            {kind for kind, _pk in self.found(self.secretary, 'boundary')}, {'case', 'diary'},
+        )
+        self.assertIn(('case', other_case.pk), self.found(self.secretary, 'boundary'))
+        self.assertNotIn(('diary', own_entry.pk), self.found(self.secretary, 'boundary'))
+
+    def test_search_json(self):
+        self.client.force_login(self.lawyer)
+        response = self.client.get(reverse('search_json'), {'q': 'nakuru'})
+        [result] = response.json()['results']
+        self.assertEqual(
+            (result['type'], result['id'], result['title'], result['url']),
+            ('case', self.case.pk, 'HC-1 - Wanjiku Holdings', reverse('view_case', args=[self.case.pk])),
+        )
+
+
+def docx(*paragraphs):
+    """
+    A minimal DOCX file holding ``paragraphs``, each split into two runs.
+    """
+    body = ''.join(
+        f'<w:p><w:r><w:t>{text[:3]}</w:t></w:r><w:r><w:t>{text[3:]}</w:t></w:r></w:p>' for text in paragraphs
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr(
+            'word/document.xml',
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f'<w:body>{body}</w:body></w:document>',
+        )
+    return buffer.getvalue()
+
+
+class TextExtractionTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.lawyer = User.objects.create_user('lawyer', password='password123', role='lawyer')
+
+    def upload(self, content, name):
+        return Document.objects.create(user=self.lawyer, file=ContentFile(content, name=name), description='Filed')
+
+    def test_upload_queues_extraction(self):
+        document = self.upload(docx('Affidavit of Kamau', 'Sworn at Nairobi'), 'affidavit.docx')
+        self.assertEqual(
+            list(Job.objects.values_list('name', 'payload')),
+            [('documents.extract_text', {'document_id': document.pk})],
+        )
+        self.assertFalse(DocumentText.objects.exists())
+
+        self.assertEqual(jobs.run_pending(), 1)
+        text = DocumentText.objects.get(document=document)
+        self.assertEqual((text.status, text.text), ('done', 'Affidavit of Kamau\nSworn at Nairobi'))
+        self.assertEqual(Job.objects.get().status, 'done')
+
+    def test_extracted_text_is_searchable(self):
+        document = self.upload(docx('Affidavit of Kamau'), 'affidavit.docx')
+        self.assertEqual(search(self.lawyer, 'kamau'), [])
+        extract_document_text(document.pk)
+        self.assertEqual([result.object for result in search(self.lawyer, 'kamau')], [document])
+
+    def test_unchanged_file_is_not_extracted_again(self):
+        document = self.upload(docx('Affidavit of Kamau'), 'affidavit.docx')
+        extract_document_text(document.pk)
+        with mock.patch('firm.extraction.extract_text') as extract_text:
+            self.assertEqual(extract_document_text(document.pk).text, 'Affidavit of Kamau')
+        extract_text.assert_not_called()
+
+    @override_settings(DOCUMENT_TEXT_MAX_CHARS=10)
+    def test_text_is_capped(self):
+        document = self.upload(docx('Affidavit of Kamau', 'Sworn at Nairobi'), 'affidavit.docx')
+        self.assertEqual(extract_document_text(document.pk).text, 'Affidavit ')
+
+    def test_unsupported_format_is_recorded(self):
+        document = self.upload(b'\xd0\xcf\x11\xe0 legacy word file', 'brief.doc')
+        jobs.run_pending()
+        text = DocumentText.objects.get(document=document)
+        self.assertEqual((text.status, text.text), ('unsupported', ''))
+        self.assertIn('.doc', text.error)
+        # Nothing to retry: the job itself succeeded
+        self.assertEqual(Job.objects.get().status, 'done')
+
+    def test_corrupt_file_is_recorded_as_failed(self):
+        document = self.upload(b'not a zip archive', 'brief.docx')
+        with self.assertLogs('firm.extraction', 'WARNING'):
+            text = extract_document_text(document.pk)
+        self.assertEqual(text.status, 'failed')
+        self.assertTrue(text.error)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.lawyer = User.objects.create_user('lawyer', password='password123', role='lawyer')
+        self.other_lawyer = User.objects.create_user('other', password='password123', role='lawyer')
+        self.client.force_login(self.lawyer)
+
+    def export(self, kind, **params):
+        response = self.client.get(reverse('export_data', args=[kind]), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_cases_csv(self):
+        Case.objects.create(case_number='HC-1', client_name='Kamau, "Junior"', description='Land', lawyer=self.lawyer)
+        Case.objects.create(case_number='HC-2', client_name='Otieno', description='Land', lawyer=self.other_lawyer)
+        rows = list(csv.DictReader(io.StringIO(self.export('cases'))))
+        self.assertEqual([(row['case_number'], row['client_name'], row['lawyer']) for row in rows], [
+            ('HC-1', 'Kamau, "Junior"', 'lawyer'),
+        ])
+
+    def test_recurring_events_keep_their_rule_and_exceptions(self):
+        start = aware(2026, 3, 2, 9)
+        series = Calendar.objects.create(
+            user=self.lawyer, title='Mentions', start_time=start, end_time=start + timedelta(hours=1),
+            recurrence_rule='FREQ=WEEKLY;COUNT=4',
+        )
+        series.cancel_occurrence(start + timedelta(weeks=1))
+        override = series.override_occurrence(start + timedelta(weeks=2), title='Mentions (moved)')
+
+        rows = [json.loads(line) for line in self.export('events', format='ndjson').splitlines()]
+        self.assertEqual(
+            [(row['id'], row['recurrence_rule'], row['exdates'], row['recurrence_parent_id']) for row in rows], [
+                (series.pk, 'FREQ=WEEKLY;COUNT=4', [(start + timedelta(weeks=week)).isoformat() for week in (1, 2)], None),
+                (override.pk, '', [], series.pk),
+            ],
+        )
+        self.assertEqual(rows[1]['original_start'], (start + timedelta(weeks=2)).isoformat().replace('+00:00', 'Z'))
+
+        rows = list(csv.DictReader(io.StringIO(self.export('events'))))
+        self.assertEqual(json.loads(rows[0]['exdates']), series.exdates)
+        self.assertEqual(rows[0]['recurrence_rule'], 'FREQ=WEEKLY;COUNT=4')
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_export_streams_in_chunks(self):
+        for number in range(5):
+            Diary.objects.create(user=self.lawyer, title=f'Entry {number}', content='Site visit', date=date.today())
+        response = self.client.get(reverse('export_data', args=['diary']), {'format': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertIn('attachment; filename="diary-', response['Content-Disposition'])
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertEqual([chunk.count('\n') for chunk in chunks], [2, 2, 1])
+
+    def test_unknown_kind_or_format(self):
+        self.assertEqual(self.client.get(reverse('export_data', args=['invoices'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('export_data', args=['cases']), {'format': 'xml'}).status_code, 400)
+
+
+@override_settings(TIME_ZONE='Europe/London')
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lawyer = User.objects.create_user('lawyer', password='password123', role='lawyer')
+        self.url = reverse('calendar_feed', args=[CalendarFeedToken.objects.create(user=self.lawyer).key])
+        # Next year, so the events are not past the feed's cutoff
+        self.start = timezone.make_aware(datetime(timezone.now().year + 1, 3, 2, 9))
+        self.series = Calendar.objects.create(
+            user=self.lawyer, title='Mentions', start_time=self.start, end_time=self.start + timedelta(hours=1),
+            recurrence_rule='FREQ=WEEKLY',
+        )
+
+    def feed(self, **headers):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(self.url, headers=headers)
+        if response.status_code != 200:
+            return response
+        return b''.join(response.streaming_content).decode() if response.streaming else response.content.decode()
+
+    def vevents(self, body):
+        return [event.split('\r\n') for event in body.split('BEGIN:VEVENT\r\n')[1:]]
+
+    def test_series_times_have_a_vtimezone(self):
+        body = self.feed()
+        year = self.start.year
+        self.assertIn(f'DTSTART;TZID=Europe/London:{year}0302T090000', body)
+        self.assertEqual(body.count('BEGIN:VTIMEZONE'), 1)
+        vtimezone = body[body.index('BEGIN:VTIMEZONE'):body.index('END:VTIMEZONE')]
+        self.assertIn('TZID:Europe/London', vtimezone)
+        # The last Sundays of March and October, at 01:00 UTC
+        march = max(day for day in range(25, 32) if date(year, 3, day).weekday() == 6)
+        october = max(day for day in range(25, 32) if date(year, 10, day).weekday() == 6)
+        self.assertIn(
+            f'BEGIN:DAYLIGHT\r\nDTSTART:{year}03{march}T010000\r\n'
+            'TZOFFSETFROM:+0000\r\nTZOFFSETTO:+0100\r\nTZNAME:BST\r\nEND:DAYLIGHT', vtimezone,
+        )
+        self.assertIn(
+            f'BEGIN:STANDARD\r\nDTSTART:{year}10{october}T020000\r\n'
+            'TZOFFSETFROM:+0100\r\nTZOFFSETTO:+0000\r\nTZNAME:GMT\r\nEND:STANDARD', vtimezone,
+        )
+
+    def test_single_events_use_utc(self):
+        self.series.hard_delete()
+        Calendar.objects.create(
+            user=self.lawyer, title='Hearing', start_time=self.start, end_time=self.start + timedelta(hours=1),
+        )
+        body = self.feed()
+        self.assertIn(f'DTSTART:{self.start.year}0302T090000Z', body)
+        self.assertNotIn('TZID', body)
+
+    def test_overrides_are_published_under_the_series_uid(self):
+        cancelled, moved = self.start + timedelta(weeks=1), self.start + timedelta(weeks=2)
+        self.series.cancel_occurrence(cancelled)
+        override = self.series.override_occurrence(moved, start_time=moved + timedelta(hours=2), title='Mentions (moved)')
+
+        master, replacement = self.vevents(self.feed())
+        year = self.start.year
+        uid = f'UID:event-{self.series.pk}@firm-management-system'
+        self.assertIn(uid, master)
+        self.assertEqual([line for line in master if line.startswith('EXDATE')], [f'EXDATE;TZID=Europe/London:{year}0309T090000'])
+        self.assertEqual(replacement[:2], [uid, f'RECURRENCE-ID;TZID=Europe/London:{year}0316T090000'])
+        self.assertIn(f'DTSTART:{year}0316T110000Z', replacement)
+
+        # Without the override the occurrence stays cancelled
+        with self.captureOnCommitCallbacks(execute=True):
+            override.delete()
+        [master] = self.vevents(self.feed())
+        self.assertEqual(len([line for line in master if line.startswith('EXDATE')]), 2)
+
+    def test_unchanged_feed_is_not_modified(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertEqual(self.feed(if_none_match=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.series.title = 'Mentions before the judge'
+            self.series.save()
+        self.assertIn('SUMMARY:Mentions before the judge', self.feed(if_none_match=etag))
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        self.lawyer = User.objects.create_user('lawyer', password='password123', role='lawyer')
+        other_lawyer = User.objects.create_user('other', password='password123', role='lawyer')
+        self.attache = User.objects.create_user('attache', password='password123', role='attache')
+        for number, (lawyer, status) in enumerate([
+            (self.lawyer, 'open'), (self.lawyer, 'open'), (self.lawyer, 'settled'), (other_lawyer, 'closed'),
+        ]):
+            Case.objects.create(
+                case_number=f'HC-{number}', client_name='Client', description='Land', lawyer=lawyer, status=status,
+            )
+        for status in ('pending', 'completed', 'completed', 'on_hold'):
+            Task.objects.create(
+                title='File', assignor=self.lawyer, assignee=self.attache, due_date=date.today(), status=status,
+            )
+        now = timezone.now()
+        for event_type in ('meeting', 'meeting', 'deadline'):
+            Calendar.objects.create(
+                user=self.lawyer, title='Event', start_time=now, end_time=now + timedelta(hours=1), event_type=event_type,
+            )
+
+    def test_case_stats(self):
+        with self.assertNumQueries(1):
+            stats = case_stats(self.lawyer)
+        self.assertEqual(stats, {'total': 3, 'open': 2, 'in_progress': 0, 'settled': 1, 'closed': 0})
+        self.assertEqual(case_stats()['total'], 4)
+
+    def test_task_stats(self):
+        with self.assertNumQueries(1):
+            stats = task_stats(self.attache)
+        self.assertEqual((stats['total'], stats['completed'], stats['in_progress']), (4, 2, 0))
+        self.assertEqual((stats['completed_percentage'], stats['on_hold_percentage']), (50, 25))
+        self.assertEqual(task_stats(User.objects.get(username='other'))['pending_percentage'], 0)
+
+    def test_calendar_stats(self):
+        with self.assertNumQueries(1):
+            stats = calendar_stats(self.lawyer)
+        self.assertEqual(stats, {'total': 3, 'meeting': 2, 'court_appearance': 0, 'deadline': 1, 'personal': 0, 'other': 0})
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lawyer = User.objects.create_user('lawyer', password='password123', role='lawyer')
+        self.attache = User.objects.create_user('attache', password='password123', role='attache')
+        self.assistant = User.objects.create_user('assistant', password='password123', role='legal_assistant')
+        self.builds = []
+
+    def cached_tasks(self, user):
+        def build():
+            self.builds.append(user.username)
+            return task_stats(user)['total']
+        return cached_many({'tasks': ([('tasks', user.pk)], build)})['tasks']
+
+    def test_value_is_built_once(self):
+        self.assertEqual(self.cached_tasks(self.attache), 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cached_tasks(self.attache), 0)
+        self.assertEqual(self.builds, ['attache'])
+
+    def test_write_invalidates_on_commit(self):
+        self.cached_tasks(self.attache)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Task.objects.create(title='File', assignor=self.lawyer, assignee=self.attache, due_date=date.today())
+            # Still the committed data's version until the transaction ends
+            self.assertEqual(self.cached_tasks(self.attache), 0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.cached_tasks(self.attache), 1)
+
+    def test_reassignment_invalidates_both_assignees(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(title='File', assignor=self.lawyer, assignee=self.attache, due_date=date.today())
+        self.assertEqual((self.cached_tasks(self.attache), self.cached_tasks(self.assistant)), (1, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            task.assignee = self.assistant
+            task.save()
+        self.assertEqual((self.cached_tasks(self.attache), self.cached_tasks(self.assistant)), (0, 1))
+
+    def test_case_changes_invalidate_the_firm_wide_scope(self):
+        [before] = get_versions(('cases', FIRM_WIDE))
+        with self.captureOnCommitCallbacks(execute=True):
+            Case.objects.create(case_number='HC-1', client_name='Client', description='Land', lawyer=self.lawyer)
+        self.assertNotEqual(get_versions(('cases', FIRM_WIDE)), [before])
+
+    def test_dashboard_reflects_changes(self):
+        self.client.force_login(self.attache)
+        self.assertEqual(self.client.get(reverse('attache_dashboard')).context['total_tasks_assigned'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(title='File', assignor=self.lawyer, assignee=self.attache, due_date=date.today())
+        self.assertEqual(self.client.get(reverse('attache_dashboard')).context['total_tasks_assigned'], 1)
+
+
+class CalendarWindowTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lawyer = User.objects.create_user('lawyer', password='password123', role='lawyer')
+        self.client.force_login(self.lawyer)
+        for title, start, end in [
+            ('Before', aware(2026, 3, 1, 9), aware(2026, 3, 1, 10)),
+            ('Ends at the start', aware(2026, 3, 1, 23), aware(2026, 3, 2)),
+            ('Deadline at the start', aware(2026, 3, 2), aware(2026, 3, 2)),
+            ('Inside', aware(2026, 3, 3, 9), aware(2026, 3, 3, 10)),
+            ('Spans the window', aware(2026, 2, 1), aware(2026, 4, 1)),
+            ('Starts at the end', aware(2026, 3, 9), aware(2026, 3, 9, 1)),
+        ]:
+            Calendar.objects.create(user=self.lawyer, title=title, start_time=start, end_time=end)
+
+    def titles(self, **params):
+        response = self.client.get(reverse('event_list_json'), params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(event['title'] for event in response.json())
+
+    def test_only_overlapping_events_are_returned(self):
+        self.assertEqual(
+            self.titles(start='2026-03-02T00:00:00+00:00', end='2026-03-09'),
+            ['Deadline at the start', 'Inside', 'Spans the window'],
+        )
+
+    def test_unencoded_offset_is_accepted(self):
+        response = self.client.get(reverse('event_list_json') + '?start=2026-03-02T00:00:00+00:00&end=2026-03-09')
+        self.assertEqual(len(response.json()), 3)
+
+    def test_recurring_events_are_expanded_in_the_window(self):
+        Calendar.objects.create(
+            user=self.lawyer, title='Mentions', start_time=aware(2026, 1, 5, 9), end_time=aware(2026, 1, 5, 10),
+            recurrence_rule='FREQ=WEEKLY',
+        )
+        events = self.client.get(reverse('event_list_json'), {'start': '2026-03-02', 'end': '2026-03-16'}).json()
+        self.assertEqual(
+            [event['start'] for event in events if event['title'] == 'Mentions'],
+            ['2026-03-02T09:00:00+00:00', '2026-03-09T09:00:00+00:00'],
+        )
+
+    def test_without_a_window_every_event_is_listed(self):
+        self.assertEqual(len(self.titles()), 6)
+
+    def test_bad_windows_are_rejected(self):
+        for params in ({'start': 'soon', 'end': '2026-03-09'}, {'start': '2026-03-02'}, {'start': '2026-03-09', 'end': '2026-03-02'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(reverse('event_list_json'), params).status_code, 400)
+        with self.assertRaises(ValueError):
+            parse_window({'end': '2026-03-02'})
+
+    def test_window_query_uses_an_index(self):
+        queryset = events_in_window(Calendar.objects.filter(user=self.lawyer), aware(2026, 3, 2), aware(2026, 3, 9))
+        self.assertIn('calendar_user_', queryset.explain())
+
+
+class DayLookupTests(TestCase):
+    def setUp(self):
+        self.lawyer = User.objects.create_user('lawyer', password='password123', role='lawyer')
+        for title, start, end in [
+            ('Trial', aware(2026, 3, 1, 9), aware(2026, 3, 3, 17)),
+            ('Ends at midnight', aware(2026, 3, 3, 23), aware(2026, 3, 4)),
+            ('Deadline at midnight', aware(2026, 3, 4), aware(2026, 3, 4)),
+        ]:
+            Calendar.objects.create(user=self.lawyer, title=title, start_time=start, end_time=end)
+
+    def test_events_touching_the_day(self):
+        events = Calendar.objects.filter(user=self.lawyer)
+        for day, titles in [
+            (date(2026, 2, 28), set()),
+            (date(2026, 3, 2), {'Trial'}),
+            (date(2026, 3, 3), {'Trial', 'Ends at midnight'}),
+            (date(2026, 3, 4), {'Deadline at midnight'}),
+        ]:
+            with self.subTest(day=day):
+                self.assertEqual({event.title for event in events_on_day(events, day)}, titles)
+
+    @override_settings(TIME_ZONE='Africa/Nairobi')
+    def test_days_follow_the_current_time_zone(self):
+        # 23:00 UTC on the 3rd is 02:00 on the 4th in Nairobi
+        titles = {event.title for event in events_on_day(Calendar.objects.all(), date(2026, 3, 4))}
+        self.assertEqual(titles, {'Ends at midnight', 'Deadline at midnight'})
+
+    def test_day_lookup_compares_raw_columns(self):
+        queryset = events_on_day(Calendar.objects.filter(user=self.lawyer), date(2026, 3, 3))
+        self.assertNotIn('django_datetime_cast_date', str(queryset.query))
+        self.assertIn('calendar_user_', queryset.explain())
+
+    def test_date_detail_lists_the_day(self):
+        self.client.force_login(self.lawyer)
+        response = self.client.get(reverse('date_detail', args=['2026-03-03']))
+        self.assertEqual({event.title for event in response.context['events']}, {'Trial', 'Ends at midnight'})
+
+
+@override_settings(FIRM_MAX_PAGE_SIZE=10)
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        lawyer = User.objects.create_user('lawyer', password='password123', role='lawyer')
+        self.client.force_login(User.objects.create_user('secretary', password='password123', role='secretary'))
+        for number in range(7):
+            Case.objects.create(case_number=f'HC-{number}', client_name='Client', description='Land', lawyer=lawyer)
+        # Ties on created_at are broken by id
+        Case.objects.filter(case_number__in=['HC-2', 'HC-3', 'HC-4']).update(created_at=aware(2026, 3, 2))
+
+    def get_page(self, query=''):
+        response = self.client.get(reverse('secretary_view_cases') + '?' + query)
+        self.assertEqual(response.status_code, 200)
+        return response.context['page']
+
+    def numbers(self, page):
+        return [case.case_number for case in page]
+
+    def test_pages_cover_every_row_once(self):
+        expected = list(
+            Case.objects.order_by('-created_at', '-pk').values_list('case_number', flat=True)
+        )
+        page = self.get_page('page_size=3')
+        self.assertFalse(page.has_previous)
+        pages = [self.numbers(page)]
+        while page.has_next:
+            page = self.get_page(page.next_query)
+            pages.append(self.numbers(page))
+        self.assertEqual(pages, [expected[:3], expected[3:6], expected[6:]])
+
+        page = self.get_page(page.previous_query)
+        self.assertEqual(self.numbers(page), expected[3:6])
+        page = self.get_page(page.previous_query)
+        self.assertEqual(self.numbers(page), expected[:3])
+        self.assertFalse(page.has_previous)
+
+    def test_cursor_round_trips(self):
+        case = Case.objects.get(case_number='HC-3')
+        self.assertEqual(decode_cursor(encode_cursor(case, 'next')), (case.created_at, case.pk, 'next'))
+
+    def test_tampered_cursor_is_rejected(self):
+        token = encode_cursor(Case.objects.get(case_number='HC-3'), 'next')
+        tampered = token[:-1] + ('A' if token[-1] != 'A' else 'B')
+        self.assertIsNone(decode_cursor(tampered))
+        self.assertIsNone(decode_cursor('garbage'))
+        # The list falls back to the first page
+        self.assertEqual(self.numbers(self.get_page(f'page_size=3&cursor={tampered}')), self.numbers(self.get_page('page_size=3')))
+
+    def test_page_size_is_capped(self):
+        self.assertEqual(len(self.get_page('page_size=1000')), 7)
+        with self.settings(FIRM_MAX_PAGE_SIZE=2):
+            self.assertEqual(len(self.get_page('page_size=1000')), 2)
+        self.assertEqual(len(self.get_page('page_size=x')), 7)
+
+    def test_each_page_is_one_query(self):
+        first = self.get_page('page_size=3')
+        with CaptureQueriesContext(connection) as context:
+            self.get_page(first.next_query)
+        self.assertEqual(len([query for query in context.captured_queries if 'FROM "firm_case"' in query['sql']]), 1)
+
+
+class DocumentDownloadTests(TestCase):
+    content = b'0123456789'
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.lawyer = User.objects.create_user('lawyer', password='password123', role='lawyer')
+        case = Case.objects.create(case_number='HC-1', client_name='Client', description='Land', lawyer=self.lawyer)
+        self.document = Document.objects.create(
+            user=self.lawyer, case=case, file=ContentFile(self.content, name='brief.pdf'),
+        )
+        self.url = reverse('download_document', args=[self.document.pk])
+        self.client.force_login(self.lawyer)
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        self.addCleanup(response.close)
+        return response
+
+    def test_whole_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(
+            (response['Content-Type'], response['Content-Length'], response['Accept-Ranges'], response['ETag']),
+            ('application/pdf', '10', 'bytes', f'"{sha256(self.content)}"'),
+        )
+        self.assertIn('inline; filename="brief.pdf"', response['Content-Disposition'])
+
+    def test_byte_ranges(self):
+        for header, body, content_range in [
+            ('bytes=2-4', b'234', 'bytes 2-4/10'),
+            ('bytes=7-', b'789', 'bytes 7-9/10'),
+            ('bytes=-3', b'789', 'bytes 7-9/10'),
+            ('bytes=8-100', b'89', 'bytes 8-9/10'),
+        ]:
+            with self.subTest(range=header):
+                response = self.get(range=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(b''.join(response.streaming_content), body)
+                self.assertEqual(response['Content-Range'], content_range)
+                self.assertEqual(response['Content-Length'], str(len(body)))
+
+    def test_unsatisfiable_range(self):
+        for header in ('bytes=10-', 'bytes=5-2', 'bytes=-0'):
+            with self.subTest(range=header):
+                response = self.get(range=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_stale_if_range_sends_the_whole_file(self):
+        response = self.get(range='bytes=2-4', if_range='"outdated"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    def test_unchanged_file_is_not_sent_again(self):
+        self.assertEqual(self.get(if_none_match=self.get()['ETag']).status_code, 304)
+
+    def test_other_lawyers_are_refused(self):
+        self.client.force_login(User.objects.create_user('other', password='password123', role='lawyer'))
+        self.assertEqual(self.get().status_code, 403)
+
+    @override_settings(DOCUMENT_SENDFILE_BACKEND='nginx')
+    def test_sendfile_offload(self):
+        response = self.client.get(self.url, {'download': 1})
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.document.file.name)
+        self.assertEqual(response.content, b'')
+        self.assertIn('attachment', response['Content-Disposition'])
+
+
+class ConditionalListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lawyer = User.objects.create_user('lawyer', password='password123', role='lawyer')
+        self.secretary = User.objects.create_user('secretary', password='password123', role='secretary')
+        self.attache = User.objects.create_user('attache', password='password123', role='attache')
+
+    def get(self, user, url_name, **headers):
+        self.client.force_login(user)
+        return self.client.get(reverse(url_name), headers=headers)
+
+    def assertChangedAfter(self, user, url_name, change):
+        etag = self.get(user, url_name)['ETag']
+        self.assertEqual(self.get(user, url_name, if_none_match=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.get(user, url_name, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_events_change_with_the_calendar(self):
+        now = timezone.now()
+        self.assertChangedAfter(self.lawyer, 'event_list_json', lambda: Calendar.objects.create(
+            user=self.lawyer, title='Mention', start_time=now, end_time=now + timedelta(hours=1),
+        ))
+
+    def test_tasks_change_with_the_tasks(self):
+        self.assertChangedAfter(self.attache, 'attache_task_list', lambda: Task.objects.create(
+            title='File', assignor=self.lawyer, assignee=self.attache, due_date=date.today(),
+        ))
+
+    def test_firm_wide_cases_change_with_any_case(self):
+        self.assertChangedAfter(self.secretary, 'secretary_view_cases', lambda: Case.objects.create(
+            case_number='HC-1', client_name='Client', description='Land', lawyer=self.lawyer,
+        ))
+
+    def test_other_users_changes_keep_the_tag(self):
+        etag = self.get(self.attache, 'event_list_json')['ETag']
+        now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            Calendar.objects.create(user=self.lawyer, title='Mention', start_time=now, end_time=now + timedelta(hours=1))
+        self.assertEqual(self.get(self.attache, 'event_list_json', if_none_match=etag).status_code, 304)
+
+    def test_tag_covers_the_window(self):
+        self.client.force_login(self.lawyer)
+        url = reverse('event_list_json')
+        etag = self.client.get(url, {'start': '2026-03-02', 'end': '2026-03-09'})['ETag']
+        response = self.client.get(url, {'start': '2026-03-09', 'end': '2026-03-16'}, headers={'if_none_match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified_skips_the_list_query(self):
+        etag = self.get(self.lawyer, 'event_list_json')['ETag']
+        with CaptureQueriesContext(connection) as context:
+            self.get(self.lawyer, 'event_list_json', if_none_match=etag)
+        self.assertFalse([query for query in context.captured_queries if 'firm_calendar' in query['sql']])
+
+
+class AssigneeDirectoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lawyer = User.objects.create_user(
+            'gwanjiru', password='password123', role='lawyer', first_name='Grace', last_name='Wanjiru',
+        )
+        self.secretary = User.objects.create_user('secretary', password='password123', role='secretary')
+        for number, role in enumerate(['attache', 'legal_assistant', 'lawyer', 'secretary']):
+            User.objects.create_user(
+                f'user{number}', password='password123', role=role, first_name='Wangari', last_name=f'Njeri {number}',
+            )
+
+    def assignees(self, user, prefix):
+        self.client.force_login(user)
+        return self.client.get(reverse('assignee_search_json'), {'q': prefix}).json()['results']
+
+    def test_prefix_matches_any_name(self):
+        directory = get_directory()
+        # Ordered by the matching term: "wangari ..." before "wanjiru"
+        self.assertEqual([pk for pk, _label, _role in directory.search('WAN')], [
+            *User.objects.filter(first_name='Wangari').order_by('last_name').values_list('pk', flat=True), self.lawyer.pk,
+        ])
+        self.assertEqual([label for _pk, label, _role in directory.search('grace w')], ['Grace Wanjiru (Lawyer)'])
+        self.assertEqual(directory.search('wangari njeri 1')[0][2], 'legal_assistant')
+        self.assertEqual(len(directory.search('wan', limit=2)), 2)
+
+    def test_assignees_follow_the_assignor_role(self):
+        self.assertEqual(
+            {result['role'] for result in self.assignees(self.lawyer, 'wa')}, {'attache', 'legal_assistant', 'lawyer', 'secretary'},
+        )
+        self.assertNotIn(self.lawyer.pk, [result['id'] for result in self.assignees(self.lawyer, 'g')])
+        self.assertEqual({result['role'] for result in self.assignees(self.secretary, 'wa')}, {'attache', 'legal_assistant'})
+        self.assertEqual(self.assignees(User.objects.get(username='user0'), 'wa'), [])
+
+    def test_directory_is_reused_until_a_user_changes(self):
+        directory = get_directory()
+        with self.assertNumQueries(0):
+            self.assertIs(get_directory(), directory)
+        # Logging in only touches last_login
+        self.client.force_login(self.lawyer)
+        self.assertIs(get_directory(), directory)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user('zawadi', password='password123', role='attache')
+        self.assertIsNot(get_directory(), directory)
+        self.assertEqual(get_directory().search('zaw')[0][0], User.objects.get(username='zawadi').pk)
+
+    def test_inactive_users_are_left_out(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.get(username='user0')
+            user.is_active = False
+            user.save()
+        self.assertNotIn(user.pk, [pk for pk, _label, _role in get_directory().search('wangari')])
+
+    def test_inactive_users_cannot_be_assigned(self):
+        user = User.objects.get(username='user0')
+        user.is_active = False
+        user.save()
+        self.client.force_login(self.lawyer)
+        self.client.post(reverse('create_task'), {'title': 'File', 'due_date': '2030-01-01', 'assignee': user.pk})
+        self.assertFalse(Task.objects.filter(assignee=user).exists())
+
+        task = Task.objects.create(title='File', assignor=self.lawyer, assignee=self.secretary, due_date=date.today())
+        self.client.post(reverse('bulk_task_action'), {'tasks': [task.pk], 'action': 'reassign', 'assignee': user.pk})
+        self.assertEqual(Task.objects.get(pk=task.pk).assignee, self.secretary)
@@ -0,0 +1,192 @@
+import hashlib
+import os
+import re
+from contextlib import suppress
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .forms import validate_document_upload
+from .models import Document, UploadSession, upload_expiry
+
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadError(Exception):
+    """
+    A chunked upload request that cannot be applied; ``status`` is the HTTP
+    status code to answer with.
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def temp_path(session):
+    return os.path.join(settings.DOCUMENT_UPLOAD_TEMP_DIR, f'{session.pk}.part')
+
+
+def discard_temp_file(path):
+    with suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def normalize_checksum(value):
+    value = (value or '').strip().lower()
+    if not SHA256_PATTERN.match(value):
+        raise UploadError("A hex SHA-256 checksum is required.")
+    return value
+
+
+def start_upload(user, case, filename, total_size, checksum,
+                 document_type='case_document', description=None):
+    """
+    Open an upload session and its empty temporary file.
+    """
+    filename = os.path.basename(filename or '')
+    try:
+        total_size = int(total_size)
+    except (TypeError, ValueError):
+        raise UploadError("'size' must be an integer.")
+    if total_size <= 0:
+        raise UploadError("'size' must be positive.")
+    try:
+        validate_document_upload(filename, total_size)
+    except ValidationError as error:
+        raise UploadError(' '.join(error.messages))
+    if document_type not in dict(Document.DOCUMENT_TYPES):
+        raise UploadError("Unknown document type.")
+
+    session = UploadSession.objects.create(
+        user=user,
+        case=case,
+        filename=filename,
+        document_type=document_type,
+        description=description,
+        total_size=total_size,
+        chunk_size=settings.DOCUMENT_UPLOAD_CHUNK_SIZE,
+        checksum=normalize_checksum(checksum),
+    )
+    os.makedirs(settings.DOCUMENT_UPLOAD_TEMP_DIR, exist_ok=True)
+    open(temp_path(session), 'wb').close()
+    return session
+
+
+def expected_chunk_size(session, index):
+    if index < session.total_chunks - 1:
+        return session.chunk_size
+    return session.total_size - session.chunk_size * (session.total_chunks - 1)
+
+
+def write_chunk(session_id, index, data, checksum):
+    """
+    Append chunk ``index`` to the upload's temporary file.
+
+    Chunks must arrive in order. Re-sending a chunk that was already stored
+    is acknowledged without writing, so clients can safely retry after a
+    dropped connection.
+    """
+    checksum = normalize_checksum(checksum)
+    with transaction.atomic():
+        # Serializes concurrent requests for the same upload.
+        session = UploadSession.objects.select_for_update().get(pk=session_id)
+        if session.is_complete:
+            raise UploadError("Upload is already finalized.", status=409)
+        if session.is_expired:
+            raise UploadError("Upload expired; start it again.", status=410)
+        if index < session.received_chunks:
+            return session
+        if index != session.received_chunks or index >= session.total_chunks:
+            raise UploadError(f"Expected chunk {session.received_chunks}.", status=409)
+        if len(data) != expected_chunk_size(session, index):
+            raise UploadError(
+                f"Chunk {index} must be {expected_chunk_size(session, index)} bytes."
+            )
+        if hashlib.sha256(data).hexdigest() != checksum:
+            raise UploadError(f"Checksum mismatch for chunk {index}.", status=422)
+
+        with open(temp_path(session), 'r+b') as handle:
+            # Drop bytes left by an interrupted write before appending.
+            handle.truncate(session.received_bytes)
+            handle.seek(session.received_bytes)
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+        session.received_chunks += 1
+        session.received_bytes += len(data)
+        session.expires_at = upload_expiry()
+        session.save(update_fields=['received_chunks', 'received_bytes', 'expires_at', 'updated_at'])
+    return session
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finalize_upload(session_id):
+    """
+    Verify the assembled file and promote it into a Document linked to the
+    upload's case.
+
+    The Document row and its stored file are created together: if the
+    transaction fails, the stored file is removed again unless another
+    document shares it.
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session_id)
+        if session.is_complete:
+            return session.document
+        if session.is_expired:
+            raise UploadError("Upload expired; start it again.", status=410)
+        if session.received_bytes != session.total_size:
+            raise UploadError(
+                f"Upload incomplete: {session.received_bytes} of {session.total_size} bytes received.",
+                status=409,
+            )
+        path = temp_path(session)
+        if file_sha256(path) != session.checksum:
+            raise UploadError("Checksum mismatch for the assembled file.", status=422)
+
+        document = Document(
+            user=session.user,
+            case=session.case,
+            document_type=session.document_type,
+            description=session.description,
+            original_filename=session.filename,
+        )
+        with open(path, 'rb') as handle:
+            document.file.save(session.filename, File(handle), save=False)
+        stored_name = document.file.name
+        transaction.on_commit(lambda: discard_temp_file(path))
+        try:
+            with transaction.atomic():
+                document.save()
+                session.document = document
+                session.save(update_fields=['document', 'updated_at'])
+        except Exception:
+            # The blob may already be shared with other documents.
+            if not Document.objects.filter(file=stored_name).exists():
+                document.file.storage.delete(stored_name)
+            raise
+    return document
+
+
+def purge_expired_uploads():
+    """
+    Delete upload sessions past their expiry and their temporary files.
+    Finalized sessions go too; their documents stay.
+    """
+    sessions = list(UploadSession.objects.filter(expires_at__lt=timezone.now()).only('pk'))
+    UploadSession.objects.filter(pk__in=[session.pk for session in sessions]).delete()
+    for session in sessions:
+        discard_temp_file(temp_path(session))
+    return len(sessions)
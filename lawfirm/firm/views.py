@@ -1,21 +1,31 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
+from django.contrib.messages import get_messages
 from django.db.models import Q
 from django.db import transaction
+from django.conf import settings
 from django.core.exceptions import PermissionDenied
-from datetime import datetime
-from django.views.decorators.http import require_POST
-from django.http import Http404, JsonResponse
+from datetime import datetime, timedelta
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
 from django.core.serializers import serialize
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.middleware.csrf import get_token
 from .models import (
     User, 
     Diary, 
     Calendar, 
     Task, 
     Case, 
-    Document
+    Document,
+    UploadSession,
+    CalendarFeedToken
 )
 from .forms import (
     LoginForm, 
@@ -26,6 +36,21 @@ from .forms import (
     DocumentUploadForm,
     UserCreationForm
 )
+from .bulk import BulkTaskError, BulkTaskForm, bulk_update_tasks, parse_task_ids
+from .cache import FIRM_WIDE, CachedPanels, versions_etag
+from .directory import get_directory
+from .events import occurrences_in_window, occurrences_on_day, parse_window
+from .pagination import paginate
+from .downloads import serve_document
+from .exports import EXPORTS, EXPORT_FORMATS, export_chunks
+from .ics import ICS_CONTENT_TYPE, feed_cache_key, feed_chunks, feed_etag
+from .permissions import can_view_case, can_view_document
+from .recurrence import Occurrence
+from .scheduling import conflicts_in_window, find_common_free_slots
+from .search import search
+from .sync import SYNC_SOURCES, CursorExpired, changes_since
+from .uploads import UploadError, finalize_upload, start_upload, write_chunk
+from .stats import case_stats, task_stats, calendar_stats
 
 
 from .forms import LoginForm  # Import your custom LoginForm
@@ -84,145 +109,258 @@ def signup(request):
     return render(request, 'signup.html', {'signup_form': signup_form})
 
 
-@login_required
-def lawyer_dashboard(request):
+def list_etag(scope, firm_wide=False):
     """
-    Dashboard for lawyer 
+    ETag function for ``condition`` on views listing the user's ``scope``
+    data (firm-wide data with ``firm_wide``).
+
+    The tag also covers the URL (window, cursor), the day (pages flag
+    overdue items) and the CSRF secret behind the page's forms. The secret
+    is created here on a first visit, so the cookie set by that response
+    matches the tag.
+
+    Pages with messages waiting to be shown get no tag, so a redirect after
+    a failed action is never answered with a 304 that hides its message.
     """
-    # Diary entries
-    diary_entries = Diary.objects.filter(user=request.user)
+    def etag(request, *args, **kwargs):
+        if get_messages(request):
+            return None
+        owner = FIRM_WIDE if firm_wide else request.user.pk
+        get_token(request)
+        return versions_etag(
+            [(scope, owner)],
+            request.user.pk,
+            request.get_full_path(),
+            timezone.localdate(),
+            request.META.get('CSRF_COOKIE', ''),
+        )
+    return etag
+
+
+def dashboard_context(user, firm_wide_cases=False):
+    """
+    Build the context shared by the role dashboards.
 
-    # Calendar events
-    calendar_events = Calendar.objects.filter(user=request.user)
-    
-    # Task management (can assign to attache and legal assistant)
-    tasks= Task.objects.filter(Q(assignor=request.user) | Q(assignee=request.user))
-    print(f"Tasks for {request.user.username}: {tasks}") 
-    tasks_assigned = Task.objects.filter(
-        Q(assignor=request.user) |
-        Q(assignee=request.user))
-    
+    Case, task and calendar breakdowns come from one aggregate query per model
+    and are cached until the rows behind them change (see ``firm.signals``).
+    Lawyers see their own case metrics; the other roles share the firm-wide
+    ones.
 
-    # Case Metrics
-    cases = Case.objects.filter(lawyer=request.user)
-    total_cases = Case.objects.filter(lawyer=request.user).count()
-    open_cases = Case.objects.filter(lawyer=request.user, status='settled').count()
-    in_progress_cases = Case.objects.filter(lawyer=request.user, status='in_progress').count()
-    settled_cases = Case.objects.filter(lawyer=request.user, status='settled').count()
-    closed_cases = Case.objects.filter(lawyer=request.user, status='closed').count()
-
-    # Document Upload Section
-    documents = Document.objects.filter(user=request.user)
-    document_form = DocumentUploadForm()
-
-    # Analytics and Quick Stats
-    total_tasks_assigned = tasks_assigned.count()
-    total_tasks_assigned = tasks_assigned.count()
-    pending_tasks= tasks_assigned.filter(status='pending').count()
-    in_progress_tasks= tasks_assigned.filter(status='in_progress').count()
-    on_hold_tasks= tasks_assigned.filter(status='on_hold').count()
-    completed_tasks = tasks_assigned.filter(status='completed').count()
-
-    #Diary and calendar Notifications
-    meetings_calendar_events = Calendar.objects.filter(user=request.user, event_type='meeting')
-    court_appearance_calendar_events = Calendar.objects.filter(user=request.user, event_type='court_appearance')
-    deadlines_calendar_events = Calendar.objects.filter(user=request.user, event_type='deadline')
-    personal_calendar_events = Calendar.objects.filter(user=request.user, event_type='personal')
-    other_calendar_events = Calendar.objects.filter(user=request.user, event_type='other')
-
-    if total_tasks_assigned > 0:
-        completed_tasks_percentage = (completed_tasks / total_tasks_assigned) * 100
-        in_progress_tasks_percentage = (in_progress_tasks / total_tasks_assigned) * 100
-        pending_tasks_percentage = (pending_tasks / total_tasks_assigned) * 100
-    else:
-        completed_tasks_percentage = 0
-        in_progress_tasks_percentage = 0
-        pending_tasks_percentage = 0
+    The panels are cached a second time as rendered template fragments under
+    the same versioned keys (``panel_keys``), and their values are only
+    fetched when a fragment has to be rendered.
+    """
+    calendar_events = Calendar.objects.filter(user=user)
+    documents = Document.objects.filter(user=user)
+    tasks = Task.objects.filter(Q(assignor=user) | Q(assignee=user))
+    cases = Case.objects.all() if firm_wide_cases else Case.objects.filter(lawyer=user)
+    case_owner = FIRM_WIDE if firm_wide_cases else user.pk
+
+    panels = CachedPanels({
+        'case_stats': (
+            [('cases', case_owner)],
+            lambda: case_stats(lawyer=None if firm_wide_cases else user),
+        ),
+        'task_stats': ([('tasks', user.pk)], lambda: task_stats(user)),
+        'calendar_stats': ([('calendar', user.pk)], lambda: calendar_stats(user)),
+        'upcoming_events': ([('calendar', user.pk)], lambda: list(calendar_events[:5])),
+        'recent_documents': ([('documents', user.pk)], lambda: list(documents[:3])),
+    })
 
-    context = {
+    return {
         # Diary Context
-        'diary_entries': diary_entries,
+        'diary_entries': Diary.objects.filter(user=user),
 
         # Calendar Context
         'calendar_events': calendar_events,
 
         # Task Context
-        'tasks_assigned': tasks_assigned,
-        'tasks':tasks,
-    
+        'tasks_assigned': tasks,
+        'tasks': tasks,
+
         # Document Context
         'documents': documents,
-        'document_form': document_form,
+        'document_form': DocumentUploadForm(),
+
+        # Panel fragment caching
+        'panel_keys': panels.keys,
+        'panel_cache_timeout': settings.DASHBOARD_CACHE_TIMEOUT,
 
         # Case Metrics
         'cases': cases,
-        'total_cases': total_cases,
-        'open_cases': open_cases,
-        'in_progress_cases': in_progress_cases,
-        'settled_cases': settled_cases,
-        'closed_cases': closed_cases,
+        'case_stats': panels.lazy('case_stats'),
+        'total_cases': panels.lazy('case_stats', 'total'),
+        'open_cases': panels.lazy('case_stats', 'open'),
+        'in_progress_cases': panels.lazy('case_stats', 'in_progress'),
+        'settled_cases': panels.lazy('case_stats', 'settled'),
+        'closed_cases': panels.lazy('case_stats', 'closed'),
 
         # Task Analytics
-        'total_tasks_assigned': total_tasks_assigned,
-        'completed_tasks': completed_tasks,
-        'pending_tasks': pending_tasks,
-        'in_progress_tasks': in_progress_tasks,
-        'on_hold_tasks': on_hold_tasks,
-        
-        # Calendar Notifications
-        'meetings_calendar_events': meetings_calendar_events,
-        'court_appearance_calendar_events': court_appearance_calendar_events,
-        'deadlines_calendar_events': deadlines_calendar_events,
-        'personal_calendar_events': personal_calendar_events,
-        'other_calendar_events': other_calendar_events,
+        'task_stats': panels.lazy('task_stats'),
+        'total_tasks_assigned': panels.lazy('task_stats', 'total'),
+        'completed_tasks': panels.lazy('task_stats', 'completed'),
+        'pending_tasks': panels.lazy('task_stats', 'pending'),
+        'in_progress_tasks': panels.lazy('task_stats', 'in_progress'),
+        'on_hold_tasks': panels.lazy('task_stats', 'on_hold'),
+        'completed_tasks_percentage': panels.lazy('task_stats', 'completed_percentage'),
+        'in_progress_tasks_percentage': panels.lazy('task_stats', 'in_progress_percentage'),
+        'pending_tasks_percentage': panels.lazy('task_stats', 'pending_percentage'),
 
-        
-        # Additional secretary-specific data can be added here
-        'upcoming_events': calendar_events[:5],  # Next 5 events
-        'recent_documents': documents[:3],  # Last 3 uploaded documents
-
-        'completed_tasks_percentage': completed_tasks_percentage,
-        'in_progress_tasks_percentage': in_progress_tasks_percentage,
-        'pending_tasks_percentage': pending_tasks_percentage,
+        # Calendar Notifications
+        'calendar_stats': panels.lazy('calendar_stats'),
+        'meetings_count': panels.lazy('calendar_stats', 'meeting'),
+        'court_appearances_count': panels.lazy('calendar_stats', 'court_appearance'),
+        'deadlines_count': panels.lazy('calendar_stats', 'deadline'),
+        'personal_events_count': panels.lazy('calendar_stats', 'personal'),
+        'other_events_count': panels.lazy('calendar_stats', 'other'),
+
+        'upcoming_events': panels.lazy('upcoming_events'),  # Next 5 events
+        'recent_documents': panels.lazy('recent_documents'),  # Last 3 uploaded documents
     }
-    
 
+
+@login_required
+def lawyer_dashboard(request):
+    """
+    Dashboard for lawyer 
+    """
+    context = dashboard_context(request.user, firm_wide_cases=False)
     return render(request, 'dashboards/lawyer/dashboard.html', context)
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=list_etag('calendar'))
 def event_list_json(request):
     """
-    Return a JSON response with all calendar events for the logged-in user.
+    Return a JSON response with the calendar events for the logged-in user.
+
+    FullCalendar sends the visible range as ``start`` and ``end``; only events
+    overlapping that window are returned, with recurring events expanded
+    into one entry per occurrence.
     """
+    try:
+        start, end = parse_window(request.GET)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
     events = Calendar.objects.filter(user=request.user)
-    event_list = [{
-        'id': event.id,
-        'title': event.title,
-        'start': event.start_time.isoformat(),
-        'end': event.end_time.isoformat(),
-        'color': get_event_color(event.event_type),
-        'description': event.description,
-        'location': event.location,
-    } for event in events]
+    if start is None:
+        # Without a window, recurring series are listed unexpanded as their
+        # first occurrence.
+        occurrences = [Occurrence(event, event.start_time, event.end_time) for event in events]
+    else:
+        occurrences = occurrences_in_window(events, start, end)
+    event_list = [event_json(event) for event in occurrences]
     return JsonResponse(event_list, safe=False)
 
+def event_json(occurrence):
+    """
+    The FullCalendar event object of an occurrence.
+    """
+    return {
+        'id': occurrence.id,
+        'occurrenceId': occurrence.occurrence_id,
+        'title': occurrence.title,
+        'start': occurrence.start_time.isoformat(),
+        'end': occurrence.end_time.isoformat(),
+        'allDay': occurrence.is_all_day,
+        'color': get_event_color(occurrence.event_type),
+        'description': occurrence.description,
+        'type': occurrence.event_type,
+        'location': occurrence.location,
+        'rrule': occurrence.recurrence_rule or None,
+    }
+
+def occurrence_json(occurrence):
+    return {
+        'id': occurrence.id,
+        'occurrenceId': occurrence.occurrence_id,
+        'title': occurrence.title,
+        'start': occurrence.start_time.isoformat(),
+        'end': occurrence.end_time.isoformat(),
+        'type': occurrence.event_type,
+    }
+
+
+@login_required
+def event_conflicts_json(request):
+    """
+    List the pairs of the user's events that overlap within the required
+    ``start``/``end`` window.
+    """
+    try:
+        start, end = parse_window(request.GET)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    if start is None:
+        return JsonResponse({'error': "Both 'start' and 'end' are required."}, status=400)
+    if end - start > timedelta(days=settings.SCHEDULING_MAX_WINDOW_DAYS):
+        return JsonResponse(
+            {'error': f"The window may span at most {settings.SCHEDULING_MAX_WINDOW_DAYS} days."},
+            status=400,
+        )
+    pairs = conflicts_in_window(Calendar.objects.filter(user=request.user), start, end)
+    return JsonResponse({
+        'conflicts': [[occurrence_json(first), occurrence_json(second)] for first, second in pairs],
+    })
+
+def parse_user_ids(value):
+    try:
+        return sorted({int(pk) for pk in value.split(',') if pk.strip()})
+    except ValueError:
+        raise ValueError("'users' must be a comma-separated list of user ids.")
+
+
+@login_required
+def free_busy_json(request):
+    """
+    Busy intervals of several users and their earliest common free slots.
+
+    Expects ``users`` (comma-separated ids), the ``start``/``end`` window and
+    optionally the slot ``duration`` in minutes (default 60) and ``count``
+    (default 5). Only busy times are disclosed, not event details.
+    """
+    if request.user.role != 'secretary':
+        raise PermissionDenied
+    try:
+        user_ids = parse_user_ids(request.GET.get('users', ''))
+        start, end = parse_window(request.GET)
+        duration = int(request.GET.get('duration', 60))
+        count = int(request.GET.get('count', 5))
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    if not user_ids or start is None:
+        return JsonResponse({'error': "'users', 'start' and 'end' are required."}, status=400)
+    if len(user_ids) > settings.SCHEDULING_MAX_USERS:
+        return JsonResponse(
+            {'error': f"At most {settings.SCHEDULING_MAX_USERS} users can be compared."}, status=400
+        )
+    if end - start > timedelta(days=settings.SCHEDULING_MAX_WINDOW_DAYS):
+        return JsonResponse(
+            {'error': f"The window may span at most {settings.SCHEDULING_MAX_WINDOW_DAYS} days."},
+            status=400,
+        )
+    if not 5 <= duration <= 24 * 60 or not 1 <= count <= 100:
+        return JsonResponse(
+            {'error': "'duration' must be 5 to 1440 minutes and 'count' 1 to 100."}, status=400
+        )
+
+    slots, busy = find_common_free_slots(
+        Calendar.objects.filter(user__in=user_ids), start, end, timedelta(minutes=duration), count
+    )
+    return JsonResponse({
+        'busy': {
+            str(user_id): [[busy_start.isoformat(), busy_end.isoformat()] for busy_start, busy_end in busy.get(user_id, [])]
+            for user_id in user_ids
+        },
+        'free': [[slot_start.isoformat(), slot_end.isoformat()] for slot_start, slot_end in slots],
+    })
+
 @login_required
 def calendar_view(request):
-    # Get events for FullCalendar
-    events = Calendar.objects.filter(user=request.user)
-    event_list = [{
-        'id': event.id,
-        'title': event.title,
-        'start': event.start_time.isoformat(),
-        'end': event.end_time.isoformat(),
-        'color': get_event_color(event.event_type),
-        'extendedProps': {
-            'description': event.description,
-            'type': event.event_type,
-            'location': event.location,
-        }
-    } for event in events]
-    
+    # Events are lazy-loaded by FullCalendar from event_list_json for the
+    # visible range only.
+
     # Get date from request or use today
     selected_date = request.GET.get('date', datetime.today().date())
     
@@ -237,14 +375,59 @@ def calendar_view(request):
     diary_form = DiaryEntryForm(initial={'date': selected_date})
     
     context = {
-        'events_json': JsonResponse(event_list, safe=False).content.decode('utf-8'),
         'selected_date': selected_date,
         'diary_entries': diary_entries,
         'event_form': event_form,
         'diary_form': diary_form,
+        'feed_token': CalendarFeedToken.objects.filter(user=request.user, revoked_at__isnull=True).first(),
     }
     return render(request, 'lawyer/calendar.html', context)
 
+@cache_control(private=True, no_cache=True)
+def calendar_feed(request, key):
+    """
+    The iCalendar subscription feed of the user owning ``key``.
+
+    Phone calendars poll the feed every few minutes. Unchanged feeds are
+    answered with 304 from the ETag, which only reads the cache; changed
+    feeds are served from the cache when they have been built before and
+    streamed otherwise.
+    """
+    token = get_object_or_404(
+        CalendarFeedToken.objects.select_related('user'),
+        key=key, revoked_at__isnull=True, user__is_active=True,
+    )
+    etag = feed_etag(token.user)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        cache_key = feed_cache_key(etag)
+        feed = cache.get(cache_key)
+        if feed is None:
+            response = StreamingHttpResponse(feed_chunks(token.user, cache_key), content_type=ICS_CONTENT_TYPE)
+        else:
+            response = HttpResponse(feed, content_type=ICS_CONTENT_TYPE)
+    response['ETag'] = etag
+    return response
+
+@login_required
+@require_POST
+def create_calendar_feed(request):
+    """
+    Issue a new feed URL, revoking the previous one.
+    """
+    with transaction.atomic():
+        CalendarFeedToken.objects.filter(user=request.user, revoked_at__isnull=True).update(revoked_at=timezone.now())
+        CalendarFeedToken.objects.create(user=request.user)
+    messages.success(request, 'A new calendar feed link was created. Links shared before no longer work.')
+    return redirect('calendar')
+
+@login_required
+@require_POST
+def revoke_calendar_feed(request):
+    CalendarFeedToken.objects.filter(user=request.user, revoked_at__isnull=True).update(revoked_at=timezone.now())
+    messages.success(request, 'Calendar feed link revoked.')
+    return redirect('calendar')
+
 def get_event_color(event_type):
     colors = {
         'meeting': '#3788d8',
@@ -258,7 +441,7 @@ def get_event_color(event_type):
 @login_required
 @require_POST
 def add_event(request):
-    form = CalendarEventForm(request.POST)
+    form = CalendarEventForm(request.POST, user=request.user)
     if form.is_valid():
         event = form.save(commit=False)
         event.user = request.user
@@ -273,7 +456,7 @@ def date_detail(request, date_str):
         date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
         
         # Get events and diary entries for the selected date
-        events = Calendar.objects.filter(user=request.user, start_time__date=date_obj)
+        events = occurrences_on_day(Calendar.objects.filter(user=request.user), date_obj)
         diary_entries = Diary.objects.filter(user=request.user, date=date_obj)
 
         # Initialize forms
@@ -283,7 +466,7 @@ def date_detail(request, date_str):
         if request.method == 'POST':
             # Process both forms
             diary_form = DiaryEntryForm(request.POST)
-            event_form = CalendarEventForm(request.POST)
+            event_form = CalendarEventForm(request.POST, user=request.user)
 
             diary_valid = diary_form.is_valid()
             event_valid = event_form.is_valid()
@@ -355,12 +538,20 @@ def create_task(request):
     return render(request, 'lawyer/create_task.html', {'form': form})
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=list_etag('tasks'))
 def task_list(request):
     """Display all tasks relevant to the user."""
     tasks = Task.objects.filter(
         Q(assignor=request.user) | Q(assignee=request.user)
-    ).select_related('assignee').order_by('-created_at')
-    return render(request, 'lawyer/task_list.html', {'tasks': tasks})
+    ).select_related('assignee')
+    page = paginate(tasks, request)
+    context = {
+        'tasks': page,
+        'page': page,
+        'bulk_form': BulkTaskForm(user=request.user),
+    }
+    return render(request, 'lawyer/task_list.html', context)
 
 @login_required
 def update_task(request, task_id):
@@ -397,6 +588,42 @@ def delete_task(request, task_id):
     messages.success(request, 'Task deleted successfully')
     return redirect('task_list')
 
+@login_required
+def assignee_search_json(request):
+    """
+    Users the current user may assign tasks to whose name or username
+    starts with ``q``, for the assignee picker of the task forms.
+    """
+    results = get_directory().search_assignees(
+        request.user, request.GET.get('q', ''), limit=get_search_limit(request)
+    )
+    return JsonResponse({
+        'results': [{'id': pk, 'label': label, 'role': role} for pk, label, role in results],
+    })
+
+@login_required
+@require_POST
+def bulk_task_action(request):
+    """
+    Apply one change (status, priority, due date, reassignment or deletion)
+    to all the tasks selected on a lawyer's task list, or to none of them.
+    """
+    if request.user.role != 'lawyer':
+        messages.error(request, 'Only lawyers can change tasks in bulk.')
+        return redirect('home')
+
+    form = BulkTaskForm(request.POST, user=request.user)
+    try:
+        task_ids = parse_task_ids(request.POST.getlist('tasks'))
+        if not form.is_valid():
+            raise BulkTaskError(' '.join(error for errors in form.errors.values() for error in errors))
+        updated = bulk_update_tasks(request.user, task_ids, form)
+    except BulkTaskError as error:
+        messages.error(request, str(error))
+    else:
+        messages.success(request, f'{updated} task{"s" if updated != 1 else ""} updated.')
+    return redirect('task_list')
+
 @login_required
 def create_case(request):
     if request.user.role != 'lawyer':
@@ -415,12 +642,14 @@ def create_case(request):
     return render(request, 'lawyer/create_case.html', {'form': form})
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=list_etag('cases'))
 def case_list(request):
     """
     List all cases for the current lawyer
     """
-    cases = Case.objects.filter(lawyer=request.user).order_by('-created_at')
-    return render(request, 'lawyer/case_list.html', {'cases': cases})
+    page = paginate(Case.objects.filter(lawyer=request.user), request)
+    return render(request, 'lawyer/case_list.html', {'cases': page, 'page': page})
 
 @login_required
 def view_case(request, case_id):
@@ -469,7 +698,11 @@ def delete_case(request, case_id):
         raise PermissionDenied
     
     if request.method == 'POST':
-        case.delete()
+        with transaction.atomic():
+            # Documents would otherwise be detached (SET_NULL); deleting them
+            # releases their stored files once nothing else references them.
+            case.documents.all().delete()
+            case.delete()
         messages.success(request, 'Case deleted successfully.')
         return redirect('view_cases')
     
@@ -481,140 +714,14 @@ def secretary_dashboard(request):
     """
     Dashboard for secretary
     """
-    # Diary entries
-    diary_entries = Diary.objects.filter(user=request.user)
-
-    # Calendar events
-    calendar_events = Calendar.objects.filter(user=request.user)
-    
-    # Task management (can assign to attache and legal assistant)
-    tasks= Task.objects.filter(Q(assignor=request.user) | Q(assignee=request.user))
-    print(f"Tasks for {request.user.username}: {tasks}") 
-    tasks_assigned = Task.objects.filter(
-        Q(assignor=request.user) |
-        Q(assignee=request.user))
-    
-
-    # Case Metrics
-    cases = Case.objects.filter()
-    total_cases = Case.objects.filter().count()
-    open_cases = Case.objects.filter(status='settled').count()
-    in_progress_cases = Case.objects.filter(status='in_progress').count()
-    settled_cases = Case.objects.filter(status='settled').count()
-    closed_cases = Case.objects.filter(status='closed').count()
-
-    # Document Upload Section
-    documents = Document.objects.filter(user=request.user)
-    document_form = DocumentUploadForm()
-
-    # Analytics and Quick Stats
-    total_tasks_assigned = tasks_assigned.count()
-    total_tasks_assigned = tasks_assigned.count()
-    pending_tasks= tasks_assigned.filter(status='pending').count()
-    in_progress_tasks= tasks_assigned.filter(status='in_progress').count()
-    on_hold_tasks= tasks_assigned.filter(status='on_hold').count()
-    completed_tasks = tasks_assigned.filter(status='completed').count()
-
-    #Diary and calendar Notifications
-    meetings_calendar_events = Calendar.objects.filter(user=request.user, event_type='meeting')
-    court_appearance_calendar_events = Calendar.objects.filter(user=request.user, event_type='court_appearance')
-    deadlines_calendar_events = Calendar.objects.filter(user=request.user, event_type='deadline')
-    personal_calendar_events = Calendar.objects.filter(user=request.user, event_type='personal')
-    other_calendar_events = Calendar.objects.filter(user=request.user, event_type='other')
-
-    if total_tasks_assigned > 0:
-        completed_tasks_percentage = (completed_tasks / total_tasks_assigned) * 100
-        in_progress_tasks_percentage = (in_progress_tasks / total_tasks_assigned) * 100
-        pending_tasks_percentage = (pending_tasks / total_tasks_assigned) * 100
-    else:
-        completed_tasks_percentage = 0
-        in_progress_tasks_percentage = 0
-        pending_tasks_percentage = 0
-
-    context = {
-        # Diary Context
-        'diary_entries': diary_entries,
-
-        # Calendar Context
-        'calendar_events': calendar_events,
-
-        # Task Context
-        'tasks_assigned': tasks_assigned,
-        'tasks':tasks,
-    
-        # Document Context
-        'documents': documents,
-        'document_form': document_form,
-
-        # Case Metrics
-        'cases': cases,
-        'total_cases': total_cases,
-        'open_cases': open_cases,
-        'in_progress_cases': in_progress_cases,
-        'settled_cases': settled_cases,
-        'closed_cases': closed_cases,
-
-        # Task Analytics
-        'total_tasks_assigned': total_tasks_assigned,
-        'completed_tasks': completed_tasks,
-        'pending_tasks': pending_tasks,
-        'in_progress_tasks': in_progress_tasks,
-        'on_hold_tasks': on_hold_tasks,
-        
-        # Calendar Notifications
-        'meetings_calendar_events': meetings_calendar_events,
-        'court_appearance_calendar_events': court_appearance_calendar_events,
-        'deadlines_calendar_events': deadlines_calendar_events,
-        'personal_calendar_events': personal_calendar_events,
-        'other_calendar_events': other_calendar_events,
-
-        
-        # Additional secretary-specific data can be added here
-        'upcoming_events': calendar_events[:5],  # Next 5 events
-        'recent_documents': documents[:3],  # Last 3 uploaded documents
-
-        'completed_tasks_percentage': completed_tasks_percentage,
-        'in_progress_tasks_percentage': in_progress_tasks_percentage,
-        'pending_tasks_percentage': pending_tasks_percentage,
-    }
-    
-
+    context = dashboard_context(request.user, firm_wide_cases=True)
     return render(request, 'dashboards/secretary/dashboard.html', context)
 
-@login_required
-def event_list_json(request):
-    """
-    Return a JSON response with all calendar events for the logged-in user.
-    """
-    events = Calendar.objects.filter(user=request.user)
-    event_list = [{
-        'id': event.id,
-        'title': event.title,
-        'start': event.start_time.isoformat(),
-        'end': event.end_time.isoformat(),
-        'color': get_event_color(event.event_type),
-        'description': event.description,
-        'location': event.location,
-    } for event in events]
-    return JsonResponse(event_list, safe=False)
-
 @login_required
 def secretary_calendar_view(request):
-    # Get events for FullCalendar
-    events = Calendar.objects.filter(user=request.user)
-    event_list = [{
-        'id': event.id,
-        'title': event.title,
-        'start': event.start_time.isoformat(),
-        'end': event.end_time.isoformat(),
-        'color': get_event_color(event.event_type),
-        'extendedProps': {
-            'description': event.description,
-            'type': event.event_type,
-            'location': event.location,
-        }
-    } for event in events]
-    
+    # Events are lazy-loaded by FullCalendar from event_list_json for the
+    # visible range only.
+
     # Get date from request or use today
     selected_date = request.GET.get('date', datetime.today().date())
     
@@ -629,7 +736,6 @@ def secretary_calendar_view(request):
     diary_form = DiaryEntryForm(initial={'date': selected_date})
     
     context = {
-        'events_json': JsonResponse(event_list, safe=False).content.decode('utf-8'),
         'selected_date': selected_date,
         'diary_entries': diary_entries,
         'event_form': event_form,
@@ -650,7 +756,7 @@ def get_event_color(event_type):
 @login_required
 @require_POST
 def add_event(request):
-    form = CalendarEventForm(request.POST)
+    form = CalendarEventForm(request.POST, user=request.user)
     if form.is_valid():
         event = form.save(commit=False)
         event.user = request.user
@@ -665,7 +771,7 @@ def secretary_date_detail(request, date_str):
         date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
         
         # Get events and diary entries for the selected date
-        events = Calendar.objects.filter(user=request.user, start_time__date=date_obj)
+        events = occurrences_on_day(Calendar.objects.filter(user=request.user), date_obj)
         diary_entries = Diary.objects.filter(user=request.user, date=date_obj)
 
         # Initialize forms
@@ -675,7 +781,7 @@ def secretary_date_detail(request, date_str):
         if request.method == 'POST':
             # Process both forms
             diary_form = DiaryEntryForm(request.POST)
-            event_form = CalendarEventForm(request.POST)
+            event_form = CalendarEventForm(request.POST, user=request.user)
 
             diary_valid = diary_form.is_valid()
             event_valid = event_form.is_valid()
@@ -747,18 +853,22 @@ def secretary_create_task(request):
     return render(request, 'secretary/create_task.html', {'form': form})
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=list_etag('tasks'))
 def secretary_task_list(request):
     """Display all tasks relevant to the secretary."""
     tasks = Task.objects.filter(
         Q(assignor=request.user) | Q(assignee=request.user)
-    ).select_related('assignor', 'assignee').order_by('-created_at')
+    ).select_related('assignor', 'assignee')
+    page = paginate(tasks, request)
 
-    # Separate tasks into categories for better clarity
-    tasks_assigned_by_secretary = tasks.filter(assignor=request.user)
-    tasks_assigned_to_secretary = tasks.filter(assignee=request.user)
+    # Separate the tasks of this page into categories for better clarity
+    tasks_assigned_by_secretary = [task for task in page if task.assignor_id == request.user.pk]
+    tasks_assigned_to_secretary = [task for task in page if task.assignee_id == request.user.pk]
 
     context = {
-        'tasks': tasks,
+        'tasks': page,
+        'page': page,
         'tasks_assigned_by_secretary': tasks_assigned_by_secretary,
         'tasks_assigned_to_secretary': tasks_assigned_to_secretary,
     }
@@ -801,12 +911,14 @@ def secretary_delete_task(request, task_id):
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=list_etag('cases', firm_wide=True))
 def secretary_case_list(request):
     """
     List all cases for all the lawyers
     """
-    cases = Case.objects.filter().order_by('-created_at')
-    return render(request, 'secretary/case_list.html', {'cases': cases})
+    page = paginate(Case.objects.all(), request)
+    return render(request, 'secretary/case_list.html', {'cases': page, 'page': page})
 
 @login_required
 def secretary_view_case(request, case_id):
@@ -844,140 +956,14 @@ def legal_assistant_dashboard(request):
     """
     Dashboard for legal_assistant
     """
-    # Diary entries
-    diary_entries = Diary.objects.filter(user=request.user)
-
-    # Calendar events
-    calendar_events = Calendar.objects.filter(user=request.user)
-    
-    # Task management (can assign to attache and legal assistant)
-    tasks= Task.objects.filter(Q(assignor=request.user) | Q(assignee=request.user))
-    print(f"Tasks for {request.user.username}: {tasks}") 
-    tasks_assigned = Task.objects.filter(
-        Q(assignor=request.user) |
-        Q(assignee=request.user))
-    
-
-    # Case Metrics
-    cases = Case.objects.filter()
-    total_cases = Case.objects.filter().count()
-    open_cases = Case.objects.filter(status='settled').count()
-    in_progress_cases = Case.objects.filter(status='in_progress').count()
-    settled_cases = Case.objects.filter(status='settled').count()
-    closed_cases = Case.objects.filter(status='closed').count()
-
-    # Document Upload Section
-    documents = Document.objects.filter(user=request.user)
-    document_form = DocumentUploadForm()
-
-    # Analytics and Quick Stats
-    total_tasks_assigned = tasks_assigned.count()
-    total_tasks_assigned = tasks_assigned.count()
-    pending_tasks= tasks_assigned.filter(status='pending').count()
-    in_progress_tasks= tasks_assigned.filter(status='in_progress').count()
-    on_hold_tasks= tasks_assigned.filter(status='on_hold').count()
-    completed_tasks = tasks_assigned.filter(status='completed').count()
-
-    #Diary and calendar Notifications
-    meetings_calendar_events = Calendar.objects.filter(user=request.user, event_type='meeting')
-    court_appearance_calendar_events = Calendar.objects.filter(user=request.user, event_type='court_appearance')
-    deadlines_calendar_events = Calendar.objects.filter(user=request.user, event_type='deadline')
-    personal_calendar_events = Calendar.objects.filter(user=request.user, event_type='personal')
-    other_calendar_events = Calendar.objects.filter(user=request.user, event_type='other')
-
-    if total_tasks_assigned > 0:
-        completed_tasks_percentage = (completed_tasks / total_tasks_assigned) * 100
-        in_progress_tasks_percentage = (in_progress_tasks / total_tasks_assigned) * 100
-        pending_tasks_percentage = (pending_tasks / total_tasks_assigned) * 100
-    else:
-        completed_tasks_percentage = 0
-        in_progress_tasks_percentage = 0
-        pending_tasks_percentage = 0
-
-    context = {
-        # Diary Context
-        'diary_entries': diary_entries,
-
-        # Calendar Context
-        'calendar_events': calendar_events,
-
-        # Task Context
-        'tasks_assigned': tasks_assigned,
-        'tasks':tasks,
-    
-        # Document Context
-        'documents': documents,
-        'document_form': document_form,
-
-        # Case Metrics
-        'cases': cases,
-        'total_cases': total_cases,
-        'open_cases': open_cases,
-        'in_progress_cases': in_progress_cases,
-        'settled_cases': settled_cases,
-        'closed_cases': closed_cases,
-
-        # Task Analytics
-        'total_tasks_assigned': total_tasks_assigned,
-        'completed_tasks': completed_tasks,
-        'pending_tasks': pending_tasks,
-        'in_progress_tasks': in_progress_tasks,
-        'on_hold_tasks': on_hold_tasks,
-        
-        # Calendar Notifications
-        'meetings_calendar_events': meetings_calendar_events,
-        'court_appearance_calendar_events': court_appearance_calendar_events,
-        'deadlines_calendar_events': deadlines_calendar_events,
-        'personal_calendar_events': personal_calendar_events,
-        'other_calendar_events': other_calendar_events,
-
-        
-        # Additional secretary-specific data can be added here
-        'upcoming_events': calendar_events[:5],  # Next 5 events
-        'recent_documents': documents[:3],  # Last 3 uploaded documents
-
-        'completed_tasks_percentage': completed_tasks_percentage,
-        'in_progress_tasks_percentage': in_progress_tasks_percentage,
-        'pending_tasks_percentage': pending_tasks_percentage,
-    }
-    
-
+    context = dashboard_context(request.user, firm_wide_cases=True)
     return render(request, 'dashboards/secretary/dashboard.html', context)
 
-@login_required
-def event_list_json(request):
-    """
-    Return a JSON response with all calendar events for the logged-in user.
-    """
-    events = Calendar.objects.filter(user=request.user)
-    event_list = [{
-        'id': event.id,
-        'title': event.title,
-        'start': event.start_time.isoformat(),
-        'end': event.end_time.isoformat(),
-        'color': get_event_color(event.event_type),
-        'description': event.description,
-        'location': event.location,
-    } for event in events]
-    return JsonResponse(event_list, safe=False)
-
 @login_required
 def legal_assistant_calendar_view(request):
-    # Get events for FullCalendar
-    events = Calendar.objects.filter(user=request.user)
-    event_list = [{
-        'id': event.id,
-        'title': event.title,
-        'start': event.start_time.isoformat(),
-        'end': event.end_time.isoformat(),
-        'color': get_event_color(event.event_type),
-        'extendedProps': {
-            'description': event.description,
-            'type': event.event_type,
-            'location': event.location,
-        }
-    } for event in events]
-    
+    # Events are lazy-loaded by FullCalendar from event_list_json for the
+    # visible range only.
+
     # Get date from request or use today
     selected_date = request.GET.get('date', datetime.today().date())
     
@@ -992,7 +978,6 @@ def legal_assistant_calendar_view(request):
     diary_form = DiaryEntryForm(initial={'date': selected_date})
     
     context = {
-        'events_json': JsonResponse(event_list, safe=False).content.decode('utf-8'),
         'selected_date': selected_date,
         'diary_entries': diary_entries,
         'event_form': event_form,
@@ -1013,7 +998,7 @@ def get_event_color(event_type):
 @login_required
 @require_POST
 def add_event(request):
-    form = CalendarEventForm(request.POST)
+    form = CalendarEventForm(request.POST, user=request.user)
     if form.is_valid():
         event = form.save(commit=False)
         event.user = request.user
@@ -1028,7 +1013,7 @@ def legal_assistant_date_detail(request, date_str):
         date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
         
         # Get events and diary entries for the selected date
-        events = Calendar.objects.filter(user=request.user, start_time__date=date_obj)
+        events = occurrences_on_day(Calendar.objects.filter(user=request.user), date_obj)
         diary_entries = Diary.objects.filter(user=request.user, date=date_obj)
 
         # Initialize forms
@@ -1038,7 +1023,7 @@ def legal_assistant_date_detail(request, date_str):
         if request.method == 'POST':
             # Process both forms
             diary_form = DiaryEntryForm(request.POST)
-            event_form = CalendarEventForm(request.POST)
+            event_form = CalendarEventForm(request.POST, user=request.user)
 
             diary_valid = diary_form.is_valid()
             event_valid = event_form.is_valid()
@@ -1097,18 +1082,22 @@ def legal_assistant_create_task(request):
     return render(request, 'legal_assistant/create_task.html', {'form': form})
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=list_etag('tasks'))
 def legal_assistant_task_list(request):
     """Display all tasks relevant to the legal assistant."""
     tasks = Task.objects.filter(
         Q(assignor=request.user) | Q(assignee=request.user)
-    ).select_related('assignor', 'assignee').order_by('-created_at')
+    ).select_related('assignor', 'assignee')
+    page = paginate(tasks, request)
 
-    # Separate tasks into categories for better clarity
-    tasks_assigned_by_legal_assistant = tasks.filter(assignor=request.user)
-    tasks_assigned_to_legal_assistant = tasks.filter(assignee=request.user)
+    # Separate the tasks of this page into categories for better clarity
+    tasks_assigned_by_legal_assistant = [task for task in page if task.assignor_id == request.user.pk]
+    tasks_assigned_to_legal_assistant = [task for task in page if task.assignee_id == request.user.pk]
 
     context = {
-        'tasks': tasks,
+        'tasks': page,
+        'page': page,
         'tasks_assigned_by_legal_assistant': tasks_assigned_by_legal_assistant,
         'tasks_assigned_to_legal_assistant': tasks_assigned_to_legal_assistant,
     }
@@ -1151,12 +1140,14 @@ def legal_assistant_delete_task(request, task_id):
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=list_etag('cases', firm_wide=True))
 def legal_assistant_case_list(request):
     """
     List all cases for all the lawyers
     """
-    cases = Case.objects.filter().order_by('-created_at')
-    return render(request, 'secretary/case_list.html', {'cases': cases})
+    page = paginate(Case.objects.all(), request)
+    return render(request, 'secretary/case_list.html', {'cases': page, 'page': page})
 
 @login_required
 def legal_assistant_view_case(request, case_id):
@@ -1196,140 +1187,14 @@ def attache_dashboard(request):
     """
     Dashboard for attache
     """
-    # Diary entries
-    diary_entries = Diary.objects.filter(user=request.user)
-
-    # Calendar events
-    calendar_events = Calendar.objects.filter(user=request.user)
-    
-    # Task management (can assign to attache and legal assistant)
-    tasks= Task.objects.filter(Q(assignor=request.user) | Q(assignee=request.user))
-    print(f"Tasks for {request.user.username}: {tasks}") 
-    tasks_assigned = Task.objects.filter(
-        Q(assignor=request.user) |
-        Q(assignee=request.user))
-    
-
-    # Case Metrics
-    cases = Case.objects.filter()
-    total_cases = Case.objects.filter().count()
-    open_cases = Case.objects.filter(status='settled').count()
-    in_progress_cases = Case.objects.filter(status='in_progress').count()
-    settled_cases = Case.objects.filter(status='settled').count()
-    closed_cases = Case.objects.filter(status='closed').count()
-
-    # Document Upload Section
-    documents = Document.objects.filter(user=request.user)
-    document_form = DocumentUploadForm()
-
-    # Analytics and Quick Stats
-    total_tasks_assigned = tasks_assigned.count()
-    total_tasks_assigned = tasks_assigned.count()
-    pending_tasks= tasks_assigned.filter(status='pending').count()
-    in_progress_tasks= tasks_assigned.filter(status='in_progress').count()
-    on_hold_tasks= tasks_assigned.filter(status='on_hold').count()
-    completed_tasks = tasks_assigned.filter(status='completed').count()
-
-    #Diary and calendar Notifications
-    meetings_calendar_events = Calendar.objects.filter(user=request.user, event_type='meeting')
-    court_appearance_calendar_events = Calendar.objects.filter(user=request.user, event_type='court_appearance')
-    deadlines_calendar_events = Calendar.objects.filter(user=request.user, event_type='deadline')
-    personal_calendar_events = Calendar.objects.filter(user=request.user, event_type='personal')
-    other_calendar_events = Calendar.objects.filter(user=request.user, event_type='other')
-
-    if total_tasks_assigned > 0:
-        completed_tasks_percentage = (completed_tasks / total_tasks_assigned) * 100
-        in_progress_tasks_percentage = (in_progress_tasks / total_tasks_assigned) * 100
-        pending_tasks_percentage = (pending_tasks / total_tasks_assigned) * 100
-    else:
-        completed_tasks_percentage = 0
-        in_progress_tasks_percentage = 0
-        pending_tasks_percentage = 0
-
-    context = {
-        # Diary Context
-        'diary_entries': diary_entries,
-
-        # Calendar Context
-        'calendar_events': calendar_events,
-
-        # Task Context
-        'tasks_assigned': tasks_assigned,
-        'tasks':tasks,
-    
-        # Document Context
-        'documents': documents,
-        'document_form': document_form,
-
-        # Case Metrics
-        'cases': cases,
-        'total_cases': total_cases,
-        'open_cases': open_cases,
-        'in_progress_cases': in_progress_cases,
-        'settled_cases': settled_cases,
-        'closed_cases': closed_cases,
-
-        # Task Analytics
-        'total_tasks_assigned': total_tasks_assigned,
-        'completed_tasks': completed_tasks,
-        'pending_tasks': pending_tasks,
-        'in_progress_tasks': in_progress_tasks,
-        'on_hold_tasks': on_hold_tasks,
-        
-        # Calendar Notifications
-        'meetings_calendar_events': meetings_calendar_events,
-        'court_appearance_calendar_events': court_appearance_calendar_events,
-        'deadlines_calendar_events': deadlines_calendar_events,
-        'personal_calendar_events': personal_calendar_events,
-        'other_calendar_events': other_calendar_events,
-
-        
-        # Additional secretary-specific data can be added here
-        'upcoming_events': calendar_events[:5],  # Next 5 events
-        'recent_documents': documents[:3],  # Last 3 uploaded documents
-
-        'completed_tasks_percentage': completed_tasks_percentage,
-        'in_progress_tasks_percentage': in_progress_tasks_percentage,
-        'pending_tasks_percentage': pending_tasks_percentage,
-    }
-    
-
+    context = dashboard_context(request.user, firm_wide_cases=True)
     return render(request, 'dashboards/attache/dashboard.html', context)
 
-@login_required
-def event_list_json(request):
-    """
-    Return a JSON response with all calendar events for the logged-in user.
-    """
-    events = Calendar.objects.filter(user=request.user)
-    event_list = [{
-        'id': event.id,
-        'title': event.title,
-        'start': event.start_time.isoformat(),
-        'end': event.end_time.isoformat(),
-        'color': get_event_color(event.event_type),
-        'description': event.description,
-        'location': event.location,
-    } for event in events]
-    return JsonResponse(event_list, safe=False)
-
 @login_required
 def attache_calendar_view(request):
-    # Get events for FullCalendar
-    events = Calendar.objects.filter(user=request.user)
-    event_list = [{
-        'id': event.id,
-        'title': event.title,
-        'start': event.start_time.isoformat(),
-        'end': event.end_time.isoformat(),
-        'color': get_event_color(event.event_type),
-        'extendedProps': {
-            'description': event.description,
-            'type': event.event_type,
-            'location': event.location,
-        }
-    } for event in events]
-    
+    # Events are lazy-loaded by FullCalendar from event_list_json for the
+    # visible range only.
+
     # Get date from request or use today
     selected_date = request.GET.get('date', datetime.today().date())
     
@@ -1344,7 +1209,6 @@ def attache_calendar_view(request):
     diary_form = DiaryEntryForm(initial={'date': selected_date})
     
     context = {
-        'events_json': JsonResponse(event_list, safe=False).content.decode('utf-8'),
         'selected_date': selected_date,
         'diary_entries': diary_entries,
         'event_form': event_form,
@@ -1365,7 +1229,7 @@ def get_event_color(event_type):
 @login_required
 @require_POST
 def add_event(request):
-    form = CalendarEventForm(request.POST)
+    form = CalendarEventForm(request.POST, user=request.user)
     if form.is_valid():
         event = form.save(commit=False)
         event.user = request.user
@@ -1380,7 +1244,7 @@ def attache_date_detail(request, date_str):
         date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
         
         # Get events and diary entries for the selected date
-        events = Calendar.objects.filter(user=request.user, start_time__date=date_obj)
+        events = occurrences_on_day(Calendar.objects.filter(user=request.user), date_obj)
         diary_entries = Diary.objects.filter(user=request.user, date=date_obj)
 
         # Initialize forms
@@ -1390,7 +1254,7 @@ def attache_date_detail(request, date_str):
         if request.method == 'POST':
             # Process both forms
             diary_form = DiaryEntryForm(request.POST)
-            event_form = CalendarEventForm(request.POST)
+            event_form = CalendarEventForm(request.POST, user=request.user)
 
             diary_valid = diary_form.is_valid()
             event_valid = event_form.is_valid()
@@ -1428,29 +1292,32 @@ def attache_date_detail(request, date_str):
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=list_etag('tasks'))
 def attache_task_list(request):
     """Display all tasks relevant to the attache."""
-    tasks = Task.objects.filter(
-        Q(assignor=request.user) | Q(assignee=request.user)
-    ).select_related('assignor', 'assignee').order_by('-created_at')
-
-    # Separate tasks into categories for better clarity
-    tasks_assigned_to_attache = tasks.filter(assignee=request.user)
+    # Attachés cannot assign tasks, so only received tasks are listed
+    tasks = Task.objects.filter(assignee=request.user).select_related('assignor', 'assignee')
+    page = paginate(tasks, request)
+    tasks_assigned_to_attache = page
 
     context = {
-        'tasks': tasks,
+        'tasks': page,
+        'page': page,
         'tasks_assigned_to_attache': tasks_assigned_to_attache,
     }
     return render(request, 'attache/task_list.html', context)
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=list_etag('cases', firm_wide=True))
 def attache_case_list(request):
     """
     List all cases for all the lawyers
     """
-    cases = Case.objects.filter().order_by('-created_at')
-    return render(request, 'attache/case_list.html', {'cases': cases})
+    page = paginate(Case.objects.all(), request)
+    return render(request, 'attache/case_list.html', {'cases': page, 'page': page})
 
 @login_required
 def attache_view_case(request, case_id):
@@ -1465,6 +1332,212 @@ def attache_view_case(request, case_id):
         'documents': documents
     })
 
+# Search
+
+CASE_VIEW_NAMES = {
+    'lawyer': 'view_case',
+    'secretary': 'secretary_view_case',
+    'legal_assistant': 'legal_assistant_view_case',
+    'attache': 'attache_view_case',
+}
+
+DATE_DETAIL_VIEW_NAMES = {
+    'lawyer': 'date_detail',
+    'secretary': 'secretary_date_detail',
+    'legal_assistant': 'legal_assistant_date_detail',
+    'attache': 'attache_date_detail',
+}
+
+
+def search_result_url(result, user):
+    """Link a search result to the page the user's role uses for it."""
+    if result.kind == 'case':
+        return reverse(CASE_VIEW_NAMES.get(user.role, 'view_case'), args=[result.object.pk])
+    if result.kind == 'diary':
+        return reverse(
+            DATE_DETAIL_VIEW_NAMES.get(user.role, 'date_detail'),
+            kwargs={'date_str': result.object.date.isoformat()},
+        )
+    return reverse('download_document', args=[result.object.pk])
+
+
+def get_search_limit(request):
+    try:
+        limit = int(request.GET.get('limit', 20))
+    except ValueError:
+        limit = 20
+    return max(1, min(limit, 100))
+
+
+@login_required
+def search_view(request):
+    """Ranked full-text search over cases, diary entries and documents."""
+    query = request.GET.get('q', '').strip()
+    results = search(request.user, query, limit=get_search_limit(request))
+    for result in results:
+        result.url = search_result_url(result, request.user)
+    return render(request, 'search.html', {'query': query, 'results': results})
+
+
+@login_required
+def search_json(request):
+    """Return ranked search results as JSON."""
+    query = request.GET.get('q', '').strip()
+    results = search(request.user, query, limit=get_search_limit(request))
+    return JsonResponse({
+        'query': query,
+        'results': [{
+            'type': result.kind,
+            'id': result.object.pk,
+            'title': result.title,
+            'excerpt': result.excerpt,
+            'score': result.score,
+            'url': search_result_url(result, request.user),
+        } for result in results],
+    })
+
+# Document downloads
+
+@login_required
+def download_document(request, document_id):
+    """
+    Serve a document's file to users allowed to see it.
+
+    Pass ``?download=1`` to save the file instead of opening it inline.
+    """
+    document = get_object_or_404(Document.objects.select_related('case'), id=document_id)
+    if not can_view_document(request.user, document):
+        raise PermissionDenied
+    return serve_document(request, document, as_attachment=bool(request.GET.get('download')))
+
+# Exports
+
+@login_required
+def export_data(request, kind):
+    """
+    Stream the user's cases, tasks, events or diary entries as CSV or, with
+    ``?format=ndjson``, as newline-delimited JSON.
+    """
+    if kind not in EXPORTS:
+        raise Http404
+    format = request.GET.get('format', 'csv')
+    if format not in EXPORT_FORMATS:
+        return JsonResponse({'error': 'Unknown export format.'}, status=400)
+    response = StreamingHttpResponse(
+        export_chunks(kind, format, request.user), content_type=EXPORT_FORMATS[format]
+    )
+    filename = f'{kind}-{timezone.localdate().isoformat()}.{format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+# Incremental sync
+
+@login_required
+def sync_changes(request, kind):
+    """
+    Return the user's events or tasks changed since ``cursor``, oldest
+    first. Clients store ``cursor`` from each response and poll again while
+    ``has_more`` is true. 410 means the cursor expired and the client must
+    start over without one.
+    """
+    if kind not in SYNC_SOURCES:
+        raise Http404
+    try:
+        limit = int(request.GET.get('limit', settings.SYNC_PAGE_SIZE))
+    except ValueError:
+        limit = settings.SYNC_PAGE_SIZE
+    limit = max(1, min(limit, settings.SYNC_MAX_PAGE_SIZE))
+    try:
+        changes, cursor, has_more = changes_since(
+            kind, request.user, request.GET.get('cursor'), limit
+        )
+    except CursorExpired:
+        return JsonResponse({'error': 'Cursor expired; sync again from the start.'}, status=410)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse({'changes': changes, 'cursor': cursor, 'has_more': has_more})
+
+# Resumable chunked uploads
+
+def upload_status(session):
+    return {
+        'upload_id': str(session.pk),
+        'filename': session.filename,
+        'size': session.total_size,
+        'chunk_size': session.chunk_size,
+        'total_chunks': session.total_chunks,
+        'next_chunk': session.received_chunks,
+        'received_bytes': session.received_bytes,
+        'document_id': session.document_id,
+        'expires_at': session.expires_at.isoformat(),
+    }
+
+
+def get_upload_session(request, upload_id):
+    return get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+
+
+@login_required
+@require_POST
+def upload_start(request):
+    """
+    Open a chunked upload for a case document.
+
+    Expects ``case_id``, ``filename``, ``size`` and the file's ``checksum``
+    (hex SHA-256), plus optional ``document_type`` and ``description``.
+    """
+    case = get_object_or_404(Case, id=request.POST.get('case_id') or 0)
+    if not can_view_case(request.user, case):
+        raise PermissionDenied
+    try:
+        session = start_upload(
+            request.user,
+            case,
+            request.POST.get('filename'),
+            request.POST.get('size'),
+            request.POST.get('checksum'),
+            document_type=request.POST.get('document_type', 'case_document'),
+            description=request.POST.get('description') or None,
+        )
+    except UploadError as error:
+        return JsonResponse({'error': str(error)}, status=error.status)
+    return JsonResponse(upload_status(session), status=201)
+
+
+@login_required
+def upload_detail(request, upload_id):
+    """Report upload progress so an interrupted client knows where to resume."""
+    return JsonResponse(upload_status(get_upload_session(request, upload_id)))
+
+
+@login_required
+@require_POST
+def upload_chunk(request, upload_id, index):
+    """
+    Store chunk ``index`` sent as the raw request body, with its hex SHA-256
+    in the ``X-Chunk-Checksum`` header.
+    """
+    session = get_upload_session(request, upload_id)
+    try:
+        session = write_chunk(
+            session.pk, index, request.body, request.headers.get('X-Chunk-Checksum')
+        )
+    except UploadError as error:
+        return JsonResponse({'error': str(error), **upload_status(session)}, status=error.status)
+    return JsonResponse(upload_status(session))
+
+
+@login_required
+@require_POST
+def upload_finalize(request, upload_id):
+    """Verify the assembled file and turn it into a case document."""
+    session = get_upload_session(request, upload_id)
+    try:
+        document = finalize_upload(session.pk)
+    except UploadError as error:
+        return JsonResponse({'error': str(error), **upload_status(session)}, status=error.status)
+    return JsonResponse({'document_id': document.pk, 'case_id': document.case_id}, status=201)
+
 def user_logout(request):
     """Log out the user and redirect to the home page."""
     logout(request)
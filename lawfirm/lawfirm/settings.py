@@ -47,6 +47,7 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 MIDDLEWARE = [
+    'firm.instrumentation.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -92,6 +93,159 @@ DATABASES = {
 AUTH_USER_MODEL = 'firm.User'
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory is per process. When running several app nodes, point this at
+# a shared backend (Redis or Memcached) so dashboard invalidation reaches all
+# of them.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'lawfirm',
+    }
+}
+
+# Seconds a cached dashboard panel may live. Entries are invalidated as soon
+# as the underlying rows change, so this only bounds memory use.
+DASHBOARD_CACHE_TIMEOUT = 60 * 60
+
+# Case and task lists use cursor pagination; ?page_size= may override the
+# default up to the maximum.
+FIRM_PAGE_SIZE = 25
+FIRM_MAX_PAGE_SIZE = 100
+
+# Overlap checks: a new recurring event is checked for conflicts this many
+# days ahead, and the conflicts API accepts windows of at most
+# SCHEDULING_MAX_WINDOW_DAYS.
+SCHEDULING_CONFLICT_HORIZON = 365
+SCHEDULING_MAX_WINDOW_DAYS = 366
+
+# Free/busy slot search for secretaries: working hours (local time), working
+# days (Monday is 0) and the most users compared at once.
+SCHEDULING_WORKDAY_START = '08:00'
+SCHEDULING_WORKDAY_END = '17:00'
+SCHEDULING_WORKING_DAYS = (0, 1, 2, 3, 4)
+SCHEDULING_MAX_USERS = 100
+
+# Per-request query instrumentation (firm.instrumentation). QUERY_BUDGETS
+# caps the queries of a view by URL name; requests over budget are logged,
+# and fail tests run with QUERY_BUDGETS_STRICT (see firm.testing).
+QUERY_INSTRUMENTATION_HEADERS = DEBUG
+QUERY_BUDGETS_STRICT = False
+QUERY_BUDGETS = {
+    # Dashboards (cold panel cache)
+    'lawyer_dashboard': 9,
+    'secretary_dashboard': 9,
+    'legal_assistant_dashboard': 8,
+    'attache_dashboard': 8,
+    # Lists
+    'task_list': 5,
+    'secretary_task_list': 5,
+    'legal_assistant_task_list': 5,
+    'attache_task_list': 5,
+    'view_cases': 5,
+    'secretary_view_cases': 5,
+    'legal_assistant_view_cases': 5,
+    'attache_view_cases': 5,
+    # Calendars
+    'calendar': 5,
+    'secretary_calendar': 4,
+    'legal_assistant_calendar': 4,
+    'attache_calendar': 4,
+    'date_detail': 7,
+    'secretary_date_detail': 7,
+    'legal_assistant_date_detail': 7,
+    'attache_date_detail': 7,
+    'event_list_json': 6,
+    'free_busy_json': 6,
+    # Cases and tasks
+    'view_case': 7,
+    'secretary_view_case': 6,
+    'legal_assistant_view_case': 6,
+    'attache_view_case': 6,
+    'create_task': 4,
+    'secretary_create_task': 4,
+    'legal_assistant_create_task': 4,
+    'update_task': 8,
+    'create_case': 4,
+    'update_case': 5,
+    'search': 9,
+}
+
+# Seconds a built assignee directory stays in the cache; it is rebuilt
+# anyway whenever a user changes
+USER_DIRECTORY_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Most tasks one bulk action on a task list may change
+BULK_TASK_MAX_SELECTION = 500
+
+# Micro-benchmarks (`manage.py microbench`). Timings depend on the machine,
+# so save the baseline with --save-baseline where the comparison runs. A
+# best time or peak allocation growing by more than the threshold fails.
+MICROBENCH_BASELINE = BASE_DIR / 'microbench-baseline.json'
+MICROBENCH_REGRESSION_THRESHOLD = 0.25
+
+# iCalendar subscription feeds (calendar/feed/<key>.ics). Rendered events
+# and whole feeds up to ICS_FEED_CACHE_MAX_SIZE characters are cached;
+# larger feeds are streamed ICS_FEED_CHUNK_SIZE events at a time. Events
+# that ended more than ICS_FEED_PAST_DAYS ago are left out.
+ICS_FEED_CACHE_TIMEOUT = 60 * 60 * 24
+ICS_FEED_CACHE_MAX_SIZE = 2 * 1024 * 1024
+ICS_FEED_CHUNK_SIZE = 500
+ICS_FEED_PAST_DAYS = 180
+ICS_FEED_REFRESH_MINUTES = 15
+
+# Incremental sync of events and tasks (api/sync/). Changes younger than
+# SYNC_SETTLE_SECONDS are held back until concurrent transactions have
+# committed. Deleted rows are kept as tombstones for the retention period
+# (see `manage.py purge_tombstones`); older cursors must resync.
+SYNC_PAGE_SIZE = 200
+SYNC_MAX_PAGE_SIZE = 1000
+SYNC_SETTLE_SECONDS = 2
+SYNC_TOMBSTONE_RETENTION_DAYS = 30
+
+# Rows validated and inserted per transaction by the case import
+# (`manage.py import_cases` and the Case admin's import page).
+CASE_IMPORT_BATCH_SIZE = 500
+
+# Rows fetched per database round trip (and per streamed chunk) by the
+# CSV/NDJSON exports.
+EXPORT_CHUNK_SIZE = 2000
+
+# Background jobs are stored in the database and run by `manage.py worker`.
+# A running job whose worker has been silent for JOB_LOCK_TIMEOUT seconds is
+# assumed lost and queued again, or failed if it has used all its attempts,
+# so keep it above the longest job. Failed jobs are retried after
+# JOB_RETRY_BACKOFF * 2**(attempt - 1) seconds, capped at JOB_RETRY_MAX_DELAY.
+JOB_WORKER_CONCURRENCY = 2
+JOB_POLL_INTERVAL = 1
+JOB_LOCK_TIMEOUT = 15 * 60
+JOB_RETRY_BACKOFF = 30
+JOB_RETRY_MAX_DELAY = 60 * 60
+
+# Text of uploaded documents is extracted by a background job and added to
+# the search index. PDF extraction needs the optional pypdf package.
+DOCUMENT_TEXT_MAX_CHARS = 1_000_000
+
+# Document uploads. Large files can be sent through the resumable chunked
+# upload API; chunks are kept in DOCUMENT_UPLOAD_TEMP_DIR until finalized.
+# A chunk is read into memory, so keep the chunk size well below
+# DATA_UPLOAD_MAX_MEMORY_SIZE. Uploads expire DOCUMENT_UPLOAD_EXPIRY_HOURS
+# after their last chunk (see `manage.py purge_uploads`).
+DOCUMENT_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+DOCUMENT_UPLOAD_CHUNK_SIZE = 1024 * 1024
+DOCUMENT_UPLOAD_TEMP_DIR = os.path.join(BASE_DIR, 'upload_tmp')
+DOCUMENT_UPLOAD_EXPIRY_HOURS = 24
+
+# Document downloads are permission-checked by Django. Set the backend to
+# 'nginx' (X-Accel-Redirect) or 'apache' (X-Sendfile) to let the front server
+# transfer the file. For nginx, DOCUMENT_SENDFILE_PREFIX must be an
+# ``internal`` location aliased to MEDIA_ROOT.
+DOCUMENT_SENDFILE_BACKEND = None
+DOCUMENT_SENDFILE_PREFIX = '/protected-media/'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
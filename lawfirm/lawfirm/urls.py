@@ -2,6 +2,7 @@ from django.urls import path
 from firm import views
 from django.contrib import admin
 from django.contrib.auth import views as auth_views
+import os
 from django.conf import settings
 from django.conf.urls.static import static
 from firm.views import add_event
@@ -19,6 +20,8 @@ urlpatterns = [
     path('lawyer/task/list/', views.task_list, name='task_list'),
     path('lawyer/task/update/<int:task_id>/', views.update_task, name='update_task'),
     path('lawyer/task/delete/<int:task_id>/', views.delete_task, name='delete_task'),
+    path('task/bulk/', views.bulk_task_action, name='bulk_task_action'),
+    path('api/assignees/', views.assignee_search_json, name='assignee_search_json'),
     path('lawyer/case/create/', views.create_case, name='create_case'),
     path('lawyer/case/list/', views.case_list, name='view_cases'),
     path('lawyer/case/update/<int:case_id>/', views.update_case, name='update_case'),
@@ -30,6 +33,8 @@ urlpatterns = [
     path('lawyer/calendar/week/<int:year>/<int:week>/', views.calendar_view, name='week_view'),
     path('lawyer/calendar/month/<int:year>/<int:month>/', views.calendar_view, name='month_view'),
     path('api/events/', views.event_list_json, name='event_list_json'),
+    path('api/events/conflicts/', views.event_conflicts_json, name='event_conflicts_json'),
+    path('api/freebusy/', views.free_busy_json, name='free_busy_json'),
 
     # Secretary URLs
     path('secretary/dashboard/', views.secretary_dashboard, name='secretary_dashboard'),
@@ -75,5 +80,32 @@ urlpatterns = [
     path('attache/case/view/<int:case_id>/', views.attache_view_case, name='attache_view_case'),
     path('api/events/', views.event_list_json, name='event_list_json'),
 
+    # Search
+    path('search/', views.search_view, name='search'),
+    path('api/search/', views.search_json, name='search_json'),
+
+    # Documents are only served through this permission-checked view
+    path('documents/<int:document_id>/download/', views.download_document, name='download_document'),
+
+    # Streaming exports (CSV or NDJSON)
+    path('export/<str:kind>/', views.export_data, name='export_data'),
+
+    # iCalendar subscription feed; the key in the URL authenticates it
+    path('calendar/feed/<str:key>.ics', views.calendar_feed, name='calendar_feed'),
+    path('calendar/feed/new/', views.create_calendar_feed, name='create_calendar_feed'),
+    path('calendar/feed/revoke/', views.revoke_calendar_feed, name='revoke_calendar_feed'),
+
+    # Incremental sync for desktop and mobile clients
+    path('api/sync/<str:kind>/', views.sync_changes, name='sync_changes'),
+
+    # Resumable chunked document uploads
+    path('api/uploads/', views.upload_start, name='upload_start'),
+    path('api/uploads/<uuid:upload_id>/', views.upload_detail, name='upload_detail'),
+    path('api/uploads/<uuid:upload_id>/chunks/<int:index>/', views.upload_chunk, name='upload_chunk'),
+    path('api/uploads/<uuid:upload_id>/finalize/', views.upload_finalize, name='upload_finalize'),
+
    
-]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+]+ static(
+    settings.MEDIA_URL + 'profile_pictures/',
+    document_root=os.path.join(settings.MEDIA_ROOT, 'profile_pictures'),
+)
\ No newline at end of file